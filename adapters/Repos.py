@@ -1,8 +1,14 @@
+import csv
+import io
 from abc import ABC, abstractmethod
 
+from sqlalchemy import insert, inspect, select
 from sqlalchemy.orm import Session
 
 from schedule import domain
+from schedule.adapters import orm, queries
+from schedule.adapters.cache import detached_copy, has_uncommitted_writes, track_writes
+from schedule.config import Config
 
 
 class AbstractRepository(ABC):
@@ -23,31 +29,125 @@ class AbstractRepository(ABC):
 
 
 class SQLAlchemyRepository(AbstractRepository):
-    def __init__(self, session: Session, model):
+    def __init__(self, session: Session, model, cache=None):
+        """
+        :param cache: необязательный LRUCache из adapters/cache.py для get()
+        """
         self.session = session
         self.model = model
+        self.cache = cache
+        if cache is not None:
+            track_writes(session)
 
     def add(self, obj):
         self.session.add(obj)
 
     def get(self, obj_id):
-        return self.session.query(self.model).get(obj_id)
+        if self.cache is None or has_uncommitted_writes(self.session):
+            return self.session.query(self.model).get(obj_id)
+
+        # get_or_load не сохранит копию, если invalidate() пришёл во время загрузки
+        cached = self.cache.get_or_load(obj_id, lambda: self._load_copy(obj_id))
+        if cached is None:
+            # Отсутствие не кэшируется: объект с этим ключом может появиться позже
+            self.cache.invalidate(obj_id)
+            return None
+        return self.session.merge(cached, load=False)
+
+    def _load_copy(self, obj_id):
+        obj = self.session.query(self.model).get(obj_id)
+        return detached_copy(obj) if obj is not None else None
+
+    def invalidate(self, obj_id):
+        if self.cache is not None:
+            self.cache.invalidate(obj_id)
 
     def list(self):
         return self.session.query(self.model).all()
 
+    def _keyset(self):
+        return list(inspect(self.model).primary_key)
+
+    def _stream(self, statement, chunk_size):
+        # yield_per включает серверный курсор: в памяти не больше chunk_size строк
+        yield from self.session.scalars(statement.execution_options(yield_per=chunk_size))
+
+    def _page(self, statement, columns, after, limit):
+        items = self.session.scalars(queries.keyset_page(statement, columns, after, limit)).all()
+        return queries.page_of(items, columns, limit)
+
+    def stream(self, chunk_size=Config.STREAM_CHUNK_SIZE, **filters):
+        """Объекты по одному в порядке первичного ключа, читаются порциями chunk_size"""
+        statement = select(self.model).filter_by(**filters).order_by(*self._keyset())
+        return self._stream(statement, chunk_size)
+
+    def page(self, after=None, limit=Config.PAGE_SIZE, **filters):
+        """Страница из limit объектов с первичным ключом больше after"""
+        return self._page(select(self.model).filter_by(**filters), self._keyset(), after, limit)
+
 
 class LocationRepository(SQLAlchemyRepository):
-    def __init__(self, session):
-        super().__init__(session, domain.Location)
+    def __init__(self, session, cache=None):
+        super().__init__(session, domain.Location, cache=cache)
+
+    def list_points(self):
+        """Строки (id, latitude, longitude) всех пунктов для GeoGrid.from_points"""
+        return self.session.execute(queries.location_points()).all()
 
 
 class VoyageRepository(SQLAlchemyRepository):
     def __init__(self, session):
         super().__init__(session, domain.Voyage)
 
-    def get_by_origin(self, origin_id):
-        return self.session.query(self.model).filter_by(origin_id=origin_id).all()
+    def get_by_origin(self, origin_id, profile="lazy"):
+        return (
+            self.session.query(self.model)
+            .options(*orm.voyage_loader_options(profile))
+            .filter_by(origin_id=origin_id)
+            .all()
+        )
+
+    def exists(self, voyage_id):
+        """Проверить наличие рейса без загрузки ORM-объекта"""
+        return self.session.execute(queries.voyage_exists(voyage_id)).first() is not None
+
+    def _by_departure(self, start, end, profile):
+        statement = select(self.model).options(*orm.voyage_loader_options(profile))
+        if start is not None:
+            statement = statement.where(orm.voyages.c.dep_datetime_utc >= start)
+        if end is not None:
+            statement = statement.where(orm.voyages.c.dep_datetime_utc < end)
+        return statement
+
+    def stream_by_departure(self, start=None, end=None, chunk_size=Config.STREAM_CHUNK_SIZE,
+                            profile="lazy"):
+        """Рейсы с отправлением в [start, end) в порядке отправления, порциями chunk_size"""
+        statement = self._by_departure(start, end, profile).order_by(*queries.DEPARTURE_KEYSET)
+        return self._stream(statement, chunk_size)
+
+    def page_by_departure(self, after=None, limit=Config.PAGE_SIZE, start=None, end=None,
+                          profile="lazy"):
+        """
+        Страница рейсов в порядке отправления.
+
+        :param after: курсор (dep_datetime_utc, voyage_id) из Page.next_after
+        """
+        statement = self._by_departure(start, end, profile)
+        return self._page(statement, queries.DEPARTURE_KEYSET, after, limit)
+
+    def list_connections(self, start, end):
+        """Строки рейсов с отправлением в [start, end) для построения ConnectionIndex"""
+        return self.session.execute(queries.connections(start, end)).all()
+
+    def existing_ids(self, voyage_ids):
+        """Подмножество переданных идентификаторов, для которых рейс существует"""
+        voyage_ids = set(voyage_ids)
+        if not voyage_ids:
+            return set()
+        return set(self.session.scalars(queries.existing_voyage_ids(voyage_ids)))
+
+
+_COPY_TICKETS = "COPY tickets (price, voyage_id, is_active) FROM STDIN"
 
 
 class TicketRepository(SQLAlchemyRepository):
@@ -57,6 +157,39 @@ class TicketRepository(SQLAlchemyRepository):
     def get_active_tickets(self, voyage_id):
         return self.session.query(self.model).filter_by(voyage_id=voyage_id, is_active=True).all()
 
+    def bulk_insert(self, rows):
+        """
+        Вставить пачку билетов в обход unit of work ORM.
+
+        :param rows: список словарей с ключами price, voyage_id, is_active
+        """
+        if not rows:
+            return
+        connection = self.session.connection()
+        driver = connection.dialect.driver
+        if driver == "psycopg2":
+            self._copy_rows(connection, rows)
+        elif driver == "psycopg":
+            self._copy_rows_psycopg(connection, rows)
+        else:
+            connection.execute(insert(orm.tickets), rows)
+
+    def _copy_rows(self, connection, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row["price"], row["voyage_id"], row["is_active"]) for row in rows
+        )
+        buffer.seek(0)
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"{_COPY_TICKETS} WITH (FORMAT csv)", buffer)
+
+    def _copy_rows_psycopg(self, connection, rows):
+        """COPY для psycopg 3: строки передаются драйверу без промежуточного CSV"""
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            with cursor.copy(_COPY_TICKETS) as copy:
+                for row in rows:
+                    copy.write_row((row["price"], row["voyage_id"], row["is_active"]))
+
 
 class AvailabilityRepository(SQLAlchemyRepository):
     def __init__(self, session):
@@ -65,17 +198,159 @@ class AvailabilityRepository(SQLAlchemyRepository):
     def get_by_voyage(self, voyage_id):
         return self.session.query(self.model).filter_by(voyage_id=voyage_id).first()
 
+    def reserve(self, voyage_id, seats):
+        """Атомарно списать места; возвращает остаток или None, если мест не хватило"""
+        return self.session.execute(queries.reserve_seats(voyage_id, seats)).scalar()
+
+    def release(self, voyage_id, seats):
+        """Атомарно вернуть места; возвращает остаток или None, если вернуть нечего"""
+        return self.session.execute(queries.release_seats(voyage_id, seats)).scalar()
+
+
+class BufferedAvailabilityRepository(AvailabilityRepository):
+    """
+    AvailabilityRepository, бронирующий места через SeatCounters из
+    adapters/seat_counters.py: продажа меняет счётчик в памяти, а строка
+    availability обновляется отложенно пачкой дельт. Запись доступности
+    (add) сбрасывает счётчик рейса после коммита.
+    """
+
+    def __init__(self, session, counters):
+        super().__init__(session)
+        self.counters = counters
+
+    def add(self, obj):
+        self.counters.forget_on_commit(self.session, obj.voyage_id)
+        super().add(obj)
+
+    def reserve(self, voyage_id, seats):
+        return self.counters.reserve(voyage_id, seats)
+
+    def release(self, voyage_id, seats):
+        return self.counters.release(voyage_id, seats)
+
 
 class ScheduleRepository(SQLAlchemyRepository):
-    def __init__(self, session):
+    def __init__(self, session, read_cache=None):
+        """
+        :param read_cache: необязательный ScheduleReadCache из adapters/cache.py
+            для чтений по дате расписания
+        """
         super().__init__(session, domain.Schedule)
+        self.read_cache = read_cache
+        if read_cache is not None:
+            track_writes(session)
+
+    def _use_cache(self):
+        return self.read_cache is not None and not has_uncommitted_writes(self.session)
+
+    def get_by_date(self, schedule_date, profile="lazy"):
+        # Кэшируется только профиль "lazy": связи копии догружаются уже в текущей сессии
+        if not self._use_cache() or profile != "lazy":
+            return self._get_by_date(schedule_date, profile)
+
+        cached = self.read_cache.get_or_load(
+            "schedule", schedule_date, lambda: self._load_cacheable(schedule_date)
+        )
+        return self.session.merge(cached, load=False) if cached is not None else None
+
+    def _get_by_date(self, schedule_date, profile):
+        return (
+            self.session.query(self.model)
+            .options(*orm.schedule_loader_options(profile))
+            .filter_by(schedule_date=schedule_date)
+            .first()
+        )
 
-    def get_by_date(self, schedule_date):
-        return self.session.query(self.model).filter_by(schedule_date=schedule_date).first()
+    def _load_cacheable(self, schedule_date):
+        schedule = self._get_by_date(schedule_date, "lazy")
+        if schedule is None:
+            return None
+        self.read_cache.remember(schedule.id, schedule_date)
+        return detached_copy(schedule)
 
-    def list_by_date_range(self, start_date, end_date):
+    def list_by_date_range(self, start_date, end_date, profile="lazy"):
         return (
             self.session.query(self.model)
+            .options(*orm.schedule_loader_options(profile))
             .filter(self.model.schedule_date >= start_date, self.model.schedule_date <= end_date)
             .all()
         )
+
+    def stream_by_date_range(self, start_date, end_date, chunk_size=Config.STREAM_CHUNK_SIZE,
+                             profile="lazy"):
+        """То же, что list_by_date_range, но по одному расписанию в порядке дат"""
+        statement = (
+            select(self.model)
+            .options(*orm.schedule_loader_options(profile))
+            .where(orm.schedules.c.schedule_date.between(start_date, end_date))
+            .order_by(orm.schedules.c.schedule_date)
+        )
+        return self._stream(statement, chunk_size)
+
+    def _delete_where(self, condition):
+        schedule_ids = self.session.scalars(queries.schedule_ids(condition)).all()
+        if not schedule_ids:
+            return []
+
+        for statement in queries.cascade_delete(condition):
+            self.session.execute(statement)
+        return schedule_ids
+
+    def delete_by_id(self, schedule_id):
+        """Удалить расписание вместе с рейсами, билетами и доступностью"""
+        return self._delete_where(orm.schedules.c.id == schedule_id)
+
+    def delete_by_date_range(self, start_date, end_date):
+        """Удалить все расписания за период; возвращает идентификаторы удалённых"""
+        return self._delete_where(
+            orm.schedules.c.schedule_date.between(start_date, end_date)
+        )
+
+    def get_summary_by_date(self, schedule_date):
+        """Сводка по расписанию одним агрегирующим запросом"""
+        if not self._use_cache():
+            return self._get_summary_by_date(schedule_date)
+        summary = self.read_cache.get_or_load(
+            "summary", schedule_date, lambda: self._get_summary_by_date(schedule_date)
+        )
+        return dict(summary) if summary is not None else None
+
+    def _get_summary_by_date(self, schedule_date):
+        row = self.session.execute(queries.schedule_summary(schedule_date)).first()
+        return dict(row._mapping) if row else None
+
+    def get_voyage_summaries_by_date(self, schedule_date):
+        """Построчная разбивка по рейсам расписания одним запросом"""
+        if not self._use_cache():
+            return self._get_voyage_summaries_by_date(schedule_date)
+        return list(self.read_cache.get_or_load(
+            "summary_with_voyages", schedule_date,
+            lambda: tuple(self._get_voyage_summaries_by_date(schedule_date)),
+        ))
+
+    def _get_voyage_summaries_by_date(self, schedule_date):
+        rows = self.session.execute(queries.ordered_voyage_summaries(schedule_date)).all()
+        if rows and self.read_cache is not None:
+            self.read_cache.remember(rows[0].schedule_id, schedule_date)
+        return rows
+
+    def get_voyage_load(self, voyage_id):
+        """Загрузка рейса, посчитанная по нормализованным таблицам"""
+        row = self.session.execute(queries.voyage_load(voyage_id)).first()
+        return dict(row._mapping) if row else None
+
+
+class SummaryRepository:
+    """Чтение денормализованной модели, которую ведёт adapters/projections.py"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_summary_by_date(self, schedule_date):
+        row = self.session.execute(queries.read_schedule_summary(schedule_date)).first()
+        return dict(row._mapping) if row else None
+
+    def get_voyage_load(self, voyage_id):
+        row = self.session.execute(queries.read_voyage_load(voyage_id)).first()
+        return dict(row._mapping) if row else None
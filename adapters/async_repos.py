@@ -0,0 +1,286 @@
+from abc import ABC, abstractmethod
+
+from sqlalchemy import insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from schedule import domain
+from schedule.adapters import orm, queries
+from schedule.adapters.cache import detached_copy, has_uncommitted_writes, track_writes
+from schedule.config import Config
+
+
+class AbstractAsyncRepository(ABC):
+    @abstractmethod
+    def add(self, obj):
+        """Добавить объект в хранилище"""
+        pass
+
+    @abstractmethod
+    async def get(self, obj_id):
+        """Получить объект по идентификатору"""
+        pass
+
+    @abstractmethod
+    async def list(self):
+        """Получить все объекты"""
+        pass
+
+
+class AsyncSQLAlchemyRepository(AbstractAsyncRepository):
+    def __init__(self, session: AsyncSession, model, cache=None):
+        """
+        :param cache: необязательный LRUCache из adapters/cache.py для get()
+        """
+        self.session = session
+        self.model = model
+        self.cache = cache
+        if cache is not None:
+            track_writes(session)
+
+    def add(self, obj):
+        self.session.add(obj)
+
+    async def get(self, obj_id):
+        if self.cache is None or has_uncommitted_writes(self.session):
+            return await self.session.get(self.model, obj_id)
+
+        # aget_or_load не сохранит копию, если invalidate() пришёл во время загрузки
+        cached = await self.cache.aget_or_load(obj_id, lambda: self._load_copy(obj_id))
+        if cached is None:
+            # Отсутствие не кэшируется: объект с этим ключом может появиться позже
+            self.cache.invalidate(obj_id)
+            return None
+        return await self.session.merge(cached, load=False)
+
+    async def _load_copy(self, obj_id):
+        obj = await self.session.get(self.model, obj_id)
+        return detached_copy(obj) if obj is not None else None
+
+    def invalidate(self, obj_id):
+        if self.cache is not None:
+            self.cache.invalidate(obj_id)
+
+    async def list(self):
+        return (await self.session.scalars(select(self.model))).all()
+
+    def _keyset(self):
+        return list(inspect(self.model).primary_key)
+
+    async def _stream(self, statement, chunk_size):
+        result = await self.session.stream_scalars(statement.execution_options(yield_per=chunk_size))
+        async for obj in result:
+            yield obj
+
+    async def _page(self, statement, columns, after, limit):
+        items = (await self.session.scalars(queries.keyset_page(statement, columns, after, limit))).all()
+        return queries.page_of(items, columns, limit)
+
+    def stream(self, chunk_size=Config.STREAM_CHUNK_SIZE, **filters):
+        """Асинхронный итератор объектов в порядке первичного ключа"""
+        statement = select(self.model).filter_by(**filters).order_by(*self._keyset())
+        return self._stream(statement, chunk_size)
+
+    async def page(self, after=None, limit=Config.PAGE_SIZE, **filters):
+        return await self._page(select(self.model).filter_by(**filters), self._keyset(), after, limit)
+
+
+class AsyncLocationRepository(AsyncSQLAlchemyRepository):
+    def __init__(self, session, cache=None):
+        super().__init__(session, domain.Location, cache=cache)
+
+    async def list_points(self):
+        """Строки (id, latitude, longitude) всех пунктов для GeoGrid.from_points"""
+        return (await self.session.execute(queries.location_points())).all()
+
+
+class AsyncVoyageRepository(AsyncSQLAlchemyRepository):
+    def __init__(self, session):
+        super().__init__(session, domain.Voyage)
+
+    async def get_by_origin(self, origin_id, profile="summary"):
+        query = (
+            select(self.model)
+            .options(*orm.voyage_loader_options(profile))
+            .filter_by(origin_id=origin_id)
+        )
+        return (await self.session.scalars(query)).all()
+
+    def _by_departure(self, start, end, profile):
+        statement = select(self.model).options(*orm.voyage_loader_options(profile))
+        if start is not None:
+            statement = statement.where(orm.voyages.c.dep_datetime_utc >= start)
+        if end is not None:
+            statement = statement.where(orm.voyages.c.dep_datetime_utc < end)
+        return statement
+
+    def stream_by_departure(self, start=None, end=None, chunk_size=Config.STREAM_CHUNK_SIZE,
+                            profile="summary"):
+        statement = self._by_departure(start, end, profile).order_by(*queries.DEPARTURE_KEYSET)
+        return self._stream(statement, chunk_size)
+
+    async def page_by_departure(self, after=None, limit=Config.PAGE_SIZE, start=None, end=None,
+                                profile="summary"):
+        """:param after: курсор (dep_datetime_utc, voyage_id) из Page.next_after"""
+        statement = self._by_departure(start, end, profile)
+        return await self._page(statement, queries.DEPARTURE_KEYSET, after, limit)
+
+    async def list_connections(self, start, end):
+        """Строки рейсов с отправлением в [start, end) для построения ConnectionIndex"""
+        return (await self.session.execute(queries.connections(start, end))).all()
+
+    async def exists(self, voyage_id):
+        """Проверить наличие рейса без загрузки ORM-объекта"""
+        return (await self.session.execute(queries.voyage_exists(voyage_id))).first() is not None
+
+
+class AsyncTicketRepository(AsyncSQLAlchemyRepository):
+    def __init__(self, session):
+        super().__init__(session, domain.Ticket)
+
+    async def get_active_tickets(self, voyage_id):
+        query = select(self.model).filter_by(voyage_id=voyage_id, is_active=True)
+        return (await self.session.scalars(query)).all()
+
+    async def bulk_insert(self, rows):
+        """
+        Вставить пачку билетов в обход unit of work ORM.
+
+        :param rows: список словарей с ключами price, voyage_id, is_active
+        """
+        if not rows:
+            return
+        connection = await self.session.connection()
+        if connection.dialect.driver == "asyncpg":
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                "tickets",
+                records=[(row["price"], row["voyage_id"], row["is_active"]) for row in rows],
+                columns=["price", "voyage_id", "is_active"],
+            )
+        else:
+            await connection.execute(insert(orm.tickets), rows)
+
+
+class AsyncAvailabilityRepository(AsyncSQLAlchemyRepository):
+    def __init__(self, session):
+        super().__init__(session, domain.Availability)
+
+    async def get_by_voyage(self, voyage_id):
+        query = select(self.model).filter_by(voyage_id=voyage_id)
+        return (await self.session.scalars(query)).first()
+
+    async def reserve(self, voyage_id, seats):
+        """Атомарно списать места; возвращает остаток или None, если мест не хватило"""
+        return (await self.session.execute(queries.reserve_seats(voyage_id, seats))).scalar()
+
+    async def release(self, voyage_id, seats):
+        """Атомарно вернуть места; возвращает остаток или None, если вернуть нечего"""
+        return (await self.session.execute(queries.release_seats(voyage_id, seats))).scalar()
+
+
+class AsyncScheduleRepository(AsyncSQLAlchemyRepository):
+    def __init__(self, session, read_cache=None):
+        """
+        :param read_cache: необязательный ScheduleReadCache для сводок по дате;
+            сами расписания не кэшируются: в asyncio связи копии не догрузить
+        """
+        super().__init__(session, domain.Schedule)
+        self.read_cache = read_cache
+        if read_cache is not None:
+            track_writes(session)
+
+    async def get_by_date(self, schedule_date, profile="summary"):
+        query = (
+            select(self.model)
+            .options(*orm.schedule_loader_options(profile))
+            .filter_by(schedule_date=schedule_date)
+        )
+        return (await self.session.scalars(query)).first()
+
+    async def list_by_date_range(self, start_date, end_date, profile="summary"):
+        query = (
+            select(self.model)
+            .options(*orm.schedule_loader_options(profile))
+            .filter(self.model.schedule_date >= start_date, self.model.schedule_date <= end_date)
+        )
+        return (await self.session.scalars(query)).all()
+
+    def stream_by_date_range(self, start_date, end_date, chunk_size=Config.STREAM_CHUNK_SIZE,
+                             profile="summary"):
+        statement = (
+            select(self.model)
+            .options(*orm.schedule_loader_options(profile))
+            .where(orm.schedules.c.schedule_date.between(start_date, end_date))
+            .order_by(orm.schedules.c.schedule_date)
+        )
+        return self._stream(statement, chunk_size)
+
+    async def _delete_where(self, condition):
+        schedule_ids = (await self.session.scalars(queries.schedule_ids(condition))).all()
+        if not schedule_ids:
+            return []
+
+        for statement in queries.cascade_delete(condition):
+            await self.session.execute(statement)
+        return schedule_ids
+
+    async def delete_by_id(self, schedule_id):
+        """Удалить расписание вместе с рейсами, билетами и доступностью"""
+        return await self._delete_where(orm.schedules.c.id == schedule_id)
+
+    async def delete_by_date_range(self, start_date, end_date):
+        """Удалить все расписания за период; возвращает идентификаторы удалённых"""
+        return await self._delete_where(
+            orm.schedules.c.schedule_date.between(start_date, end_date)
+        )
+
+    def _use_cache(self):
+        return self.read_cache is not None and not has_uncommitted_writes(self.session)
+
+    async def get_summary_by_date(self, schedule_date):
+        """Сводка по расписанию одним агрегирующим запросом"""
+        if not self._use_cache():
+            return await self._get_summary_by_date(schedule_date)
+        summary = await self.read_cache.aget_or_load(
+            "summary", schedule_date, lambda: self._get_summary_by_date(schedule_date)
+        )
+        return dict(summary) if summary is not None else None
+
+    async def _get_summary_by_date(self, schedule_date):
+        row = (await self.session.execute(queries.schedule_summary(schedule_date))).first()
+        return dict(row._mapping) if row else None
+
+    async def get_voyage_summaries_by_date(self, schedule_date):
+        """Построчная разбивка по рейсам расписания одним запросом"""
+        if not self._use_cache():
+            return await self._get_voyage_summaries_by_date(schedule_date)
+        return list(await self.read_cache.aget_or_load(
+            "summary_with_voyages", schedule_date,
+            lambda: self._get_voyage_summaries_by_date(schedule_date),
+        ))
+
+    async def _get_voyage_summaries_by_date(self, schedule_date):
+        rows = (await self.session.execute(queries.ordered_voyage_summaries(schedule_date))).all()
+        if rows and self.read_cache is not None:
+            self.read_cache.remember(rows[0].schedule_id, schedule_date)
+        return tuple(rows)
+
+    async def get_voyage_load(self, voyage_id):
+        """Загрузка рейса, посчитанная по нормализованным таблицам"""
+        row = (await self.session.execute(queries.voyage_load(voyage_id))).first()
+        return dict(row._mapping) if row else None
+
+
+class AsyncSummaryRepository:
+    """Чтение денормализованной модели, которую ведёт adapters/projections.py"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_summary_by_date(self, schedule_date):
+        row = (await self.session.execute(queries.read_schedule_summary(schedule_date))).first()
+        return dict(row._mapping) if row else None
+
+    async def get_voyage_load(self, voyage_id):
+        row = (await self.session.execute(queries.read_voyage_load(voyage_id))).first()
+        return dict(row._mapping) if row else None
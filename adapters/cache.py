@@ -0,0 +1,422 @@
+"""
+Кэши, общие для всего процесса.
+
+В кэше справочных данных хранятся отсоединённые копии ORM-объектов. При
+попадании копия подключается к текущей сессии через Session.merge(load=False),
+без запроса к базе, а сама копия остаётся нетронутой.
+
+Кэш чтения расписаний хранит результаты по дате расписания и сбрасывается
+доменными событиями через ScheduleCacheInvalidator; TTL ограничивает
+устаревание, если часть изменений прошла мимо событий.
+
+Репозитории обходят оба кэша, пока в сессии есть незафиксированные записи
+(has_uncommitted_writes): иначе в общий кэш попали бы строки транзакции,
+которая ещё может откатиться. Слушатели, отслеживающие записи, подключаются
+через track_writes только к сессиям и движкам репозиториев с кэшем.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from schedule.adapters import queries
+from schedule.config import Config
+from schedule.domain import events
+
+
+_WRITES = "uncommitted_writes"
+_CONNECTIONS = "transaction_connections"
+
+
+_TRACKED = "tracks_writes"
+
+
+def _mark_writes(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        conn.info[_WRITES] = True
+
+
+def _clear_writes(conn):
+    conn.info.pop(_WRITES, None)
+
+
+def _track_connection(session, transaction, connection):
+    session.info.setdefault(_CONNECTIONS, []).append(connection)
+
+
+def _forget_connections(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CONNECTIONS, None)
+
+
+def track_writes(session):
+    """
+    Включить учёт незафиксированных записей для сессии (или AsyncSession) и
+    её движка. Вызывают репозитории, которым передан кэш, поэтому сессии и
+    движки без кэша не платят за слушатели. Повторный вызов ничего не делает.
+    """
+    session = getattr(session, "sync_session", session)
+    if session.info.get(_TRACKED):
+        return
+    session.info[_TRACKED] = True
+    event.listen(session, "after_begin", _track_connection)
+    event.listen(session, "after_transaction_end", _forget_connections)
+
+    engine = session.get_bind()
+    fresh_engine = not event.contains(engine, "before_cursor_execute", _mark_writes)
+    if fresh_engine:
+        event.listen(engine, "before_cursor_execute", _mark_writes)
+        event.listen(engine, "commit", _clear_writes)
+        event.listen(engine, "rollback", _clear_writes)
+
+    if session.in_transaction():
+        # Транзакция началась до подключения слушателей сессии
+        connection = session.connection()
+        session.info.setdefault(_CONNECTIONS, []).append(connection)
+        if fresh_engine:
+            # Записи до подключения слушателей движка не видны — считаем, что они были
+            connection.info[_WRITES] = True
+
+
+def has_uncommitted_writes(session) -> bool:
+    """
+    Есть ли в сессии (или AsyncSession) несброшенные изменения объектов или
+    выполненные, но не зафиксированные INSERT/UPDATE/DELETE
+    """
+    session = getattr(session, "sync_session", session)
+    if session.new or session.dirty or session.deleted:
+        return True
+    return any(connection.info.get(_WRITES) for connection in session.info.get(_CONNECTIONS, ()))
+
+
+class _Flight:
+    """
+    Загрузка одного ключа, которую ждут остальные промахи. Ждать можно из
+    любого потока (wait) и из любого цикла событий (wait_async): лидер будит
+    асинхронных ожидающих через call_soon_threadsafe их собственного цикла.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # Лидер прерван (KeyboardInterrupt, отмена задачи): ожидающие грузят сами
+        self.abandoned = False
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # Цикл ожидающего уже закрыт
+                pass
+
+    def wait(self):
+        self.done.wait()
+
+    async def wait_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return
+            self._waiters.append((loop, future))
+        await future
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        """
+        :param ttl: время жизни записи в секундах по умолчанию; None — бессрочно
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def _store(self, key, value, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        self._items[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _acquire(self, key):
+        """(запись, None, False) при попадании, иначе (None, загрузка, лидер ли вызывающий)"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry, None, False
+            self.misses += 1
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                return None, flight, True
+            return None, flight, False
+
+    def _land(self, key, flight, ttl):
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+                if flight.error is None and not flight.abandoned:
+                    self._store(key, flight.value, ttl)
+        flight.finish()
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Вернуть значение из кэша или загрузить его через loader().
+
+        Одновременные промахи по одному ключу выполняют loader один раз:
+        остальные ждут и получают тот же результат или исключение — в том
+        числе когда загрузку ведёт aget_or_load из другого потока. Если ключ
+        инвалидирован во время загрузки, результат отдаётся ожидающим, но в
+        кэш не попадает.
+        """
+        entry, flight, leader = self._acquire(key)
+        if entry is not None:
+            return entry[0]
+        if not leader:
+            flight.wait()
+            if flight.abandoned:
+                return self.get_or_load(key, loader, ttl)
+            return flight.result()
+
+        completed = False
+        try:
+            flight.value = loader()
+            completed = True
+        except Exception as error:
+            flight.error = error
+            completed = True
+            raise
+        finally:
+            flight.abandoned = not completed
+            self._land(key, flight, ttl)
+        return flight.value
+
+    async def aget_or_load(self, key, loader, ttl=None):
+        """get_or_load для asyncio: loader — корутинная функция"""
+        entry, flight, leader = self._acquire(key)
+        if entry is not None:
+            return entry[0]
+        if not leader:
+            await flight.wait_async()
+            if flight.abandoned:
+                return await self.aget_or_load(key, loader, ttl)
+            return flight.result()
+
+        completed = False
+        try:
+            flight.value = await loader()
+            completed = True
+        except Exception as error:
+            flight.error = error
+            completed = True
+            raise
+        finally:
+            flight.abandoned = not completed
+            self._land(key, flight, ttl)
+        return flight.value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._inflight.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._items),
+                "max_size": self.max_size,
+            }
+
+
+def detached_copy(obj):
+    """Отсоединённая копия загруженного ORM-объекта со значениями всех колонок"""
+    state = inspect(obj)
+    copy = state.mapper.class_manager.new_instance()
+    for attribute in state.mapper.column_attrs:
+        set_committed_value(copy, attribute.key, getattr(obj, attribute.key))
+    make_transient_to_detached(copy)
+    return copy
+
+
+class ScheduleReadCache:
+    """
+    Кэш результатов чтения расписаний, ключ — дата расписания и вид
+    результата ("schedule", "summary", "summary_with_voyages").
+
+    Для точной инвалидации кэш помнит, какой дате соответствует schedule_id;
+    соответствие заполняется при загрузке и при обработке событий.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self._cache = LRUCache(max_size, ttl=ttl)
+        self._kinds: set[str] = set()
+        self._dates_by_schedule: dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, kind, schedule_date, loader):
+        with self._lock:
+            self._kinds.add(kind)
+        return self._cache.get_or_load((kind, schedule_date), loader)
+
+    async def aget_or_load(self, kind, schedule_date, loader):
+        with self._lock:
+            self._kinds.add(kind)
+        return await self._cache.aget_or_load((kind, schedule_date), loader)
+
+    def remember(self, schedule_id, schedule_date):
+        with self._lock:
+            self._dates_by_schedule[schedule_id] = schedule_date
+
+    def date_of(self, schedule_id):
+        with self._lock:
+            return self._dates_by_schedule.get(schedule_id)
+
+    def invalidate_date(self, schedule_date):
+        with self._lock:
+            kinds = list(self._kinds)
+        for kind in kinds:
+            self._cache.invalidate((kind, schedule_date))
+
+    def invalidate_schedule(self, schedule_id):
+        """Сбросить записи расписания; если его дата неизвестна — весь кэш"""
+        with self._lock:
+            schedule_date = self._dates_by_schedule.pop(schedule_id, None)
+        if schedule_date is None:
+            self.clear()
+        else:
+            self.invalidate_date(schedule_date)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class ScheduleCacheInvalidator:
+    """
+    Подписчик на доменные события, сбрасывающий записи ScheduleReadCache
+    той даты, чьё расписание, рейсы, билеты или доступность изменились.
+    Дата рейса определяется одним запросом по первичному ключу.
+    """
+
+    def __init__(self, cache: ScheduleReadCache, engine):
+        self.cache = cache
+        self.engine = engine
+
+    def handlers(self):
+        return {event_type: self.handle for event_type in (
+            events.ScheduleCreated,
+            events.ScheduleDeleted,
+            events.VoyageAddedToSchedule,
+            events.TicketCreated,
+            events.TicketsAdded,
+            events.TicketStatusChanged,
+            events.AvailabilitySet,
+            events.SeatsBooked,
+            events.SeatsReleased,
+        )}
+
+    def register(self, queue):
+        for event_type, handler in self.handlers().items():
+            queue.register_handler(event_type, handler)
+
+    def handle(self, event):
+        if isinstance(event, events.ScheduleCreated):
+            self.cache.remember(event.schedule_id, event.schedule_date)
+            self.cache.invalidate_date(event.schedule_date)
+        elif isinstance(event, events.ScheduleDeleted):
+            self.cache.invalidate_schedule(event.schedule_id)
+        elif isinstance(event, events.VoyageAddedToSchedule):
+            self._invalidate_schedule_id(event.schedule_id)
+        elif hasattr(event, "voyage_id"):
+            self._invalidate_voyage(event.voyage_id)
+
+    def _invalidate_schedule_id(self, schedule_id):
+        schedule_date = self.cache.date_of(schedule_id)
+        if schedule_date is None:
+            with self.engine.connect() as conn:
+                schedule_date = conn.scalar(queries.schedule_date_by_id(schedule_id))
+        if schedule_date is None:
+            self.cache.clear()
+            return
+        self.cache.remember(schedule_id, schedule_date)
+        self.cache.invalidate_date(schedule_date)
+
+    def _invalidate_voyage(self, voyage_id):
+        with self.engine.connect() as conn:
+            row = conn.execute(queries.voyage_schedule(voyage_id)).first()
+        if row is None:
+            self.cache.clear()
+            return
+        self.cache.remember(row.schedule_id, row.schedule_date)
+        self.cache.invalidate_date(row.schedule_date)
+
+
+location_cache = LRUCache(max_size=Config.LOCATION_CACHE_SIZE)
+schedule_cache = ScheduleReadCache(
+    max_size=Config.SCHEDULE_CACHE_SIZE, ttl=Config.SCHEDULE_CACHE_TTL
+)
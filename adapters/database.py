@@ -0,0 +1,221 @@
+"""
+Единая фабрика движков и сессий, настраиваемая через config.Config.
+
+Database создаёт основной движок и движки реплик для чтения с общими
+параметрами пула и фабрики сессий для SQLAlchemyUnitOfWork:
+
+    db = Database()
+    with SQLAlchemyUnitOfWork(db.session_factory) as uow: ...
+    with SQLAlchemyUnitOfWork(db.read_session_factory, read_only=True) as uow: ...
+    async with AsyncSQLAlchemyUnitOfWork(db.async_session_factory) as uow: ...
+    async with AsyncSQLAlchemyUnitOfWork(db.async_read_session_factory) as uow: ...
+
+Асинхронные движки создаются лениво при первом обращении, с теми же
+параметрами пула; драйвер подставляется по схеме URL (postgresql → asyncpg,
+sqlite → aiosqlite), если он не указан явно. Их закрывает adispose().
+
+Пулы инструментированы: PoolStats собирает число выданных соединений,
+время ожидания свободного соединения и события переполнения.
+"""
+import itertools
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from schedule.config import Config
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self, overflow):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            if overflow:
+                self.overflow_events += 1
+
+    def record_checkin(self):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, замеряющий время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """InstrumentedQueuePool для движков create_async_engine"""
+
+
+# Драйвер asyncio по умолчанию для URL без явного драйвера
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _async_url(url):
+    url = make_url(url)
+    if "+" in url.drivername:
+        return url
+    return url.set(drivername=f"{url.drivername}+{_ASYNC_DRIVERS[url.drivername]}")
+
+
+def _track_checkouts(engine):
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+        pool.stats.record_checkout(overflow=pool.checkedout() > pool.size())
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        engine.pool.stats.record_checkin()
+
+
+class Database:
+    def __init__(self, config=Config):
+        self.config = config
+        self.engine = self._create_engine(config.DATABASE_URL)
+        self.replica_engines = [self._create_engine(url) for url in config.READ_REPLICA_URLS]
+        self.session_factory = sessionmaker(bind=self.engine)
+        self._read_session_factories = itertools.cycle(
+            [sessionmaker(bind=engine) for engine in self.replica_engines] or [self.session_factory]
+        )
+        self._read_lock = threading.Lock()
+        self.async_engine = None
+        self.async_replica_engines = []
+        self._async_session_factory = None
+        self._async_read_session_factories = None
+        self._async_lock = threading.Lock()
+
+    def _engine_options(self):
+        return {
+            "pool_size": self.config.DB_POOL_SIZE,
+            "max_overflow": self.config.DB_MAX_OVERFLOW,
+            "pool_timeout": self.config.DB_POOL_TIMEOUT,
+            "pool_pre_ping": self.config.DB_POOL_PRE_PING,
+            "pool_recycle": self.config.DB_POOL_RECYCLE,
+            "query_cache_size": self.config.DB_STATEMENT_CACHE_SIZE,
+        }
+
+    def _create_engine(self, url):
+        engine = create_engine(url, poolclass=InstrumentedQueuePool, **self._engine_options())
+        _track_checkouts(engine)
+        return engine
+
+    def _create_async_engine(self, url):
+        engine = create_async_engine(
+            _async_url(url), poolclass=InstrumentedAsyncQueuePool, **self._engine_options()
+        )
+        _track_checkouts(engine.sync_engine)
+        return engine
+
+    def _init_async(self):
+        with self._async_lock:
+            if self.async_engine is not None:
+                return
+            async_engine = self._create_async_engine(self.config.DATABASE_URL)
+            self.async_replica_engines = [
+                self._create_async_engine(url) for url in self.config.READ_REPLICA_URLS
+            ]
+            self._async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+            self._async_read_session_factories = itertools.cycle(
+                [async_sessionmaker(engine, expire_on_commit=False) for engine in self.async_replica_engines]
+                or [self._async_session_factory]
+            )
+            self.async_engine = async_engine
+
+    @property
+    def async_session_factory(self):
+        """async_sessionmaker основной базы для AsyncSQLAlchemyUnitOfWork"""
+        self._init_async()
+        return self._async_session_factory
+
+    def async_read_session_factory(self):
+        """AsyncSession на очередной реплике (по кругу) или на основной базе, если реплик нет"""
+        self._init_async()
+        with self._read_lock:
+            session_factory = next(self._async_read_session_factories)
+        return session_factory()
+
+    def read_session_factory(self):
+        """Сессия на очередной реплике (по кругу) или на основной базе, если реплик нет"""
+        with self._read_lock:
+            session_factory = next(self._read_session_factories)
+        return session_factory()
+
+    def pool_stats(self):
+        stats = {"primary": self._engine_stats(self.engine)}
+        for number, engine in enumerate(self.replica_engines):
+            stats[f"replica_{number}"] = self._engine_stats(engine)
+        if self.async_engine is not None:
+            stats["async_primary"] = self._engine_stats(self.async_engine.sync_engine)
+            for number, engine in enumerate(self.async_replica_engines):
+                stats[f"async_replica_{number}"] = self._engine_stats(engine.sync_engine)
+        return stats
+
+    def _engine_stats(self, engine):
+        return {
+            **engine.pool.stats.snapshot(),
+            "pool_size": engine.pool.size(),
+            "overflow": engine.pool.overflow(),
+        }
+
+    def dispose(self):
+        for engine in [self.engine, *self.replica_engines]:
+            engine.dispose()
+
+    async def adispose(self):
+        if self.async_engine is None:
+            return
+        for engine in [self.async_engine, *self.async_replica_engines]:
+            await engine.dispose()
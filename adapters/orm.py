@@ -1,9 +1,10 @@
-from sqlalchemy import Table, MetaData, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date
-from sqlalchemy.orm import mapper, relationship, clear_mappers
+from sqlalchemy import Table, MetaData, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date, Index
+from sqlalchemy.orm import registry, relationship, clear_mappers, joinedload, selectinload
 from schedule import domain
 
 
 metadata = MetaData()
+mapper_registry = registry(metadata=metadata)
 
 schedules = Table(
     "schedules",
@@ -32,6 +33,9 @@ voyages = Table(
     Column("marketing_number", Integer, nullable=False),
     Column("vehicle_number", String(255), nullable=False),
     Column("schedule_id", ForeignKey("schedules.id"), nullable=False),
+    Index("ix_voyages_origin_id", "origin_id"),
+    Index("ix_voyages_schedule_id", "schedule_id"),
+    Index("ix_voyages_dep_datetime_utc", "dep_datetime_utc"),
 )
 
 tickets = Table(
@@ -41,6 +45,7 @@ tickets = Table(
     Column("price", Float, nullable=False),
     Column("voyage_id", ForeignKey("voyages.voyage_id"), nullable=False),
     Column("is_active", Boolean, default=True),
+    Index("ix_tickets_voyage_id_is_active", "voyage_id", "is_active"),
 )
 
 availability = Table(
@@ -52,11 +57,52 @@ availability = Table(
     Column("is_active", Boolean, default=True),
 )
 
+# Денормализованная модель чтения для сводок: поддерживается проекцией
+# adapters/projections.py по доменным событиям и не отображается на классы.
+schedule_summaries = Table(
+    "schedule_summaries",
+    metadata,
+    Column("schedule_id", Integer, primary_key=True),
+    Column("schedule_date", Date, nullable=False, unique=True),
+    Column("total_voyages", Integer, nullable=False, default=0),
+    Column("total_tickets", Integer, nullable=False, default=0),
+    Column("total_seats", Integer, nullable=False, default=0),
+)
+
+voyage_loads = Table(
+    "voyage_loads",
+    metadata,
+    Column("voyage_id", Integer, primary_key=True),
+    Column("schedule_id", Integer, nullable=False),
+    Column("total_seats", Integer, nullable=False, default=0),
+    Column("sold_seats", Integer, nullable=False, default=0),
+    Column("remaining_seats", Integer, nullable=False, default=0),
+    Column("has_availability", Boolean, nullable=False, default=False),
+    Index("ix_voyage_loads_schedule_id", "schedule_id"),
+)
+
+# События, уже применённые проекцией: журнал очереди доставляет их хотя бы
+# раз, и повтор после сбоя не должен учитываться дважды
+projection_events = Table(
+    "projection_events",
+    metadata,
+    Column("event_id", String(32), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Пачки дельт, уже записанных SeatCounters (adapters/seat_counters.py) в
+# availability: по ним сверка при старте отличает применённые дельты журнала.
+seat_counter_flushes = Table(
+    "seat_counter_flushes",
+    metadata,
+    Column("batch_id", String(32), primary_key=True),
+)
+
 
 def start_mappers():
     clear_mappers()
 
-    mapper(
+    mapper_registry.map_imperatively(
         domain.Schedule,
         schedules,
         properties={
@@ -66,12 +112,12 @@ def start_mappers():
         },
     )
 
-    mapper(
+    mapper_registry.map_imperatively(
         domain.Location,
         locations,
     )
 
-    mapper(
+    mapper_registry.map_imperatively(
         domain.Voyage,
         voyages,
         properties={
@@ -83,7 +129,7 @@ def start_mappers():
         },
     )
 
-    mapper(
+    mapper_registry.map_imperatively(
         domain.Ticket,
         tickets,
         properties={
@@ -91,10 +137,42 @@ def start_mappers():
         },
     )
 
-    mapper(
+    mapper_registry.map_imperatively(
         domain.Availability,
         availability,
         properties={
             "voyage": relationship(domain.Voyage, back_populates="availability"),
         },
     )
+
+
+# Профили загрузки графа объектов рейса: атрибут Voyage -> стратегия загрузки.
+# "lazy" оставляет ленивую загрузку по умолчанию.
+LOADING_PROFILES = {
+    "lazy": {},
+    "summary": {
+        "availability": selectinload,
+    },
+    "full": {
+        "availability": selectinload,
+        "tickets": selectinload,
+        "origin": joinedload,
+        "destination": joinedload,
+    },
+}
+
+
+def voyage_loader_options(profile):
+    if profile not in LOADING_PROFILES:
+        raise ValueError(f"Unknown loading profile: {profile}")
+    return [
+        loader(getattr(domain.Voyage, attribute))
+        for attribute, loader in LOADING_PROFILES[profile].items()
+    ]
+
+
+def schedule_loader_options(profile):
+    voyage_options = voyage_loader_options(profile)
+    if not voyage_options:
+        return []
+    return [selectinload(domain.Schedule.voyages).options(*voyage_options)]
@@ -0,0 +1,193 @@
+"""
+Проекция доменных событий в денормализованную модель чтения: таблицы
+schedule_summaries (сводка по расписанию) и voyage_loads (загрузка рейса).
+
+Сервисы публикуют события после коммита через параметр events, например
+прямо в проекцию или в MessageQueue:
+
+    projection = ScheduleSummaryProjection(engine)
+    service = ScheduleService(..., events=projection.handle)
+    # или
+    projection.register(queue)
+    service = ScheduleService(..., events=queue.add_message)
+
+Каждое событие применяется отдельной транзакцией инкрементными UPDATE.
+Очередь с журналом доставляет события хотя бы раз, поэтому в той же
+транзакции event_id события записывается в projection_events, а повтор
+уже применённого события пропускается. Старые записи удаляет
+prune_applied(), когда журнал их событий уже не повторит.
+
+Модель чтения согласована в конечном счёте: если события терялись (или
+проекция подключена к уже наполненной базе), rebuild() пересчитывает обе
+таблицы с нуля по нормализованным таблицам.
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+
+from schedule.adapters import orm, queries
+from schedule.domain import events
+
+
+class ScheduleSummaryProjection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def handlers(self):
+        return {
+            events.ScheduleCreated: self._schedule_created,
+            events.ScheduleDeleted: self._schedule_deleted,
+            events.VoyageAddedToSchedule: self._voyage_added,
+            events.TicketCreated: self._ticket_created,
+            events.TicketsAdded: self._tickets_added,
+            events.TicketStatusChanged: self._ticket_status_changed,
+            events.AvailabilitySet: self._availability_set,
+            events.SeatsBooked: self._seats_booked,
+            events.SeatsReleased: self._seats_released,
+        }
+
+    def register(self, queue):
+        """Подписать проекцию на события в MessageQueue"""
+        for event_type in self.handlers():
+            queue.register_handler(event_type, self.handle)
+
+    def handle(self, event: events.Event):
+        handler = self.handlers()[type(event)]
+        with self.engine.begin() as conn:
+            if self._claim(conn, event):
+                handler(conn, event)
+
+    @staticmethod
+    def _claim(conn, event) -> bool:
+        """Отметить событие применённым; False — оно уже применялось"""
+        event_id = getattr(event, "event_id", None)
+        if event_id is None:
+            return True
+        applied = orm.projection_events.c
+        if conn.scalar(select(applied.event_id).where(applied.event_id == event_id)) is not None:
+            return False
+        conn.execute(insert(orm.projection_events).values(event_id=event_id, applied_at=datetime.utcnow()))
+        return True
+
+    def prune_applied(self, before: datetime) -> int:
+        """Забыть события, применённые раньше before; возвращает число удалённых"""
+        with self.engine.begin() as conn:
+            return conn.execute(
+                delete(orm.projection_events).where(orm.projection_events.c.applied_at < before)
+            ).rowcount
+
+    def rebuild(self):
+        """Пересчитать модель чтения с нуля одной транзакцией"""
+        with self.engine.begin() as conn:
+            conn.execute(delete(orm.schedule_summaries))
+            conn.execute(delete(orm.voyage_loads))
+            conn.execute(
+                insert(orm.voyage_loads).from_select(
+                    ["voyage_id", "schedule_id", "total_seats", "sold_seats", "remaining_seats",
+                     "has_availability"],
+                    queries.voyage_load_rows(),
+                )
+            )
+            conn.execute(
+                insert(orm.schedule_summaries).from_select(
+                    ["schedule_id", "schedule_date", "total_voyages", "total_tickets", "total_seats"],
+                    queries.schedule_summary_rows(),
+                )
+            )
+
+    def _schedule_created(self, conn, event: events.ScheduleCreated):
+        conn.execute(insert(orm.schedule_summaries).values(
+            schedule_id=event.schedule_id,
+            schedule_date=event.schedule_date,
+            total_voyages=0,
+            total_tickets=0,
+            total_seats=0,
+        ))
+
+    def _schedule_deleted(self, conn, event: events.ScheduleDeleted):
+        conn.execute(delete(orm.voyage_loads).where(orm.voyage_loads.c.schedule_id == event.schedule_id))
+        conn.execute(
+            delete(orm.schedule_summaries)
+            .where(orm.schedule_summaries.c.schedule_id == event.schedule_id)
+        )
+
+    def _voyage_added(self, conn, event: events.VoyageAddedToSchedule):
+        conn.execute(insert(orm.voyage_loads).values(
+            voyage_id=event.voyage_id,
+            schedule_id=event.schedule_id,
+            total_seats=0,
+            sold_seats=0,
+            remaining_seats=0,
+            has_availability=False,
+        ))
+        conn.execute(
+            update(orm.schedule_summaries)
+            .where(orm.schedule_summaries.c.schedule_id == event.schedule_id)
+            .values(total_voyages=orm.schedule_summaries.c.total_voyages + 1)
+        )
+
+    def _ticket_created(self, conn, event: events.TicketCreated):
+        if event.is_active:
+            self._add_sold_seats(conn, event.voyage_id, 1)
+
+    def _tickets_added(self, conn, event: events.TicketsAdded):
+        if event.active_count:
+            self._add_sold_seats(conn, event.voyage_id, event.active_count)
+
+    def _ticket_status_changed(self, conn, event: events.TicketStatusChanged):
+        self._add_sold_seats(conn, event.voyage_id, 1 if event.is_active else -1)
+
+    def _add_sold_seats(self, conn, voyage_id, delta):
+        conn.execute(
+            update(orm.voyage_loads)
+            .where(orm.voyage_loads.c.voyage_id == voyage_id)
+            .values(sold_seats=orm.voyage_loads.c.sold_seats + delta)
+        )
+        conn.execute(
+            update(orm.schedule_summaries)
+            .where(orm.schedule_summaries.c.schedule_id == self._schedule_of(voyage_id))
+            .values(total_tickets=orm.schedule_summaries.c.total_tickets + delta)
+        )
+
+    def _availability_set(self, conn, event: events.AvailabilitySet):
+        previous = conn.scalar(
+            select(orm.voyage_loads.c.total_seats)
+            .where(orm.voyage_loads.c.voyage_id == event.voyage_id)
+        ) or 0
+        total_seats = event.remaining_seats + event.bookings
+        conn.execute(
+            update(orm.voyage_loads)
+            .where(orm.voyage_loads.c.voyage_id == event.voyage_id)
+            .values(
+                total_seats=total_seats,
+                remaining_seats=event.remaining_seats,
+                has_availability=True,
+            )
+        )
+        conn.execute(
+            update(orm.schedule_summaries)
+            .where(orm.schedule_summaries.c.schedule_id == self._schedule_of(event.voyage_id))
+            .values(total_seats=orm.schedule_summaries.c.total_seats + total_seats - previous)
+        )
+
+    def _seats_booked(self, conn, event: events.SeatsBooked):
+        self._add_remaining_seats(conn, event.voyage_id, -event.seats)
+
+    def _seats_released(self, conn, event: events.SeatsReleased):
+        self._add_remaining_seats(conn, event.voyage_id, event.seats)
+
+    def _add_remaining_seats(self, conn, voyage_id, delta):
+        # Общее число мест при бронировании не меняется, только остаток
+        conn.execute(
+            update(orm.voyage_loads)
+            .where(orm.voyage_loads.c.voyage_id == voyage_id)
+            .values(remaining_seats=orm.voyage_loads.c.remaining_seats + delta)
+        )
+
+    @staticmethod
+    def _schedule_of(voyage_id):
+        return (
+            select(orm.voyage_loads.c.schedule_id)
+            .where(orm.voyage_loads.c.voyage_id == voyage_id)
+            .scalar_subquery()
+        )
@@ -0,0 +1,295 @@
+"""
+Построители SQL-запросов, общие для синхронных и асинхронных репозиториев.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import and_, bindparam, delete, func, or_, select, update
+
+from schedule.adapters import orm
+
+
+@dataclass
+class Page:
+    items: list
+    # Курсор для after следующей страницы; None — страниц больше нет
+    next_after: Any = None
+
+
+# Отправление не уникально, поэтому ключ страницы рейсов дополняется voyage_id
+DEPARTURE_KEYSET = [orm.voyages.c.dep_datetime_utc, orm.voyages.c.voyage_id]
+
+
+def keyset_page(statement, columns, after, limit):
+    """
+    Страница по ключу (seek): строки строго после курсора after в порядке
+    columns. Читается limit + 1 строка, чтобы узнать, есть ли продолжение.
+    Курсор — значение единственного ключа или кортеж значений по columns.
+    """
+    if after is not None:
+        values = after if isinstance(after, tuple) else (after,)
+        statement = statement.where(or_(*(
+            and_(*(column == value for column, value in zip(columns[:n], values[:n])),
+                 columns[n] > values[n])
+            for n in range(len(columns))
+        )))
+    return statement.order_by(*columns).limit(limit + 1)
+
+
+def page_of(items, columns, limit) -> Page:
+    """Page из результата keyset_page; курсор берётся из атрибутов последнего объекта"""
+    if len(items) <= limit:
+        return Page(list(items))
+    items = list(items[:limit])
+    cursor = tuple(getattr(items[-1], column.key) for column in columns)
+    return Page(items, cursor if len(cursor) > 1 else cursor[0])
+
+
+def location_points():
+    """Идентификаторы и координаты всех пунктов — для пространственного индекса"""
+    return select(orm.locations.c.id, orm.locations.c.latitude, orm.locations.c.longitude)
+
+
+def voyage_exists(voyage_id):
+    return select(orm.voyages.c.voyage_id).where(orm.voyages.c.voyage_id == voyage_id)
+
+
+def existing_voyage_ids(voyage_ids):
+    return select(orm.voyages.c.voyage_id).where(orm.voyages.c.voyage_id.in_(voyage_ids))
+
+
+def schedule_date_by_id(schedule_id):
+    return select(orm.schedules.c.schedule_date).where(orm.schedules.c.id == schedule_id)
+
+
+def voyage_schedule(voyage_id):
+    return (
+        select(orm.schedules.c.id.label("schedule_id"), orm.schedules.c.schedule_date)
+        .join(orm.voyages, orm.voyages.c.schedule_id == orm.schedules.c.id)
+        .where(orm.voyages.c.voyage_id == voyage_id)
+    )
+
+
+def connections(start, end):
+    """Рейсы с отправлением в [start, end) в порядке отправления — для ConnectionIndex"""
+    return (
+        select(
+            orm.voyages.c.voyage_id,
+            orm.voyages.c.origin_id,
+            orm.voyages.c.destination_id,
+            orm.voyages.c.dep_datetime_utc,
+            orm.voyages.c.arr_datetime_utc,
+        )
+        .where(orm.voyages.c.dep_datetime_utc >= start, orm.voyages.c.dep_datetime_utc < end)
+        .order_by(orm.voyages.c.dep_datetime_utc)
+    )
+
+
+def reserve_seats(voyage_id, seats):
+    """
+    Условное списание мест: строка обновляется, только если доступность
+    активна и мест хватает. Проверка и запись — одна операция в базе, поэтому
+    параллельные продажи не уводят remaining_seats ниже нуля.
+    """
+    availability = orm.availability.c
+    return (
+        update(orm.availability)
+        .where(
+            availability.voyage_id == voyage_id,
+            availability.is_active.is_(True),
+            availability.remaining_seats >= seats,
+        )
+        .values(
+            remaining_seats=availability.remaining_seats - seats,
+            bookings=availability.bookings + seats,
+        )
+        .returning(availability.remaining_seats)
+    )
+
+
+def release_seats(voyage_id, seats):
+    """Возврат мест: обратное reserve_seats, не больше уже проданных"""
+    availability = orm.availability.c
+    return (
+        update(orm.availability)
+        .where(availability.voyage_id == voyage_id, availability.bookings >= seats)
+        .values(
+            remaining_seats=availability.remaining_seats + seats,
+            bookings=availability.bookings - seats,
+        )
+        .returning(availability.remaining_seats)
+    )
+
+
+def seat_counter(voyage_id):
+    availability = orm.availability.c
+    return (
+        select(availability.remaining_seats, availability.bookings, availability.is_active)
+        .where(availability.voyage_id == voyage_id)
+    )
+
+
+def seat_counters_for_update(voyage_ids):
+    availability = orm.availability.c
+    return (
+        select(availability.voyage_id, availability.remaining_seats, availability.bookings)
+        .where(availability.voyage_id.in_(voyage_ids))
+        .with_for_update()
+    )
+
+
+def apply_seat_deltas():
+    """
+    Относительное списание для executemany: параметры b_voyage_id и seats.
+    Накопленная дельта складывается с текущим значением строки, а не
+    перезаписывает его; строка, чей остаток или число броней ушли бы ниже
+    нуля, не обновляется.
+    """
+    availability = orm.availability.c
+    return (
+        update(orm.availability)
+        .where(
+            availability.voyage_id == bindparam("b_voyage_id"),
+            availability.remaining_seats >= bindparam("seats"),
+            availability.bookings + bindparam("seats") >= 0,
+        )
+        .values(
+            remaining_seats=availability.remaining_seats - bindparam("seats"),
+            bookings=availability.bookings + bindparam("seats"),
+        )
+    )
+
+
+def schedule_ids(condition):
+    return select(orm.schedules.c.id).where(condition).with_for_update()
+
+
+def cascade_delete(condition):
+    """DELETE-запросы для расписаний, рейсов, билетов и доступности по условию на schedules"""
+    selected_schedules = select(orm.schedules.c.id).where(condition)
+    selected_voyages = select(orm.voyages.c.voyage_id).where(
+        orm.voyages.c.schedule_id.in_(selected_schedules)
+    )
+    return [
+        delete(orm.tickets).where(orm.tickets.c.voyage_id.in_(selected_voyages)),
+        delete(orm.availability).where(orm.availability.c.voyage_id.in_(selected_voyages)),
+        delete(orm.voyages).where(orm.voyages.c.schedule_id.in_(selected_schedules)),
+        delete(orm.schedules).where(condition),
+    ]
+
+
+def _active_tickets():
+    return (
+        select(func.count())
+        .where(
+            orm.tickets.c.voyage_id == orm.voyages.c.voyage_id,
+            orm.tickets.c.is_active.is_(True),
+        )
+        .scalar_subquery()
+    )
+
+
+def voyage_summaries(schedule_date):
+    active_tickets = _active_tickets()
+    return (
+        select(
+            orm.schedules.c.id.label("schedule_id"),
+            orm.schedules.c.schedule_date,
+            orm.voyages.c.voyage_id,
+            orm.voyages.c.dep_datetime_utc,
+            active_tickets.label("total_tickets"),
+            orm.availability.c.remaining_seats,
+            orm.availability.c.bookings,
+        )
+        .select_from(
+            orm.schedules
+            .outerjoin(orm.voyages, orm.voyages.c.schedule_id == orm.schedules.c.id)
+            .outerjoin(orm.availability, orm.availability.c.voyage_id == orm.voyages.c.voyage_id)
+        )
+        .where(orm.schedules.c.schedule_date == schedule_date)
+    )
+
+
+def schedule_summary(schedule_date):
+    summaries = voyage_summaries(schedule_date).subquery()
+    return (
+        select(
+            summaries.c.schedule_date,
+            func.count(summaries.c.voyage_id).label("total_voyages"),
+            func.coalesce(func.sum(summaries.c.total_tickets), 0).label("total_tickets"),
+            func.coalesce(
+                func.sum(summaries.c.remaining_seats + summaries.c.bookings), 0
+            ).label("total_seats"),
+        )
+        .group_by(summaries.c.schedule_id, summaries.c.schedule_date)
+    )
+
+
+def ordered_voyage_summaries(schedule_date):
+    return voyage_summaries(schedule_date).order_by(
+        orm.voyages.c.dep_datetime_utc, orm.voyages.c.voyage_id
+    )
+
+
+def voyage_load_rows():
+    """Строки модели чтения voyage_loads, посчитанные по нормализованным таблицам"""
+    return (
+        select(
+            orm.voyages.c.voyage_id,
+            orm.voyages.c.schedule_id,
+            func.coalesce(
+                orm.availability.c.remaining_seats + orm.availability.c.bookings, 0
+            ).label("total_seats"),
+            _active_tickets().label("sold_seats"),
+            func.coalesce(orm.availability.c.remaining_seats, 0).label("remaining_seats"),
+            orm.availability.c.voyage_id.is_not(None).label("has_availability"),
+        )
+        .select_from(
+            orm.voyages.outerjoin(
+                orm.availability, orm.availability.c.voyage_id == orm.voyages.c.voyage_id
+            )
+        )
+    )
+
+
+def schedule_summary_rows():
+    """Строки модели чтения schedule_summaries, посчитанные по уже заполненной voyage_loads"""
+    return (
+        select(
+            orm.schedules.c.id,
+            orm.schedules.c.schedule_date,
+            func.count(orm.voyage_loads.c.voyage_id),
+            func.coalesce(func.sum(orm.voyage_loads.c.sold_seats), 0),
+            func.coalesce(func.sum(orm.voyage_loads.c.total_seats), 0),
+        )
+        .select_from(
+            orm.schedules.outerjoin(
+                orm.voyage_loads, orm.voyage_loads.c.schedule_id == orm.schedules.c.id
+            )
+        )
+        .group_by(orm.schedules.c.id, orm.schedules.c.schedule_date)
+    )
+
+
+def voyage_load(voyage_id):
+    """Загрузка одного рейса по нормализованным таблицам, в колонках read_voyage_load"""
+    loads = voyage_load_rows().where(orm.voyages.c.voyage_id == voyage_id).subquery()
+    return select(loads.c.total_seats, loads.c.sold_seats, loads.c.remaining_seats, loads.c.has_availability)
+
+
+def read_schedule_summary(schedule_date):
+    return select(
+        orm.schedule_summaries.c.schedule_date,
+        orm.schedule_summaries.c.total_voyages,
+        orm.schedule_summaries.c.total_tickets,
+        orm.schedule_summaries.c.total_seats,
+    ).where(orm.schedule_summaries.c.schedule_date == schedule_date)
+
+
+def read_voyage_load(voyage_id):
+    return select(
+        orm.voyage_loads.c.total_seats,
+        orm.voyage_loads.c.sold_seats,
+        orm.voyage_loads.c.remaining_seats,
+        orm.voyage_loads.c.has_availability,
+    ).where(orm.voyage_loads.c.voyage_id == voyage_id)
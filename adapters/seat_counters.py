@@ -0,0 +1,359 @@
+"""
+Счётчики мест горячих рейсов в памяти процесса с отложенной записью в базу.
+
+Бронирование меняет только счётчик рейса под блокировкой его шарда: рейсы
+разложены по shards шардам, и продажи на разных рейсах почти не
+соревнуются за блокировку. Изменения копятся как дельты и периодически
+(start/flush) сливаются в availability одним executemany относительных
+UPDATE, поэтому горячая строка обновляется раз за период, а не на каждую
+продажу.
+
+Журнал дельт. Если передан CommandLog, каждая дельта пишется в него до
+ответа вызывающему. Перед записью пачки в журнал ложится запись FlushBatch
+с её идентификатором, а сам идентификатор вставляется в seat_counter_flushes
+той же транзакцией, что и дельты. reconcile() при старте повторяет только
+те неподтверждённые дельты, чьей пачки нет в базе, так что после сбоя
+ничего не теряется и не применяется дважды.
+
+Счётчики считают процесс единственным продавцом загруженных рейсов: продажи
+мимо них (book_seats другого процесса) база учтёт, но счётчик не увидит
+до forget(). Запись доступности через BufferedAvailabilityRepository
+сбрасывает счётчик рейса после коммита сама (forget_on_commit). Запись
+дельт не опускает остаток ниже нуля: дельты рейса, которые база не
+принимает, не подтверждаются в журнале, копятся в rejected и пишутся в лог
+с уровнем ERROR, а счётчик рейса перечитывается из базы.
+
+    with CommandLog(directory) as log:
+        counters = SeatCounters(engine, log=log)
+        counters.reconcile()
+        counters.start()
+        repo = BufferedAvailabilityRepository(session, counters)
+        ...
+        counters.stop()
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from schedule.adapters import orm, queries
+from schedule.config import Config
+
+logger = logging.getLogger(__name__)
+
+# session.info: пары (SeatCounters, voyage_id), чьи счётчики сбросить после коммита
+_FORGET = "seat_counters_forget"
+
+
+@dataclass(frozen=True)
+class SeatDelta:
+    voyage_id: int
+    seats: int
+
+
+@dataclass(frozen=True)
+class FlushBatch:
+    batch_id: str
+    seqs: tuple
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # voyage_id -> [remaining_seats, bookings, is_active]
+        self.counters: dict[int, list] = {}
+        # (номер записи журнала или None, voyage_id, дельта проданных мест)
+        self.pending: list[tuple] = []
+
+
+class SeatCounters:
+    def __init__(self, engine, log=None, shards=Config.SEAT_COUNTER_SHARDS):
+        """
+        :param log: необязательный CommandLog для дельт; без него дельты,
+            не успевшие попасть в базу, теряются при сбое
+        """
+        self.engine = engine
+        self.log = log
+        self._shards = [_Shard() for _ in range(shards)]
+        self._flush_lock = threading.Lock()
+        self._retired: list[str] = []
+        # Дельты, отклонённые базой: (номер записи журнала или None, voyage_id, места)
+        self.rejected: list[tuple] = []
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def _shard(self, voyage_id) -> _Shard:
+        return self._shards[hash(voyage_id) % len(self._shards)]
+
+    def _counter(self, shard, voyage_id):
+        """
+        Счётчик рейса, при первом обращении — из базы. Вызывается без
+        shard.lock: запрос не держит блокировку шарда, а _flush_lock не даёт
+        прочитать строку посреди записи пачки дельт.
+        """
+        with shard.lock:
+            counter = shard.counters.get(voyage_id)
+        if counter is not None:
+            return counter
+        with self._flush_lock:
+            with self.engine.connect() as conn:
+                row = conn.execute(queries.seat_counter(voyage_id)).first()
+        if row is None:
+            return None
+        with shard.lock:
+            counter = shard.counters.get(voyage_id)
+            if counter is None:
+                # Дельты рейса, ещё не записанные в базу, строка не содержит
+                unflushed = sum(seats for _, pending_id, seats in shard.pending if pending_id == voyage_id)
+                counter = shard.counters[voyage_id] = [
+                    row.remaining_seats - unflushed, row.bookings + unflushed, row.is_active
+                ]
+            return counter
+
+    def _change(self, voyage_id, seats):
+        """Применить дельту проданных мест к счётчику; None — дельта недопустима"""
+        shard = self._shard(voyage_id)
+        while True:
+            counter = self._counter(shard, voyage_id)
+            if counter is None:
+                return None
+            with shard.lock:
+                if shard.counters.get(voyage_id) is not counter:
+                    # Счётчик сбросили между загрузкой и блокировкой: берём свежий
+                    continue
+                if seats > 0 and (not counter[2] or counter[0] < seats):
+                    return None
+                if seats < 0 and counter[1] < -seats:
+                    return None
+                counter[0] -= seats
+                counter[1] += seats
+                remaining = counter[0]
+                if self.log is None:
+                    shard.pending.append((None, voyage_id, seats))
+                    return remaining
+                break
+
+        try:
+            seq = self.log.append(SeatDelta(voyage_id, seats))
+        except Exception:
+            with shard.lock:
+                counter[0] += seats
+                counter[1] -= seats
+            raise
+        with shard.lock:
+            shard.pending.append((seq, voyage_id, seats))
+        return remaining
+
+    def reserve(self, voyage_id, seats):
+        """Списать места; возвращает остаток или None, если мест не хватило"""
+        return self._change(voyage_id, seats)
+
+    def release(self, voyage_id, seats):
+        """Вернуть места; возвращает остаток или None, если вернуть нечего"""
+        return self._change(voyage_id, -seats)
+
+    def remaining(self, voyage_id):
+        shard = self._shard(voyage_id)
+        counter = self._counter(shard, voyage_id)
+        if counter is None:
+            return None
+        with shard.lock:
+            return counter[0]
+
+    def forget(self, voyage_id):
+        """Записать накопленное и перечитать счётчик рейса из базы при следующем обращении"""
+        self.flush()
+        shard = self._shard(voyage_id)
+        with shard.lock:
+            shard.counters.pop(voyage_id, None)
+
+    def forget_on_commit(self, session, voyage_id):
+        """
+        Доступность рейса записывается в session мимо счётчиков: накопленные
+        дельты уходят в базу сейчас, а счётчик сбрасывается после коммита.
+        """
+        self.flush()
+        session.info.setdefault(_FORGET, set()).add((self, voyage_id))
+
+    def flush(self) -> int:
+        """Слить накопленные дельты в availability; возвращает их число"""
+        with self._flush_lock:
+            entries = []
+            for shard in self._shards:
+                with shard.lock:
+                    entries.extend(shard.pending)
+                    shard.pending = []
+            if not entries:
+                return 0
+            try:
+                self._apply(entries)
+            except Exception:
+                for entry in entries:
+                    shard = self._shard(entry[1])
+                    with shard.lock:
+                        shard.pending.append(entry)
+                raise
+            return len(entries)
+
+    def _apply(self, entries):
+        totals = defaultdict(int)
+        for _, voyage_id, seats in entries:
+            totals[voyage_id] += seats
+        totals = {voyage_id: seats for voyage_id, seats in totals.items() if seats}
+
+        batch_id = batch_seq = None
+        try:
+            with self.engine.begin() as conn:
+                rejected = self._check(conn, totals) if totals else set()
+                rows = [
+                    {"b_voyage_id": voyage_id, "seats": seats}
+                    for voyage_id, seats in totals.items()
+                    if voyage_id not in rejected
+                ]
+                if rows:
+                    result = conn.execute(queries.apply_seat_deltas(), rows)
+                    if result.supports_sane_multi_rowcount() and result.rowcount != len(rows):
+                        # Строку изменили между проверкой и UPDATE: пачка откатывается и повторится
+                        raise RuntimeError("Availability changed during a seat delta flush")
+                accepted = [entry for entry in entries if entry[1] not in rejected]
+                seqs = tuple(seq for seq, _, _ in accepted if seq is not None)
+                if self.log is not None:
+                    batch_id = uuid.uuid4().hex
+                    batch_seq = self.log.append(FlushBatch(batch_id, seqs))
+                    conn.execute(insert(orm.seat_counter_flushes).values(batch_id=batch_id))
+                if self._retired:
+                    conn.execute(
+                        delete(orm.seat_counter_flushes)
+                        .where(orm.seat_counter_flushes.c.batch_id.in_(self._retired))
+                    )
+        except Exception:
+            if batch_seq is not None:
+                # Пачки нет в базе: при сверке её дельты будут повторены
+                self.log.ack(batch_seq)
+            raise
+        self._retired = []
+        if rejected:
+            self._reject([entry for entry in entries if entry[1] in rejected], totals)
+
+        if self.log is not None:
+            for seq in seqs:
+                self.log.ack(seq)
+            self.log.ack(batch_seq)
+            self.log.flush()
+            # ACK на диске: запись о пачке больше не нужна сверке
+            self._retired.append(batch_id)
+
+    def _check(self, conn, totals):
+        """
+        Рейсы, чью дельту база не примет: остаток или число броней ушли бы
+        ниже нуля либо строки нет. Строки блокируются до конца транзакции
+        (FOR UPDATE), так что проверка и UPDATE видят одно состояние.
+        """
+        current = {
+            row.voyage_id: row
+            for row in conn.execute(queries.seat_counters_for_update(list(totals)))
+        }
+        rejected = set()
+        for voyage_id, seats in totals.items():
+            row = current.get(voyage_id)
+            if row is None or row.remaining_seats < seats or row.bookings + seats < 0:
+                rejected.add(voyage_id)
+        return rejected
+
+    def _reject(self, entries, totals):
+        """
+        Дельты, которые база отклонила, не подтверждаются в журнале (сверка
+        при старте попробует их снова) и копятся в self.rejected для разбора.
+        Значит, кто-то писал доступность мимо счётчиков: уже подтверждённые
+        продажи не помещаются в базу. Счётчики этих рейсов перечитываются.
+        """
+        voyage_ids = sorted({voyage_id for _, voyage_id, _ in entries})
+        self.rejected.extend(entries)
+        logger.error(
+            "Seat delta flush rejected %s for voyages %s; deltas kept unacknowledged",
+            {voyage_id: totals[voyage_id] for voyage_id in voyage_ids}, voyage_ids,
+        )
+        for voyage_id in voyage_ids:
+            shard = self._shard(voyage_id)
+            with shard.lock:
+                shard.counters.pop(voyage_id, None)
+
+    def reconcile(self) -> int:
+        """
+        Сверка при старте: применить неподтверждённые дельты журнала, которых
+        ещё нет в базе, и сбросить счётчики. Возвращает число повторённых дельт.
+        """
+        with self._flush_lock:
+            for shard in self._shards:
+                with shard.lock:
+                    shard.counters.clear()
+            if self.log is None:
+                return 0
+
+            records = self.log.replay()
+            deltas = {seq: record for seq, record in records if isinstance(record, SeatDelta)}
+            batches = [(seq, record) for seq, record in records if isinstance(record, FlushBatch)]
+            applied = set()
+            if batches:
+                with self.engine.connect() as conn:
+                    applied = set(conn.scalars(
+                        select(orm.seat_counter_flushes.c.batch_id)
+                        .where(orm.seat_counter_flushes.c.batch_id.in_([b.batch_id for _, b in batches]))
+                    ))
+
+            done = []
+            for seq, batch in batches:
+                done.append(seq)
+                if batch.batch_id in applied:
+                    for delta_seq in batch.seqs:
+                        if deltas.pop(delta_seq, None) is not None:
+                            done.append(delta_seq)
+                    self._retired.append(batch.batch_id)
+            for seq in done:
+                self.log.ack(seq)
+
+            replayed = [(seq, delta.voyage_id, delta.seats) for seq, delta in sorted(deltas.items())]
+            if replayed:
+                self._apply(replayed)
+                logger.info("Replayed %d seat deltas from the log", len(replayed))
+            else:
+                self.log.flush()
+            return len(replayed)
+
+    def start(self, interval=Config.SEAT_COUNTER_FLUSH_SECONDS):
+        """Запустить фоновую запись дельт раз в interval секунд"""
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, args=(interval,), daemon=True, name="seat-counter-flusher"
+        )
+        self._flusher.start()
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Seat counter flush failed; deltas kept for the next attempt")
+
+    def stop(self):
+        """Остановить фоновую запись и слить оставшиеся дельты"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed(session):
+    for counters, voyage_id in session.info.pop(_FORGET, ()):
+        counters.forget(voyage_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_forget(session):
+    session.info.pop(_FORGET, None)
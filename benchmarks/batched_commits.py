@@ -0,0 +1,85 @@
+"""
+Пропускная способность сервисного слоя при пакетной фиксации транзакций:
+N вызовов TicketService.create_ticket через BatchingUnitOfWork с разными
+размерами пачки, на файловой SQLite (каждая фиксация — fsync).
+
+Запуск: python -m schedule.benchmarks.batched_commits [количество операций]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import clear_mappers, sessionmaker
+
+from schedule.adapters import orm
+from schedule.service.services import TicketService
+from schedule.service.uow import BatchingUnitOfWork
+
+BATCH_SIZES = [1, 10, 100, 1000]
+
+
+def prepare_database(path):
+    engine = create_engine(f"sqlite:///{path}")
+
+    # pysqlite сам откладывает BEGIN, и первый SAVEPOINT открывает транзакцию,
+    # которую RELEASE тут же фиксирует. Рецепт из документации SQLAlchemy:
+    # отключить встроенное управление транзакциями драйвера и выдавать BEGIN самим.
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    orm.metadata.create_all(engine)
+    departure = datetime(2024, 12, 31, 10, 0)
+    with engine.begin() as conn:
+        conn.execute(insert(orm.locations), [
+            {"id": 1, "title": "City A", "latitude": 40.7128, "longitude": -74.0060},
+            {"id": 2, "title": "City B", "latitude": 34.0522, "longitude": -118.2437},
+        ])
+        conn.execute(insert(orm.schedules).values(id=1, schedule_date=departure.date()))
+        conn.execute(insert(orm.voyages).values(
+            voyage_id=1,
+            dep_datetime_utc=departure,
+            arr_datetime_utc=departure + timedelta(hours=2),
+            origin_id=1,
+            destination_id=2,
+            marketing_number=123,
+            vehicle_number="VH123",
+            schedule_id=1,
+        ))
+    return engine
+
+
+def run(engine, operations, batch_size):
+    started = time.perf_counter()
+    with BatchingUnitOfWork(sessionmaker(engine), batch_size=batch_size) as uow:
+        service = TicketService(uow.session, uow.tickets, uow.voyages)
+        for n in range(operations):
+            uow.run(service.create_ticket, voyage_id=1, price=100.0 + n % 50)
+        commits = uow.commits
+    return time.perf_counter() - started, commits
+
+
+def main(operations=2_000):
+    orm.start_mappers()
+    try:
+        print(f"{operations} create_ticket operations")
+        print(f"{'batch':>6}{'commits':>10}{'seconds':>10}{'ops/s':>12}")
+        for batch_size in BATCH_SIZES:
+            with tempfile.TemporaryDirectory() as directory:
+                engine = prepare_database(Path(directory) / "bench.db")
+                elapsed, commits = run(engine, operations, batch_size)
+                engine.dispose()
+            print(f"{batch_size:>6}{commits:>10}{elapsed:>10.2f}{operations / elapsed:>12,.0f}")
+    finally:
+        clear_mappers()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
@@ -0,0 +1,87 @@
+"""
+Память и скорость создания доменных объектов: классы из model.py
+против компактных слотовых представлений из compact.py.
+
+Запуск: python -m schedule.benchmarks.domain_memory [количество объектов]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from schedule.domain.compact import (
+    CompactAvailability,
+    CompactLocation,
+    CompactTicket,
+    CompactVoyage,
+)
+from schedule.domain.model import Availability, Location, Ticket, Voyage
+
+START = datetime(2024, 12, 31, 0, 0)
+
+
+def make_locations(cls, count):
+    return [cls(title=f"City {i}", coordinates=(i * 0.5, i * -0.5)) for i in range(count)]
+
+
+def make_tickets(cls, count, _):
+    return [cls(ticket_id=i, price=100.0 + i % 50, voyage_id=i % 1000, is_active=True) for i in range(count)]
+
+
+def make_availability(cls, count, _):
+    return [cls(voyage_id=i, remaining_seats=40, bookings=i % 40, is_active=True) for i in range(count)]
+
+
+def make_voyages(cls, count, locations):
+    return [
+        cls(
+            voyage_id=i,
+            dep_datetime_utc=START,
+            arr_datetime_utc=START + timedelta(hours=2),
+            origin=locations[i % len(locations)],
+            destination=locations[(i + 1) % len(locations)],
+            marketing_number=i,
+            vehicle_number="VH123",
+        )
+        for i in range(count)
+    ]
+
+
+def measure(factory, cls, count, extra=None):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = factory(cls, count, extra) if extra is not None else factory(cls, count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Память списка-контейнера не относится к самим объектам
+    bytes_per_object = (after - before - sys.getsizeof(objects)) / count
+
+    started = time.perf_counter()
+    factory(cls, count, extra) if extra is not None else factory(cls, count)
+    elapsed = time.perf_counter() - started
+    return bytes_per_object, count / elapsed
+
+
+def main(count=200_000):
+    locations = make_locations(Location, 100)
+    compact_locations = make_locations(CompactLocation, 100)
+    cases = [
+        ("Location", make_locations, Location, CompactLocation, None, None),
+        ("Ticket", make_tickets, Ticket, CompactTicket, 0, 0),
+        ("Voyage", make_voyages, Voyage, CompactVoyage, locations, compact_locations),
+        ("Availability", make_availability, Availability, CompactAvailability, 0, 0),
+    ]
+
+    print(f"{count} objects per type")
+    print(f"{'type':<14}{'variant':<10}{'bytes/obj':>12}{'objects/s':>14}")
+    for name, factory, domain_cls, compact_cls, domain_extra, compact_extra in cases:
+        for variant, cls, extra in (
+            ("domain", domain_cls, domain_extra),
+            ("compact", compact_cls, compact_extra),
+        ):
+            bytes_per_object, throughput = measure(factory, cls, count, extra)
+            print(f"{name:<14}{variant:<10}{bytes_per_object:>12.1f}{throughput:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,54 @@
+"""
+Пропускная способность MessageQueue с журналом на диске при разных окнах
+группового коммита. Производители пишут команды параллельно, каждый ждёт
+fsync своей команды; окно 0 — fsync на каждую команду.
+
+Запуск: python -m schedule.benchmarks.durable_queue [сообщений] [производителей]
+"""
+import sys
+import tempfile
+import threading
+import time
+
+from schedule.domain.commands import CreateTicketCommand
+from schedule.local_queue.durable_log import CommandLog
+from schedule.local_queue.local_queue import MessageQueue
+
+WINDOWS_MS = [0, 0.5, 1, 2, 5, 10]
+
+
+def run(messages, producers, window_ms):
+    with tempfile.TemporaryDirectory() as directory, CommandLog(directory, group_commit_ms=window_ms) as log:
+        queue = MessageQueue(log=log)
+        per_producer = messages // producers
+
+        def produce(producer):
+            for n in range(per_producer):
+                queue.add_message(CreateTicketCommand(voyage_id=producer, price=float(n)))
+
+        threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return per_producer * producers, elapsed, log.fsyncs
+
+
+def main(messages=5_000, producers=16):
+    print(f"{messages} messages, {producers} producers")
+    print(f"{'window, ms':>10}{'fsyncs':>10}{'msg/fsync':>11}{'seconds':>10}{'msg/s':>12}")
+    for window_ms in WINDOWS_MS:
+        written, elapsed, fsyncs = run(messages, producers, window_ms)
+        print(
+            f"{window_ms:>10}{fsyncs:>10}{written / fsyncs:>11.1f}"
+            f"{elapsed:>10.2f}{written / elapsed:>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+    )
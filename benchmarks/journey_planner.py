@@ -0,0 +1,59 @@
+"""
+Построение ConnectionIndex и поиск маршрутов на синтетической сети рейсов:
+случайные рейсы между пунктами в течение суток.
+
+Запуск: python -m schedule.benchmarks.journey_planner [рейсов] [пунктов] [запросов]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from schedule.domain.journeys import ConnectionIndex, JourneyPlanner
+
+START = datetime(2024, 12, 31)
+
+
+def make_connections(voyages, stops, rng):
+    for voyage_id in range(voyages):
+        origin, destination = rng.sample(range(stops), 2)
+        departure = START + timedelta(minutes=rng.randrange(0, 24 * 60))
+        yield voyage_id, origin, destination, departure, departure + timedelta(minutes=rng.randrange(30, 300))
+
+
+def main(voyages=100_000, stops=1_000, queries=200):
+    rng = random.Random(42)
+    connections = list(make_connections(voyages, stops, rng))
+
+    started = time.perf_counter()
+    index = ConnectionIndex(connections)
+    build_seconds = time.perf_counter() - started
+    planner = JourneyPlanner(index, min_transfer=timedelta(minutes=20))
+    print(f"{index!r}: built in {build_seconds:.2f} s")
+
+    requests = [
+        (*rng.sample(range(stops), 2), START + timedelta(minutes=rng.randrange(0, 12 * 60)))
+        for _ in range(queries)
+    ]
+    print(f"{'search':<18}{'ms/query':>10}{'found':>8}{'avg legs':>10}")
+    for name, search in (
+        ("earliest_arrival", planner.earliest_arrival),
+        ("fewest_transfers", planner.fewest_transfers),
+    ):
+        found = []
+        started = time.perf_counter()
+        for origin, destination, depart_after in requests:
+            itinerary = search(origin, destination, depart_after)
+            if itinerary is not None:
+                found.append(len(itinerary.legs))
+        elapsed = time.perf_counter() - started
+        average_legs = sum(found) / len(found) if found else 0.0
+        print(f"{name:<18}{elapsed / queries * 1000:>10.2f}{len(found):>8}{average_legs:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1_000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 200,
+    )
@@ -0,0 +1,48 @@
+"""
+Последовательная обработка MessageQueue против пула потоков с
+упорядочиванием по voyage_id. Обработчик имитирует обращение к базе
+ожиданием ввода-вывода заданной длительности.
+
+Запуск: python -m schedule.benchmarks.queue_workers [сообщений] [задержка, мс]
+"""
+import sys
+import time
+
+from schedule.domain.commands import CreateTicketCommand
+from schedule.local_queue.local_queue import MessageQueue
+
+WORKERS = [1, 2, 4, 8, 16]
+
+
+def make_queue(messages, io_delay):
+    queue = MessageQueue()
+    queue.register_handler(CreateTicketCommand, lambda command: time.sleep(io_delay))
+    for n in range(messages):
+        queue.add_message(CreateTicketCommand(voyage_id=n % 100, price=100.0))
+    return queue
+
+
+def main(messages=2_000, io_delay_ms=1.0):
+    io_delay = io_delay_ms / 1000
+    print(f"{messages} messages, {io_delay_ms} ms simulated I/O per message")
+    print(f"{'mode':<12}{'seconds':>10}{'msg/s':>12}")
+
+    queue = make_queue(messages, io_delay)
+    started = time.perf_counter()
+    queue.process_messages()
+    elapsed = time.perf_counter() - started
+    print(f"{'serial':<12}{elapsed:>10.2f}{messages / elapsed:>12,.0f}")
+
+    for workers in WORKERS:
+        queue = make_queue(messages, io_delay)
+        started = time.perf_counter()
+        queue.process_messages_parallel(workers=workers)
+        elapsed = time.perf_counter() - started
+        print(f"{f'{workers} workers':<12}{elapsed:>10.2f}{messages / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2_000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+    )
@@ -0,0 +1,173 @@
+"""
+Конкурентные продажи мест на «горячих» рейсах. Потоки бронируют по одному
+месту на случайном рейсе, пока все рейсы не распроданы; после прогона
+проданное сверяется с числом мест и с bookings в базе. Режимы:
+
+- read-modify-write — прочитать остаток и записать уменьшенное значение
+  из приложения (как с set_availability); под нагрузкой продаёт лишнее;
+- guarded — AvailabilityService.book_seats, один условный UPDATE;
+- guarded batch — book_seats_batch пачками по BATCH заявок на коммит;
+- counters — book_seats через SeatCounters (adapters/seat_counters.py):
+  счётчики в памяти, запись в базу раз в FLUSH_SECONDS.
+
+База — файл SQLite во временном каталоге, либо URL из аргумента.
+
+Запуск: python -m schedule.benchmarks.seat_booking [потоков] [мест на рейс] [рейсов] [url]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from schedule.adapters import Repos, orm
+from schedule.adapters.seat_counters import SeatCounters
+from schedule.service.services import AvailabilityService
+
+BATCH = 10
+FLUSH_SECONDS = 0.05
+
+
+def prepare(engine, voyages, seats):
+    orm.metadata.drop_all(engine)
+    orm.metadata.create_all(engine)
+    departure = datetime(2024, 12, 31, 8)
+    with engine.begin() as conn:
+        conn.execute(insert(orm.locations), [
+            {"id": 1, "title": "City A", "latitude": 55.75, "longitude": 37.62},
+            {"id": 2, "title": "City B", "latitude": 59.93, "longitude": 30.34},
+        ])
+        schedule_id = conn.execute(
+            insert(orm.schedules).values(schedule_date=date(2024, 12, 31))
+        ).inserted_primary_key[0]
+        conn.execute(insert(orm.voyages), [
+            {
+                "voyage_id": voyage_id, "dep_datetime_utc": departure, "arr_datetime_utc": departure,
+                "origin_id": 1, "destination_id": 2, "marketing_number": voyage_id,
+                "vehicle_number": f"VH{voyage_id}", "schedule_id": schedule_id,
+            }
+            for voyage_id in range(1, voyages + 1)
+        ])
+        conn.execute(insert(orm.availability), [
+            {"voyage_id": voyage_id, "remaining_seats": seats, "bookings": 0, "is_active": True}
+            for voyage_id in range(1, voyages + 1)
+        ])
+
+
+def book_read_modify_write(session, voyage_id):
+    availability = orm.availability.c
+    row = session.execute(
+        select(availability.remaining_seats, availability.bookings)
+        .where(availability.voyage_id == voyage_id)
+    ).first()
+    if row.remaining_seats < 1:
+        session.rollback()
+        return 0
+    session.execute(
+        update(orm.availability)
+        .where(availability.voyage_id == voyage_id)
+        .values(remaining_seats=row.remaining_seats - 1, bookings=row.bookings + 1)
+    )
+    session.commit()
+    return 1
+
+
+def worker(engine, mode, voyages, sold, errors, counters=None):
+    rng = random.Random()
+    open_voyages = list(range(1, voyages + 1))
+    count = 0
+    with Session(engine) as session:
+        availability_repo = (
+            Repos.BufferedAvailabilityRepository(session, counters) if counters is not None
+            else Repos.AvailabilityRepository(session)
+        )
+        service = AvailabilityService(session, availability_repo, Repos.VoyageRepository(session))
+        while open_voyages:
+            try:
+                if mode == "read-modify-write":
+                    voyage_id = rng.choice(open_voyages)
+                    booked = book_read_modify_write(session, voyage_id)
+                    if not booked:
+                        open_voyages.remove(voyage_id)
+                    count += booked
+                elif mode in ("guarded", "counters"):
+                    voyage_id = rng.choice(open_voyages)
+                    try:
+                        service.book_seats(voyage_id)
+                        count += 1
+                    except ValueError:
+                        open_voyages.remove(voyage_id)
+                else:
+                    items = [{"voyage_id": rng.choice(open_voyages), "seats": 1} for _ in range(BATCH)]
+                    for item, remaining in zip(items, service.book_seats_batch(items)):
+                        if remaining is not None:
+                            count += 1
+                        elif item["voyage_id"] in open_voyages:
+                            open_voyages.remove(item["voyage_id"])
+            except Exception:
+                # Блокировки и сериализационные ошибки базы — повторяем заявку
+                session.rollback()
+                errors.append(1)
+    sold.append(count)
+
+
+def run(engine, mode, threads, seats, voyages):
+    prepare(engine, voyages, seats)
+    sold, errors = [], []
+    counters = None
+    if mode == "counters":
+        counters = SeatCounters(engine)
+        counters.start(FLUSH_SECONDS)
+    workers = [
+        threading.Thread(target=worker, args=(engine, mode, voyages, sold, errors, counters))
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if counters is not None:
+        counters.stop()
+    elapsed = time.perf_counter() - started
+    with engine.connect() as conn:
+        recorded = conn.scalar(select(func.sum(orm.availability.c.bookings)))
+        negative = conn.scalar(
+            select(func.count()).select_from(orm.availability).where(orm.availability.c.remaining_seats < 0)
+        )
+    return sum(sold), recorded, negative, len(errors), elapsed
+
+
+def main(threads=8, seats=500, voyages=4, url=None):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            url or f"sqlite:///{os.path.join(directory, 'booking.db')}",
+            connect_args={} if url else {"timeout": 30},
+        )
+        capacity = seats * voyages
+        print(f"{threads} threads, {voyages} hot voyages x {seats} seats = {capacity} seats")
+        print(
+            f"{'mode':<18}{'sold':>7}{'in db':>7}{'oversold':>10}{'negative':>10}"
+            f"{'retries':>9}{'seconds':>9}{'bookings/s':>12}"
+        )
+        for mode in ("read-modify-write", "guarded", "guarded batch", "counters"):
+            sold, recorded, negative, retries, elapsed = run(engine, mode, threads, seats, voyages)
+            print(
+                f"{mode:<18}{sold:>7}{recorded:>7}{max(sold - capacity, 0):>10}{negative:>10}"
+                f"{retries:>9}{elapsed:>9.2f}{recorded / elapsed:>12,.0f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 4,
+        sys.argv[4] if len(sys.argv) > 4 else None,
+    )
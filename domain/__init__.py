@@ -5,6 +5,12 @@ from .model import (
     Availability,
     Schedule,
 )
+from .compact import (
+    CompactLocation,
+    CompactTicket,
+    CompactVoyage,
+    CompactAvailability,
+)
 
 
 __all__ = [
@@ -13,4 +19,8 @@ __all__ = [
     "Voyage",
     "Availability",
     "Schedule",
+    "CompactLocation",
+    "CompactTicket",
+    "CompactVoyage",
+    "CompactAvailability",
 ]
@@ -0,0 +1,176 @@
+from typing import Iterable
+
+import numpy as np
+
+from .model import Location, Schedule
+
+
+class ScheduleSnapshot:
+    """
+    Колоночный снимок одного или нескольких расписаний.
+
+    Рейсы, доступность и билеты хранятся параллельными массивами NumPy,
+    поэтому аналитика по всем рейсам считается векторно, без обхода
+    объектов Voyage/Ticket/Availability. Пункты отправления и назначения
+    хранятся индексами в кортеже `locations`.
+    """
+
+    def __init__(
+        self,
+        voyage_id: np.ndarray,
+        dep_datetime_utc: np.ndarray,
+        arr_datetime_utc: np.ndarray,
+        origin_idx: np.ndarray,
+        destination_idx: np.ndarray,
+        locations: tuple[Location, ...],
+        remaining_seats: np.ndarray,
+        bookings: np.ndarray,
+        has_availability: np.ndarray,
+        ticket_price: np.ndarray,
+        ticket_voyage_id: np.ndarray,
+        ticket_is_active: np.ndarray,
+    ):
+        self.voyage_id = voyage_id
+        self.dep_datetime_utc = dep_datetime_utc
+        self.arr_datetime_utc = arr_datetime_utc
+        self.origin_idx = origin_idx
+        self.destination_idx = destination_idx
+        self.locations = locations
+        self.remaining_seats = remaining_seats
+        self.bookings = bookings
+        self.has_availability = has_availability
+        self.ticket_price = ticket_price
+        self.ticket_voyage_id = ticket_voyage_id
+        self.ticket_is_active = ticket_is_active
+
+    @classmethod
+    def from_schedule(cls, schedule: Schedule) -> "ScheduleSnapshot":
+        return cls.from_schedules([schedule])
+
+    @classmethod
+    def from_schedules(cls, schedules: Iterable[Schedule]) -> "ScheduleSnapshot":
+        voyage_id, dep, arr, origin_idx, destination_idx = [], [], [], [], []
+        remaining_seats, bookings, has_availability = [], [], []
+        ticket_price, ticket_voyage_id, ticket_is_active = [], [], []
+        location_codes: dict[Location, int] = {}
+
+        for schedule in schedules:
+            for voyage in schedule.voyages.values():
+                voyage_id.append(voyage.voyage_id)
+                dep.append(voyage.dep_datetime_utc)
+                arr.append(voyage.arr_datetime_utc)
+                origin_idx.append(location_codes.setdefault(voyage.origin, len(location_codes)))
+                destination_idx.append(
+                    location_codes.setdefault(voyage.destination, len(location_codes))
+                )
+                availability = schedule.availability.get(voyage.voyage_id)
+                remaining_seats.append(availability.remaining_seats if availability else 0)
+                bookings.append(availability.bookings if availability else 0)
+                has_availability.append(availability is not None)
+
+            for ticket in schedule.tickets.values():
+                ticket_price.append(ticket.price)
+                ticket_voyage_id.append(ticket.voyage_id)
+                ticket_is_active.append(bool(ticket.is_active))
+
+        return cls(
+            voyage_id=np.array(voyage_id, dtype=np.int64),
+            dep_datetime_utc=np.array(dep, dtype="datetime64[us]"),
+            arr_datetime_utc=np.array(arr, dtype="datetime64[us]"),
+            origin_idx=np.array(origin_idx, dtype=np.int64),
+            destination_idx=np.array(destination_idx, dtype=np.int64),
+            locations=tuple(location_codes),
+            remaining_seats=np.array(remaining_seats, dtype=np.int64),
+            bookings=np.array(bookings, dtype=np.int64),
+            has_availability=np.array(has_availability, dtype=bool),
+            ticket_price=np.array(ticket_price, dtype=np.float64),
+            ticket_voyage_id=np.array(ticket_voyage_id, dtype=np.int64),
+            ticket_is_active=np.array(ticket_is_active, dtype=bool),
+        )
+
+    def __len__(self):
+        return len(self.voyage_id)
+
+    def __repr__(self):
+        return (
+            f"ScheduleSnapshot ({len(self.voyage_id)} voyages, "
+            f"{len(self.locations)} locations, {len(self.ticket_price)} tickets)"
+        )
+
+    def _ticket_voyage_positions(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Позиции рейсов билетов и маска билетов, чей рейс есть в снимке;
+        билеты неизвестных рейсов в агрегаты по рейсам не попадают
+        """
+        order = np.argsort(self.voyage_id, kind="stable")
+        sorted_ids = self.voyage_id[order]
+        positions = np.searchsorted(sorted_ids, self.ticket_voyage_id)
+        known = positions < len(sorted_ids)
+        known[known] = sorted_ids[positions[known]] == self.ticket_voyage_id[known]
+        return order[positions[known]], known
+
+    def _sold_seats(self) -> np.ndarray:
+        if not len(self.ticket_voyage_id):
+            return np.zeros(len(self.voyage_id), dtype=np.int64)
+        positions, known = self._ticket_voyage_positions()
+        return np.bincount(
+            positions,
+            weights=self.ticket_is_active[known],
+            minlength=len(self.voyage_id),
+        ).astype(np.int64)
+
+    def total_seats(self) -> np.ndarray:
+        return self.remaining_seats + self.bookings
+
+    def voyage_length(self) -> np.ndarray:
+        return self.arr_datetime_utc - self.dep_datetime_utc
+
+    def analyze_load(self) -> dict[str, np.ndarray]:
+        return {
+            "voyage_id": self.voyage_id,
+            "total_seats": self.total_seats(),
+            "sold_seats": self._sold_seats(),
+            "remaining_seats": self.remaining_seats,
+            "has_availability": self.has_availability,
+        }
+
+    def get_schedule_summary(self) -> dict[str, int]:
+        return {
+            "total_voyages": len(self.voyage_id),
+            "total_tickets": len(self.ticket_price),
+            "total_seats": int(self.total_seats().sum()),
+            "sold_seats": int(self.ticket_is_active.sum()),
+        }
+
+    def _group_totals(self, keys: np.ndarray) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        groups, inverse = np.unique(keys, return_inverse=True)
+        sold_seats = self._sold_seats()
+        revenue = np.zeros(len(self.voyage_id), dtype=np.float64)
+        if len(self.ticket_price):
+            positions, known = self._ticket_voyage_positions()
+            revenue = np.bincount(
+                positions,
+                weights=(self.ticket_price * self.ticket_is_active)[known],
+                minlength=len(self.voyage_id),
+            )
+        totals = {
+            "total_voyages": np.bincount(inverse, minlength=len(groups)),
+            "total_seats": np.bincount(
+                inverse, weights=self.total_seats(), minlength=len(groups)
+            ).astype(np.int64),
+            "sold_seats": np.bincount(
+                inverse, weights=sold_seats, minlength=len(groups)
+            ).astype(np.int64),
+            "revenue": np.bincount(inverse, weights=revenue, minlength=len(groups)),
+        }
+        return groups, totals
+
+    def totals_by_route(self) -> dict[str, np.ndarray]:
+        keys = self.origin_idx * max(len(self.locations), 1) + self.destination_idx
+        groups, totals = self._group_totals(keys)
+        width = max(len(self.locations), 1)
+        return {"origin_idx": groups // width, "destination_idx": groups % width, **totals}
+
+    def totals_by_day(self) -> dict[str, np.ndarray]:
+        groups, totals = self._group_totals(self.dep_datetime_utc.astype("datetime64[D]"))
+        return {"day": groups, **totals}
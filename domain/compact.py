@@ -0,0 +1,114 @@
+"""
+Компактные представления доменных объектов на __slots__.
+
+Классы из model.py отображаются на таблицы через adapters/orm.py, а
+инструментирование SQLAlchemy хранит состояние объекта в его __dict__,
+поэтому сами отображаемые классы слотов иметь не могут. Компактные типы
+повторяют их атрибуты один в один: Schedule и ScheduleSnapshot принимают
+их без изменений, а from_domain/to_domain переводят объекты туда и обратно,
+когда нужно сохранить данные через ORM.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from .model import Availability, Location, Ticket, Voyage
+
+
+@dataclass(frozen=True, slots=True)
+class CompactLocation:
+    title: str
+    coordinates: tuple[float, float]
+
+    @classmethod
+    def from_domain(cls, location: Location) -> "CompactLocation":
+        return cls(title=location.title, coordinates=location.coordinates)
+
+    def to_domain(self) -> Location:
+        return Location(title=self.title, coordinates=self.coordinates)
+
+
+@dataclass(slots=True)
+class CompactTicket:
+    ticket_id: int | None
+    price: float
+    voyage_id: int
+    is_active: bool
+
+    @classmethod
+    def from_domain(cls, ticket: Ticket) -> "CompactTicket":
+        return cls(
+            ticket_id=ticket.ticket_id,
+            price=ticket.price,
+            voyage_id=ticket.voyage_id,
+            is_active=ticket.is_active,
+        )
+
+    def to_domain(self) -> Ticket:
+        return Ticket(
+            ticket_id=self.ticket_id,
+            price=self.price,
+            voyage_id=self.voyage_id,
+            is_active=self.is_active,
+        )
+
+
+@dataclass(slots=True)
+class CompactVoyage:
+    voyage_id: int | None
+    dep_datetime_utc: datetime
+    arr_datetime_utc: datetime
+    origin: Location | CompactLocation
+    destination: Location | CompactLocation
+    marketing_number: int
+    vehicle_number: str
+
+    @classmethod
+    def from_domain(cls, voyage: Voyage) -> "CompactVoyage":
+        return cls(
+            voyage_id=voyage.voyage_id,
+            dep_datetime_utc=voyage.dep_datetime_utc,
+            arr_datetime_utc=voyage.arr_datetime_utc,
+            origin=voyage.origin,
+            destination=voyage.destination,
+            marketing_number=voyage.marketing_number,
+            vehicle_number=voyage.vehicle_number,
+        )
+
+    def to_domain(self) -> Voyage:
+        return Voyage(
+            voyage_id=self.voyage_id,
+            dep_datetime_utc=self.dep_datetime_utc,
+            arr_datetime_utc=self.arr_datetime_utc,
+            origin=self.origin,
+            destination=self.destination,
+            marketing_number=self.marketing_number,
+            vehicle_number=self.vehicle_number,
+        )
+
+    def voyage_length(self):
+        return self.arr_datetime_utc - self.dep_datetime_utc
+
+
+@dataclass(slots=True)
+class CompactAvailability:
+    voyage_id: int
+    remaining_seats: int
+    bookings: int
+    is_active: bool
+
+    @classmethod
+    def from_domain(cls, availability: Availability) -> "CompactAvailability":
+        return cls(
+            voyage_id=availability.voyage_id,
+            remaining_seats=availability.remaining_seats,
+            bookings=availability.bookings,
+            is_active=availability.is_active,
+        )
+
+    def to_domain(self) -> Availability:
+        return Availability(
+            voyage_id=self.voyage_id,
+            remaining_seats=self.remaining_seats,
+            bookings=self.bookings,
+            is_active=self.is_active,
+        )
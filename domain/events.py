@@ -1,6 +1,68 @@
+import uuid
 from dataclasses import dataclass
+from datetime import date
 from typing import Any
 
 
 class Event:
     metadata: dict[str, Any] = None
+
+    def __post_init__(self):
+        # Идентификатор экземпляра: сохраняется в журнале очереди (pickle),
+        # и подписчик отличает повторную доставку от нового события
+        self.event_id = uuid.uuid4().hex
+
+
+@dataclass
+class ScheduleCreated(Event):
+    schedule_id: int
+    schedule_date: date
+
+@dataclass
+class ScheduleDeleted(Event):
+    schedule_id: int
+
+
+@dataclass
+class VoyageAddedToSchedule(Event):
+    schedule_id: int
+    voyage_id: int
+
+
+@dataclass
+class TicketCreated(Event):
+    ticket_id: int
+    voyage_id: int
+    is_active: bool
+
+@dataclass
+class TicketsAdded(Event):
+    voyage_id: int
+    count: int
+    active_count: int
+
+@dataclass
+class TicketStatusChanged(Event):
+    ticket_id: int
+    voyage_id: int
+    is_active: bool
+
+
+@dataclass
+class AvailabilitySet(Event):
+    voyage_id: int
+    remaining_seats: int
+    bookings: int
+
+
+@dataclass
+class SeatsBooked(Event):
+    voyage_id: int
+    seats: int
+    remaining_seats: int
+
+@dataclass
+class SeatsReleased(Event):
+    voyage_id: int
+    seats: int
+    remaining_seats: int
@@ -0,0 +1,227 @@
+"""
+Поиск маршрутов с пересадками по рейсам (Connection Scan Algorithm).
+
+ConnectionIndex хранит рейсы периода как «соединения» — параллельные списки
+отправлений, прибытий и остановок, отсортированные по времени отправления.
+Остановки перенумерованы подряд, время хранится целыми секундами, поэтому
+сканирование идёт по спискам без обращения к объектам Voyage.
+
+JourneyPlanner ищет по индексу:
+- earliest_arrival — маршрут с самым ранним прибытием, один проход;
+- fewest_transfers — маршрут с наименьшим числом пересадок (и самым ранним
+  прибытием среди таких); k-й проход разрешает не больше k + 1 рейсов.
+
+Между рейсами в пункте пересадки должно пройти не меньше min_transfer.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+_NEVER = float("inf")
+
+
+def _to_seconds(moment: datetime) -> int:
+    return (moment - _EPOCH) // _SECOND
+
+
+def _to_datetime(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+@dataclass(frozen=True)
+class Leg:
+    voyage_id: int
+    origin_id: int
+    destination_id: int
+    dep_datetime_utc: datetime
+    arr_datetime_utc: datetime
+
+
+@dataclass(frozen=True)
+class Itinerary:
+    legs: tuple[Leg, ...]
+
+    @property
+    def dep_datetime_utc(self) -> datetime:
+        return self.legs[0].dep_datetime_utc
+
+    @property
+    def arr_datetime_utc(self) -> datetime:
+        return self.legs[-1].arr_datetime_utc
+
+    @property
+    def transfers(self) -> int:
+        return len(self.legs) - 1
+
+    def duration(self) -> timedelta:
+        return self.arr_datetime_utc - self.dep_datetime_utc
+
+
+class ConnectionIndex:
+    def __init__(self, connections: Iterable[tuple[int, int, int, datetime, datetime]]):
+        """
+        :param connections: кортежи (voyage_id, origin_id, destination_id,
+            dep_datetime_utc, arr_datetime_utc) в любом порядке
+        """
+        rows = sorted(connections, key=lambda row: (row[3], row[4]))
+        self.stop_ids: list[int] = []
+        self._stops: dict[int, int] = {}
+        self.voyage_id = [row[0] for row in rows]
+        self.origin = [self._stop(row[1]) for row in rows]
+        self.destination = [self._stop(row[2]) for row in rows]
+        self.departure = [_to_seconds(row[3]) for row in rows]
+        self.arrival = [_to_seconds(row[4]) for row in rows]
+
+    @classmethod
+    def from_rows(cls, rows) -> "ConnectionIndex":
+        """Из строк VoyageRepository.list_connections"""
+        return cls(
+            (row.voyage_id, row.origin_id, row.destination_id, row.dep_datetime_utc, row.arr_datetime_utc)
+            for row in rows
+        )
+
+    def _stop(self, location_id):
+        index = self._stops.get(location_id)
+        if index is None:
+            index = self._stops[location_id] = len(self.stop_ids)
+            self.stop_ids.append(location_id)
+        return index
+
+    def stop_index(self, location_id) -> Optional[int]:
+        return self._stops.get(location_id)
+
+    def leg(self, connection: int) -> Leg:
+        return Leg(
+            voyage_id=self.voyage_id[connection],
+            origin_id=self.stop_ids[self.origin[connection]],
+            destination_id=self.stop_ids[self.destination[connection]],
+            dep_datetime_utc=_to_datetime(self.departure[connection]),
+            arr_datetime_utc=_to_datetime(self.arrival[connection]),
+        )
+
+    def __len__(self):
+        return len(self.voyage_id)
+
+    def __repr__(self):
+        return f"ConnectionIndex ({len(self.voyage_id)} connections, {len(self.stop_ids)} stops)"
+
+
+class JourneyPlanner:
+    def __init__(self, index: ConnectionIndex, min_transfer: timedelta = timedelta(minutes=30)):
+        self.index = index
+        self.min_transfer = min_transfer // _SECOND
+
+    def _endpoints(self, origin_id, destination_id, depart_after, arrive_before):
+        origin = self.index.stop_index(origin_id)
+        destination = self.index.stop_index(destination_id)
+        if origin is None or destination is None or origin == destination:
+            return None
+        limit = _to_seconds(arrive_before) if arrive_before is not None else _NEVER
+        return origin, destination, _to_seconds(depart_after), limit
+
+    def _itinerary(self, origin, destination, pointers) -> Itinerary:
+        """Восстановить маршрут по указателям; pointers[r] — указатели после r-го прохода"""
+        legs = []
+        stop = destination
+        for round_pointers in reversed(pointers):
+            if stop == origin:
+                break
+            connection = round_pointers[stop]
+            legs.append(self.index.leg(connection))
+            stop = self.index.origin[connection]
+        return Itinerary(tuple(reversed(legs)))
+
+    def earliest_arrival(self, origin_id, destination_id, depart_after: datetime,
+                         arrive_before: Optional[datetime] = None) -> Optional[Itinerary]:
+        endpoints = self._endpoints(origin_id, destination_id, depart_after, arrive_before)
+        if endpoints is None:
+            return None
+        origin, destination, start, limit = endpoints
+        index = self.index
+        stops = len(index.stop_ids)
+        ready = [_NEVER] * stops
+        arrival = [_NEVER] * stops
+        pointer = [-1] * stops
+        ready[origin] = arrival[origin] = start
+
+        departures, arrivals = index.departure, index.arrival
+        origins, destinations = index.origin, index.destination
+        for connection in range(bisect_left(departures, start), len(departures)):
+            departs = departures[connection]
+            if departs >= arrival[destination] or departs > limit:
+                break
+            if ready[origins[connection]] > departs:
+                continue
+            stop = destinations[connection]
+            arrives = arrivals[connection]
+            if arrives < arrival[stop] and arrives <= limit:
+                arrival[stop] = arrives
+                ready[stop] = arrives + self.min_transfer
+                pointer[stop] = connection
+
+        if pointer[destination] < 0:
+            return None
+        # Каждый рейс цепочки прибывает раньше следующего, поэтому цикла нет
+        legs = []
+        stop = destination
+        while stop != origin:
+            connection = pointer[stop]
+            legs.append(index.leg(connection))
+            stop = origins[connection]
+        return Itinerary(tuple(reversed(legs)))
+
+    def fewest_transfers(self, origin_id, destination_id, depart_after: datetime,
+                         arrive_before: Optional[datetime] = None,
+                         max_transfers: int = 5) -> Optional[Itinerary]:
+        endpoints = self._endpoints(origin_id, destination_id, depart_after, arrive_before)
+        if endpoints is None:
+            return None
+        origin, destination, start, limit = endpoints
+        index = self.index
+        stops = len(index.stop_ids)
+        ready = [_NEVER] * stops
+        arrival = [_NEVER] * stops
+        ready[origin] = arrival[origin] = start
+        pointers = []
+
+        departures, arrivals = index.departure, index.arrival
+        origins, destinations = index.origin, index.destination
+        first = bisect_left(departures, start)
+        for _ in range(max_transfers + 1):
+            pointer = list(pointers[-1]) if pointers else [-1] * stops
+            next_ready = list(ready)
+            improved = False
+            for connection in range(first, len(departures)):
+                departs = departures[connection]
+                if departs >= arrival[destination] or departs > limit:
+                    break
+                if ready[origins[connection]] > departs:
+                    continue
+                stop = destinations[connection]
+                arrives = arrivals[connection]
+                if arrives < arrival[stop] and arrives <= limit:
+                    arrival[stop] = arrives
+                    next_ready[stop] = arrives + self.min_transfer
+                    pointer[stop] = connection
+                    improved = True
+            pointers.append(pointer)
+            if pointer[destination] >= 0:
+                return self._itinerary(origin, destination, pointers)
+            if not improved:
+                return None
+            ready = next_ready
+        return None
+
+    def plan(self, origin_id, destination_id, depart_after: datetime,
+             arrive_before: Optional[datetime] = None, max_transfers: int = 5) -> dict:
+        return {
+            "earliest_arrival": self.earliest_arrival(
+                origin_id, destination_id, depart_after, arrive_before
+            ),
+            "fewest_transfers": self.fewest_transfers(
+                origin_id, destination_id, depart_after, arrive_before, max_transfers
+            ),
+        }
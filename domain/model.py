@@ -1,15 +1,33 @@
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(init=False, unsafe_hash=True)
 class Location:
+    # Поля совпадают со столбцами locations, чтобы ORM мог загружать пункт;
+    # coordinates — пара (latitude, longitude) поверх них
     title: str
-    coordinates: tuple[float, float]
+    latitude: float
+    longitude: float
+
+    def __init__(self, title: str, coordinates: tuple[float, float]):
+        self.title = title
+        self.coordinates = coordinates
+
+    @property
+    def coordinates(self) -> tuple[float, float]:
+        return (self.latitude, self.longitude)
+
+    @coordinates.setter
+    def coordinates(self, value: tuple[float, float]):
+        self.latitude, self.longitude = value
 
 
 @dataclass
 class Ticket:
+    # Билет внутри Schedule меняет статус только через Schedule.set_ticket_status:
+    # прямое присваивание is_active агрегаты не увидят (его ловит check_aggregates)
     ticket_id: int | None
     price: float
     voyage_id: int
@@ -75,11 +93,27 @@ from typing import Optional
 
 
 class Schedule:
-    def __init__(self, schedule_date: Optional[date] = None):
+    def __init__(self, schedule_date: Optional[date] = None, check_aggregates: bool = False):
         self.schedule_date: Optional[date] = schedule_date
         self.voyages: dict[int, Voyage] = {}
         self.availability: dict[int, Availability] = {}
         self.tickets: dict[int, Ticket] = {}
+        # Вторичные индексы: билеты по рейсу и отсортированные времена отправления
+        self._tickets_by_voyage: dict[int, dict[int, Ticket]] = {}
+        self._departure_times: list[datetime] = []
+        self._departure_voyage_ids: list[int] = []
+        # Время, под которым рейс лежит в индексе: dep_datetime_utc могли
+        # изменить на месте, и по текущему значению запись уже не найти
+        self._indexed_departures: dict[int, datetime] = {}
+        # Агрегаты загрузки, обновляемые при каждом изменении билетов и доступности
+        self._sold_seats: dict[int, int] = {}
+        self._active_tickets: int = 0
+        # Билеты, учтённые в агрегатах как активные: изменения считаются от
+        # этого множества, а не от ticket.is_active, который могли присвоить напрямую
+        self._counted_active: set[int] = set()
+        self._total_seats: int = 0
+        # Режим проверки: сверять агрегаты с полным пересчётом при каждом чтении
+        self.check_aggregates = check_aggregates
 
     def set_schedule_date(self, schedule_date: date):
         self.schedule_date = schedule_date
@@ -89,62 +123,136 @@ class Schedule:
             raise ValueError(
                 f"Voyage date {voyage.dep_datetime_utc.date()} does not match schedule date {self.schedule_date}."
             )
+        if voyage.voyage_id in self._indexed_departures:
+            self._remove_departure(voyage.voyage_id)
         self.voyages[voyage.voyage_id] = voyage
+        self._insert_departure(voyage)
 
     def add_availability(self, availability: Availability):
         if availability.voyage_id not in self.voyages:
             raise ValueError(f"Voyage with ID {availability.voyage_id} not found.")
+        previous = self.availability.get(availability.voyage_id)
+        if previous is not None:
+            self._total_seats -= previous.remaining_seats + previous.bookings
         self.availability[availability.voyage_id] = availability
+        self._total_seats += availability.remaining_seats + availability.bookings
 
     def add_ticket(self, ticket: Ticket):
         if ticket.voyage_id not in self.voyages:
             raise ValueError(f"Voyage with ID {ticket.voyage_id} not found.")
+        previous = self.tickets.get(ticket.ticket_id)
+        if previous is not None:
+            if previous.voyage_id != ticket.voyage_id:
+                self._tickets_by_voyage[previous.voyage_id].pop(ticket.ticket_id, None)
+            if ticket.ticket_id in self._counted_active:
+                self._count_sold_seat(previous.voyage_id, ticket.ticket_id, False)
         self.tickets[ticket.ticket_id] = ticket
+        self._tickets_by_voyage.setdefault(ticket.voyage_id, {})[ticket.ticket_id] = ticket
+        if ticket.is_active:
+            self._count_sold_seat(ticket.voyage_id, ticket.ticket_id, True)
+
+    def set_ticket_status(self, ticket_id: int, is_active: bool):
+        """
+        Единственный способ сменить статус билета расписания: агрегаты
+        обновляются здесь, а присваивание ticket.is_active в обход метода
+        оставит их прежними до следующего set_ticket_status этого билета.
+        """
+        ticket = self.tickets.get(ticket_id)
+        if ticket is None:
+            raise ValueError(f"Ticket with ID {ticket_id} not found.")
+        if (ticket_id in self._counted_active) != is_active:
+            self._count_sold_seat(ticket.voyage_id, ticket_id, is_active)
+        ticket.is_active = is_active
+
+    def _count_sold_seat(self, voyage_id: int, ticket_id: int, active: bool):
+        delta = 1 if active else -1
+        if active:
+            self._counted_active.add(ticket_id)
+        else:
+            self._counted_active.discard(ticket_id)
+        self._sold_seats[voyage_id] = self._sold_seats.get(voyage_id, 0) + delta
+        self._active_tickets += delta
+
+    def _insert_departure(self, voyage: Voyage):
+        position = bisect_right(self._departure_times, voyage.dep_datetime_utc)
+        self._departure_times.insert(position, voyage.dep_datetime_utc)
+        self._departure_voyage_ids.insert(position, voyage.voyage_id)
+        self._indexed_departures[voyage.voyage_id] = voyage.dep_datetime_utc
+
+    def _remove_departure(self, voyage_id: int):
+        dep_datetime_utc = self._indexed_departures.pop(voyage_id)
+        lo = bisect_left(self._departure_times, dep_datetime_utc)
+        hi = bisect_right(self._departure_times, dep_datetime_utc)
+        position = self._departure_voyage_ids.index(voyage_id, lo, hi)
+        del self._departure_times[position]
+        del self._departure_voyage_ids[position]
 
     def get_schedule_by_date(self, start_date: datetime, end_date: datetime) -> list[
         Voyage]:
-        return [
-            voyage for voyage in self.voyages.values()
-            if start_date <= voyage.dep_datetime_utc <= end_date
-        ]
+        lo = bisect_left(self._departure_times, start_date)
+        hi = bisect_right(self._departure_times, end_date)
+        return [self.voyages[voyage_id] for voyage_id in self._departure_voyage_ids[lo:hi]]
 
     def get_voyage_availability(self, voyage_id: int) -> Optional[Availability]:
         return self.availability.get(voyage_id, None)
 
     def get_tickets_by_voyage(self, voyage_id: int) -> list[Ticket]:
-        return [ticket for ticket in self.tickets.values() if
-                ticket.voyage_id == voyage_id]
+        return list(self._tickets_by_voyage.get(voyage_id, {}).values())
 
     def analyze_load(self, voyage_id: int) -> dict[str, int]:
+        if self.check_aggregates:
+            self.verify_aggregates()
+
         availability = self.get_voyage_availability(voyage_id)
         if not availability:
             raise ValueError(f"Availability for voyage ID {voyage_id} not found.")
 
-        tickets = self.get_tickets_by_voyage(voyage_id)
-        sold_seats = len([ticket for ticket in tickets if ticket.is_active])
-
         return {
             "total_seats": availability.remaining_seats + availability.bookings,
-            "sold_seats": sold_seats,
+            "sold_seats": self._sold_seats.get(voyage_id, 0),
             "remaining_seats": availability.remaining_seats,
         }
 
     def get_schedule_summary(self) -> dict[str, int]:
-        total_seats = sum(
-            availability.remaining_seats + availability.bookings
-            for availability in self.availability.values()
-        )
-        sold_seats = sum(
-            len([ticket for ticket in self.get_tickets_by_voyage(voyage_id) if
-                 ticket.is_active])
-            for voyage_id in self.voyages
-        )
+        if self.check_aggregates:
+            self.verify_aggregates()
+
         return {
             "total_voyages": len(self.voyages),
             "total_tickets": len(self.tickets),
-            "total_seats": total_seats,
+            "total_seats": self._total_seats,
+            "sold_seats": self._active_tickets,
+        }
+
+    def _recompute_aggregates(self) -> dict:
+        sold_seats = {}
+        for ticket in self.tickets.values():
+            if ticket.is_active:
+                sold_seats[ticket.voyage_id] = sold_seats.get(ticket.voyage_id, 0) + 1
+        return {
             "sold_seats": sold_seats,
+            "active_tickets": sum(sold_seats.values()),
+            "total_seats": sum(
+                availability.remaining_seats + availability.bookings
+                for availability in self.availability.values()
+            ),
+        }
+
+    def verify_aggregates(self):
+        expected = self._recompute_aggregates()
+        actual = {
+            "sold_seats": {
+                voyage_id: count for voyage_id, count in self._sold_seats.items() if count
+            },
+            "active_tickets": self._active_tickets,
+            "total_seats": self._total_seats,
         }
+        mismatched = [key for key in expected if expected[key] != actual[key]]
+        if mismatched:
+            raise RuntimeError(
+                f"Schedule aggregates are out of sync for {', '.join(mismatched)}: "
+                f"expected {expected}, got {actual}."
+            )
 
     def __repr__(self):
         return (
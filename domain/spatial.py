@@ -0,0 +1,117 @@
+"""
+Пространственный индекс пунктов для запросов «ближайшие k» и «в радиусе».
+
+GeoGrid раскладывает точки по ячейкам сетки широта/долгота размером
+cell_degrees. Запрос в радиусе просматривает только ячейки, которые может
+задеть окружность (с учётом сужения меридианов к полюсам и перехода через
+180-й меридиан), и проверяет кандидатов точной формулой гаверсинуса.
+Поиск ближайших расширяет радиус, пока не наберётся k точек.
+
+Вставка, перемещение и удаление — O(1), поэтому индекс обновляется
+инкрементально вместе с LocationService.
+"""
+import math
+from typing import Hashable, Iterable
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGrid:
+    def __init__(self, cell_degrees: float = 0.5):
+        self.cell_degrees = cell_degrees
+        self._lon_cells = math.ceil(360 / cell_degrees)
+        self._lat_cells = math.ceil(180 / cell_degrees)
+        self._cells: dict[tuple[int, int], set] = {}
+        self._points: dict[Hashable, tuple[float, float]] = {}
+
+    @classmethod
+    def from_points(cls, points: Iterable[tuple[Hashable, float, float]], cell_degrees: float = 0.5):
+        """:param points: тройки (location_id, latitude, longitude)"""
+        grid = cls(cell_degrees)
+        for location_id, latitude, longitude in points:
+            grid.insert(location_id, latitude, longitude)
+        return grid
+
+    def _cell(self, latitude, longitude):
+        row = min(int((latitude + 90) // self.cell_degrees), self._lat_cells - 1)
+        column = int((longitude + 180) // self.cell_degrees) % self._lon_cells
+        return row, column
+
+    def insert(self, location_id, latitude: float, longitude: float):
+        """Добавить точку или переместить существующую"""
+        if location_id in self._points:
+            self.remove(location_id)
+        self._points[location_id] = (latitude, longitude)
+        self._cells.setdefault(self._cell(latitude, longitude), set()).add(location_id)
+
+    def remove(self, location_id):
+        point = self._points.pop(location_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        members = self._cells[cell]
+        members.discard(location_id)
+        if not members:
+            del self._cells[cell]
+
+    def __contains__(self, location_id):
+        return location_id in self._points
+
+    def __len__(self):
+        return len(self._points)
+
+    def _candidate_cells(self, latitude, longitude, radius_km):
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+        low_row = max(int((latitude - dlat + 90) // self.cell_degrees), 0)
+        high_row = min(int((latitude + dlat + 90) // self.cell_degrees), self._lat_cells - 1)
+
+        spans_pole = latitude + dlat >= 90 or latitude - dlat <= -90
+        if spans_pole or angular >= math.pi / 2:
+            columns = range(self._lon_cells)
+        else:
+            dlon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(latitude)))))
+            first = int((longitude - dlon + 180) // self.cell_degrees)
+            last = int((longitude + dlon + 180) // self.cell_degrees)
+            if last - first + 1 >= self._lon_cells:
+                columns = range(self._lon_cells)
+            else:
+                columns = [column % self._lon_cells for column in range(first, last + 1)]
+
+        for row in range(low_row, high_row + 1):
+            for column in columns:
+                members = self._cells.get((row, column))
+                if members:
+                    yield members
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> list[tuple[Hashable, float]]:
+        """Точки не дальше radius_km, по возрастанию расстояния: [(location_id, км), ...]"""
+        found = []
+        for members in self._candidate_cells(latitude, longitude, radius_km):
+            for location_id in members:
+                distance = haversine_km(latitude, longitude, *self._points[location_id])
+                if distance <= radius_km:
+                    found.append((location_id, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_km: float | None = None) -> list[tuple[Hashable, float]]:
+        """k ближайших точек (не дальше max_km, если задан), по возрастанию расстояния"""
+        if k <= 0 or not self._points:
+            return []
+        limit = math.pi * EARTH_RADIUS_KM if max_km is None else max_km
+        radius = min(limit, self.cell_degrees * 111.0)
+        while True:
+            found = self.within(latitude, longitude, radius)
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius = min(limit, radius * 2)
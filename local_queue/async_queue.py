@@ -0,0 +1,113 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMessageQueue:
+    """
+    Очередь команд для asyncio с ограниченной ёмкостью: когда очередь
+    заполнена, add_message ждёт, пока обработчик её разгрузит. Обработчики
+    могут быть как обычными функциями, так и корутинами.
+    """
+
+    def __init__(self, maxsize: int = 1000, metrics=None, max_errors: int = 100):
+        """
+        :param metrics: необязательный QueueMetrics из local_queue/metrics.py
+        :param max_errors: сколько последних ошибок обработчиков хранить в errors;
+            более старые вытесняются, а error_count считает все
+        """
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._handlers = {}
+        self._worker: asyncio.Task | None = None
+        self.errors: deque[tuple[Any, Exception]] = deque(maxlen=max_errors)
+        self.error_count = 0
+        self.metrics = metrics
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def add_message(self, message: Any):
+        await self._queue.put((message, time.perf_counter()))
+        if self.metrics is not None:
+            self.metrics.record_enqueue(self._queue.qsize())
+
+    def register_handler(self, message_type: type, handler: Callable):
+        self._handlers[message_type] = handler
+
+    async def get_batch(self, max_messages: int = 100) -> list[Any]:
+        """Дождаться хотя бы одного сообщения и забрать до max_messages без ожидания"""
+        batch = [self._start(await self._queue.get())]
+        while len(batch) < max_messages and not self._queue.empty():
+            batch.append(self._start(self._queue.get_nowait()))
+        return batch
+
+    def _start(self, entry):
+        message, enqueued_at = entry
+        if self.metrics is not None:
+            self.metrics.record_dequeue(self._queue.qsize(), time.perf_counter() - enqueued_at)
+        return message
+
+    async def _dispatch(self, message: Any):
+        handler = self._handlers.get(type(message))
+        if not handler:
+            logger.warning("No handler registered for message type: %s", type(message).__name__)
+            if self.metrics is not None:
+                self.metrics.record_error(type(message).__name__)
+            return
+        if self.metrics is None:
+            await self._call(handler, message)
+            return
+        with self.metrics.track(type(message).__name__, message):
+            await self._call(handler, message)
+
+    async def _call(self, handler, message):
+        result = handler(message)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _process_batch(self, batch: list[Any]):
+        for message in batch:
+            try:
+                await self._dispatch(message)
+            except Exception as error:
+                logger.warning("Handler failed for %s: %r", type(message).__name__, error)
+                self.errors.append((message, error))
+                self.error_count += 1
+            finally:
+                self._queue.task_done()
+
+    async def drain(self, batch_size: int = 100):
+        """Обработать всё, что уже лежит в очереди, и вернуться"""
+        while not self._queue.empty():
+            await self._process_batch(await self.get_batch(batch_size))
+
+    async def run(self, batch_size: int = 100):
+        """Обрабатывать сообщения пачками до отмены задачи"""
+        while True:
+            await self._process_batch(await self.get_batch(batch_size))
+
+    def start(self, batch_size: int = 100) -> asyncio.Task:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self.run(batch_size))
+        return self._worker
+
+    async def flush(self):
+        """Дождаться обработки всех поставленных сообщений"""
+        await self._queue.join()
+
+    async def stop(self):
+        """Дообработать очередь и остановить фоновую задачу"""
+        if self._worker is None:
+            return
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
@@ -0,0 +1,206 @@
+"""
+Журнал команд MessageQueue на диске: сегментные файлы только на дозапись.
+
+Каждая запись — заголовок (тип, порядковый номер, длина, CRC32) и команда,
+сериализованная pickle. Подтверждение обработки пишется отдельной записью
+ACK с тем же номером. При старте журнал читается целиком, и команды без
+ACK возвращаются через replay(); оборванная при сбое запись в хвосте
+сегмента отбрасывается по длине или CRC.
+
+Групповой коммит: append() кладёт запись в общий буфер и ждёт, пока фоновый
+поток не запишет буфер и не сделает fsync. Поток просыпается на первой
+записи и ждёт group_commit_ms, собирая в один fsync все команды, пришедшие
+за это окно от всех производителей. При group_commit_ms=0 каждый append
+делает свой fsync.
+
+Сегмент закрывается по достижении segment_bytes; compact() удаляет самые
+старые закрытые сегменты, все команды которых подтверждены.
+"""
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+_HEADER = struct.Struct("<cQII")
+MESSAGE = b"M"
+ACK = b"A"
+
+
+class CommandLog:
+    def __init__(self, directory, group_commit_ms: float = 2.0, segment_bytes: int = 16 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.group_commit_window = group_commit_ms / 1000
+        self.segment_bytes = segment_bytes
+        self.fsyncs = 0
+
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._buffer_seqs: list[int] = []
+        self._next_seq = 1
+        self._durable_seq = 0
+        self._segment_of: dict[int, int] = {}
+        self._live: dict[int, int] = {}
+        self._recovered: dict[int, bytes] = {}
+        self._closed = False
+
+        self._recover()
+        self._open_segment(max(self._live, default=0) + 1)
+
+        self._wakeup = threading.Event()
+        self._flusher = None
+        if self.group_commit_window > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="command-log-flusher")
+            self._flusher.start()
+
+    def _segment_path(self, number):
+        return self.directory / f"{number:08d}.log"
+
+    def _segments(self):
+        return sorted(int(path.stem) for path in self.directory.glob("*.log"))
+
+    def _recover(self):
+        for number in self._segments():
+            self._live.setdefault(number, 0)
+            data = self._segment_path(number).read_bytes()
+            offset = 0
+            while offset + _HEADER.size <= len(data):
+                kind, seq, length, crc = _HEADER.unpack_from(data, offset)
+                payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                offset += _HEADER.size + length
+                self._next_seq = max(self._next_seq, seq + 1)
+                if kind == MESSAGE:
+                    self._recovered[seq] = payload
+                    self._segment_of[seq] = number
+                    self._live[number] += 1
+                elif kind == ACK:
+                    self._recovered.pop(seq, None)
+                    segment = self._segment_of.pop(seq, None)
+                    if segment is not None:
+                        self._live[segment] -= 1
+        self._durable_seq = self._next_seq - 1
+
+    def _open_segment(self, number):
+        self._segment = number
+        self._live.setdefault(number, 0)
+        self._file = open(self._segment_path(number), "ab")
+
+    def replay(self) -> list[tuple[int, Any]]:
+        """Неподтверждённые команды, найденные при старте, в порядке записи"""
+        with self._lock:
+            recovered, self._recovered = self._recovered, {}
+        return [(seq, pickle.loads(payload)) for seq, payload in sorted(recovered.items())]
+
+    def append(self, message: Any) -> int:
+        """Записать команду и дождаться fsync; возвращает её номер для ack()"""
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Command log is closed.")
+            seq = self._next_seq
+            self._next_seq += 1
+            self._buffer += _HEADER.pack(MESSAGE, seq, len(payload), zlib.crc32(payload))
+            self._buffer += payload
+            self._buffer_seqs.append(seq)
+
+        if self._flusher is None:
+            self.flush()
+            return seq
+
+        self._wakeup.set()
+        with self._lock:
+            while self._durable_seq < seq:
+                self._durable.wait()
+        return seq
+
+    def ack(self, seq: int):
+        """
+        Отметить команду обработанной. ACK уходит на диск со следующим
+        групповым коммитом: потеря ACK при сбое приводит лишь к повторной
+        обработке команды (доставка «хотя бы один раз»).
+        """
+        with self._lock:
+            self._buffer += _HEADER.pack(ACK, seq, 0, zlib.crc32(b""))
+            segment = self._segment_of.pop(seq, None)
+            if segment is not None:
+                self._live[segment] -= 1
+
+    def flush(self):
+        """Записать буфер в текущий сегмент и сделать fsync"""
+        with self._io_lock:
+            with self._lock:
+                data, self._buffer = self._buffer, bytearray()
+                seqs, self._buffer_seqs = self._buffer_seqs, []
+                upto = self._next_seq - 1
+            if data:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+            with self._lock:
+                for seq in seqs:
+                    self._segment_of[seq] = self._segment
+                self._live[self._segment] += len(seqs)
+                self._durable_seq = max(self._durable_seq, upto)
+                self._durable.notify_all()
+            if self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self._open_segment(self._segment + 1)
+                self._compact()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            time.sleep(self.group_commit_window)
+            self._wakeup.clear()
+            self.flush()
+            if self._closed:
+                return
+
+    def compact(self) -> list[int]:
+        """Удалить самые старые закрытые сегменты без неподтверждённых команд"""
+        with self._io_lock:
+            return self._compact()
+
+    def _compact(self):
+        removed = []
+        for number in self._segments():
+            if number >= self._segment:
+                break
+            with self._lock:
+                if self._live.get(number, 0) > 0:
+                    break
+                self._live.pop(number, None)
+            self._segment_path(number).unlink()
+            removed.append(number)
+        return removed
+
+    def pending(self) -> int:
+        """Число записанных, но ещё не подтверждённых команд"""
+        with self._lock:
+            return len(self._segment_of) + len(self._buffer_seqs)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,4 +1,9 @@
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any
+
 from schedule.domain.commands import (
+    Command,
     CreateLocationCommand,
     UpdateLocationCommand,
     DeleteLocationCommand,
@@ -16,6 +21,17 @@ from schedule.domain.commands import (
 )
 
 
+@dataclass
+class CommandResult:
+    command: Command
+    result: Any = None
+    error: Exception | None = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
 class CommandHandler:
 
     def __init__(self, location_service, voyage_service, ticket_service, availability_service, schedule_service):
@@ -111,3 +127,166 @@ class CommandHandler:
 
     def handle_delete_schedule(self, command: DeleteScheduleCommand):
         return self.schedule_service.delete_schedule(schedule_id=command.schedule_id)
+
+    def handlers(self):
+        """Соответствие типов команд обработчикам для MessageQueue.register_handler"""
+        return {
+            CreateLocationCommand: self.handle_create_location,
+            UpdateLocationCommand: self.handle_update_location,
+            DeleteLocationCommand: self.handle_delete_location,
+            CreateVoyageCommand: self.handle_create_voyage,
+            UpdateVoyageCommand: self.handle_update_voyage,
+            DeleteVoyageCommand: self.handle_delete_voyage,
+            CreateTicketCommand: self.handle_create_ticket,
+            UpdateTicketStatusCommand: self.handle_update_ticket_status,
+            DeleteTicketCommand: self.handle_delete_ticket,
+            SetAvailabilityCommand: self.handle_set_availability,
+            UpdateAvailabilityCommand: self.handle_update_availability,
+            CreateScheduleCommand: self.handle_create_schedule,
+            AddVoyageToScheduleCommand: self.handle_add_voyage_to_schedule,
+            DeleteScheduleCommand: self.handle_delete_schedule,
+        }
+
+    def handle_batch(self, commands: list[Command]) -> list[CommandResult]:
+        """
+        Обработать пачку команд, объединяя однородные в массовые операции.
+
+        Идущие подряд CreateTicketCommand группируются по voyage_id и уходят
+        в ScheduleService.add_tickets, идущие подряд SetAvailabilityCommand —
+        в AvailabilityService.set_availabilities. Остальные команды
+        выполняются по одной. Порядок между разнородными командами
+        сохраняется, поэтому билет не обгонит создание своего рейса. После
+        ошибки транзакция откатывается, а упавшая пачка повторяется по одной
+        команде, так что ошибку получает только виновная.
+
+        :return: CommandResult на каждую команду в исходном порядке
+        """
+        handlers = self.handlers()
+        bulk_handlers = {
+            CreateTicketCommand: self._handle_create_tickets,
+            SetAvailabilityCommand: self._handle_set_availabilities,
+        }
+        results = []
+        for command_type, run in groupby(commands, key=type):
+            run = list(run)
+            if command_type in bulk_handlers:
+                results.extend(bulk_handlers[command_type](run))
+                continue
+            for command in run:
+                results.append(self._run_single(handlers.get(command_type), command))
+        return results
+
+    def _run_single(self, handler, command):
+        if handler is None:
+            return CommandResult(
+                command, error=ValueError(f"No handler for {type(command).__name__}")
+            )
+        try:
+            return CommandResult(command, result=handler(command))
+        except Exception as error:
+            self._rollback()
+            return CommandResult(command, error=error)
+
+    def _rollback(self):
+        """
+        Откатить работу упавшей команды, чтобы сессия снова годилась для
+        следующих (без отката они падали бы с PendingRollbackError). С обычной
+        Session сервисы коммитят каждую команду сами, и откат снимает только
+        незафиксированное упавшей командой. Под BatchingUnitOfWork сессия
+        сервисов — обёртка, чей rollback() откатывает только текущую
+        операцию, а не накопленную пачку.
+        """
+        for service in (self.location_service, self.voyage_service, self.ticket_service,
+                        self.availability_service, self.schedule_service):
+            session = getattr(service, "session", None)
+            if session is not None:
+                session.rollback()
+
+    def _handle_create_tickets(self, commands: list[CreateTicketCommand]):
+        """
+        Билеты одного рейса вставляются одним add_tickets. Результат каждой
+        команды свой: её рейс, число вставленных ею строк (1) и статистика
+        всей вставки рейса в batch. Если пачка рейса упала, её команды
+        повторяются по одной, чтобы ошибку получила только виновная.
+        """
+        by_voyage = {}
+        for position, command in enumerate(commands):
+            by_voyage.setdefault(command.voyage_id, []).append(position)
+
+        results = [None] * len(commands)
+        for voyage_id, positions in by_voyage.items():
+            group = [commands[position] for position in positions]
+            try:
+                stats = self._add_tickets(voyage_id, group)
+            except Exception as error:
+                self._rollback()
+                if len(group) == 1:
+                    results[positions[0]] = CommandResult(group[0], error=error)
+                    continue
+                for position, command in zip(positions, group):
+                    results[position] = self._run_single(
+                        lambda command: self._ticket_result(
+                            command.voyage_id, self._add_tickets(command.voyage_id, [command])
+                        ),
+                        command,
+                    )
+                continue
+            for position in positions:
+                results[position] = CommandResult(
+                    commands[position], result=self._ticket_result(voyage_id, stats)
+                )
+        return results
+
+    def _add_tickets(self, voyage_id, commands: list[CreateTicketCommand]):
+        return self.schedule_service.add_tickets(
+            voyage_id,
+            [{"price": command.price, "is_active": command.is_active} for command in commands],
+        )
+
+    @staticmethod
+    def _ticket_result(voyage_id, stats):
+        return {"voyage_id": voyage_id, "rows": 1, "batch": dict(stats)}
+
+    def _handle_set_availabilities(self, commands: list[SetAvailabilityCommand]):
+        """Доступность пачкой; повтор voyage_id начинает новую пачку, чтобы не конфликтовать по ключу"""
+        results = []
+        batch = []
+        queued = set()
+        for command in commands:
+            if command.voyage_id in queued:
+                results.extend(self._set_availabilities(batch))
+                batch = []
+                queued = set()
+            batch.append(command)
+            queued.add(command.voyage_id)
+        if batch:
+            results.extend(self._set_availabilities(batch))
+        return results
+
+    def _set_availabilities(self, commands: list[SetAvailabilityCommand]):
+        """Упавшая пачка откатывается и повторяется по одной команде"""
+        try:
+            availabilities = self.availability_service.set_availabilities([
+                {
+                    "voyage_id": command.voyage_id,
+                    "remaining_seats": command.remaining_seats,
+                    "bookings": command.bookings,
+                    "is_active": command.is_active,
+                }
+                for command in commands
+            ])
+        except Exception as error:
+            self._rollback()
+            if len(commands) == 1:
+                return [CommandResult(commands[0], error=error)]
+            return [
+                result
+                for command in commands
+                for result in self._set_availabilities([command])
+            ]
+        return [
+            CommandResult(command, result=availability)
+            if availability is not None
+            else CommandResult(command, error=ValueError("Invalid voyage ID"))
+            for command, availability in zip(commands, availabilities)
+        ]
@@ -1,23 +1,137 @@
-from queue import Queue
+import logging
+import time
+from queue import Empty, Queue
 from typing import Any, Callable
 
+from schedule.local_queue.workers import PartitionedWorkerPool, default_partition_key
+
+logger = logging.getLogger(__name__)
+
 
 class MessageQueue:
-    def __init__(self):
+    def __init__(self, metrics=None, log=None):
+        """
+        :param metrics: необязательный QueueMetrics из local_queue/metrics.py
+        :param log: необязательный CommandLog из local_queue/durable_log.py;
+            команды, не подтверждённые до сбоя, снова ставятся в очередь.
+            Команда подтверждается после обработки, в том числе неудачной:
+            журнал защищает от падения процесса, а не от ошибок обработчика
+        """
         self._queue = Queue()
         self._handlers = {}
+        self.metrics = metrics
+        self.log = log
+        if log is not None:
+            for seq, message in log.replay():
+                self._queue.put((message, time.perf_counter(), seq))
 
     def add_message(self, message: Any):
-        self._queue.put(message)
+        seq = self.log.append(message) if self.log is not None else None
+        self._queue.put((message, time.perf_counter(), seq))
+        if self.metrics is not None:
+            self.metrics.record_enqueue(self._queue.qsize())
 
     def register_handler(self, message_type: type, handler: Callable):
         self._handlers[message_type] = handler
 
-    def process_messages(self):
-        while not self._queue.empty():
-            message = self._queue.get()
-            handler = self._handlers.get(type(message))
-            if handler:
-                handler(message)
-            else:
-                print(f"No handler registered for message type: {type(message).__name__}")
+    def _dispatch(self, message: Any):
+        handler = self._handlers.get(type(message))
+        if not handler:
+            logger.warning("No handler registered for message type: %s", type(message).__name__)
+            if self.metrics is not None:
+                self.metrics.record_error(type(message).__name__)
+            return None
+        if self.metrics is None:
+            return handler(message)
+        with self.metrics.track(type(message).__name__, message):
+            return handler(message)
+
+    def _start(self, entry):
+        message, enqueued_at, _ = entry
+        if self.metrics is not None:
+            self.metrics.record_dequeue(self._queue.qsize(), time.perf_counter() - enqueued_at)
+        return message
+
+    def _ack(self, entry):
+        if self.log is not None:
+            self.log.ack(entry[2])
+
+    def _process(self, entry):
+        try:
+            return self._dispatch(self._start(entry))
+        finally:
+            self._ack(entry)
+
+    def _drain(self):
+        while True:
+            try:
+                yield self._queue.get_nowait()
+            except Empty:
+                return
+
+    def process_messages(self, on_idle: Callable | None = None):
+        """
+        Обработать всё, что лежит в очереди.
+
+        :param on_idle: необязательный callable, вызываемый, когда очередь
+            опустела, например BatchingUnitOfWork.flush_if_due, чтобы
+            фиксировать пачку по времени и без новых команд
+        """
+        for entry in self._drain():
+            self._process(entry)
+        if on_idle is not None:
+            on_idle()
+
+    def process_messages_batched(self, handle_batch: Callable, max_batch: int = 1000,
+                                 on_idle: Callable | None = None):
+        """
+        Обработать очередь пачками до max_batch сообщений, например через
+        CommandHandler.handle_batch, который объединяет однородные команды.
+
+        :param on_idle: как в process_messages
+        :return: результаты handle_batch по всем пачкам подряд
+        """
+        results = []
+        batch = []
+        for entry in self._drain():
+            batch.append(entry)
+            if len(batch) == max_batch:
+                results.extend(self._handle_batch(handle_batch, batch))
+                batch = []
+        if batch:
+            results.extend(self._handle_batch(handle_batch, batch))
+        if on_idle is not None:
+            on_idle()
+        return results
+
+    def _handle_batch(self, handle_batch, entries):
+        batch = [self._start(entry) for entry in entries]
+        try:
+            if self.metrics is None:
+                return handle_batch(batch)
+            with self.metrics.track_batch(batch) as recorded:
+                results = handle_batch(batch)
+                recorded.extend(results)
+            return results
+        finally:
+            for entry in entries:
+                self._ack(entry)
+
+    def process_messages_parallel(self, workers: int = 4, partition_key=default_partition_key):
+        """
+        Обработать очередь пулом потоков. Сообщения с одинаковым ключом
+        (по умолчанию voyage_id/schedule_id/...) обрабатываются по порядку,
+        остальные — параллельно. Обработчики должны сами открывать сессию
+        на каждое сообщение: Session не потокобезопасна.
+
+        :return: список пар (сообщение, исключение) для упавших обработчиков
+        """
+        pool = PartitionedWorkerPool(
+            self._process,
+            workers=workers,
+            partition_key=lambda entry: partition_key(entry[0]),
+        )
+        with pool:
+            for entry in self._drain():
+                pool.submit(entry)
+        return [(entry[0], error) for entry, error in pool.errors]
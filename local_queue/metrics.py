@@ -0,0 +1,293 @@
+"""
+Метрики очереди команд: глубина очереди, ожидание от постановки до начала
+обработки, гистограммы задержки обработчиков по типам команд, время SQL
+внутри обработчика, число ошибок и журнал медленных команд. Пачка команд,
+обработанная одним вызовом (track_batch), учитывается по типам её команд.
+
+    metrics = QueueMetrics(slow_threshold=0.5)
+    metrics.instrument_engine(db.engine)
+    queue = MessageQueue(metrics=metrics)
+    ...
+    metrics.snapshot()       # словарь
+    metrics.to_prometheus()  # текстовый формат Prometheus
+
+Гистограммы хранят только счётчики по фиксированным корзинам, поэтому запись
+наблюдения — это bisect и пара сложений под блокировкой, а квантили
+оцениваются по корзинам так же, как histogram_quantile в Prometheus.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from schedule.config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_sql_seconds: ContextVar[list[float] | None] = ContextVar("sql_seconds", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+@contextmanager
+def measure_sql():
+    """Накапливать время SQL-запросов текущего потока/задачи в acc[0]"""
+    acc = [0.0]
+    token = _sql_seconds.set(acc)
+    try:
+        yield acc
+    finally:
+        _sql_seconds.reset(token)
+
+
+class QueueMetrics:
+    def __init__(self, slow_threshold=Config.SLOW_COMMAND_SECONDS, slow_log_size=100,
+                 buckets=DEFAULT_BUCKETS):
+        """
+        :param slow_threshold: команды дольше этого числа секунд попадают
+            в журнал медленных команд и в лог с уровнем WARNING
+        """
+        self.slow_threshold = slow_threshold
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.enqueued = 0
+        self.wait = Histogram(self.buckets)
+        self.latency: dict[str, Histogram] = {}
+        self.sql_seconds: dict[str, float] = {}
+        self.errors: dict[str, int] = {}
+        self.slow_commands = deque(maxlen=slow_log_size)
+
+    def instrument_engine(self, engine):
+        """
+        Подписаться на события движка, чтобы считать время SQL обработчиков.
+        Для AsyncEngine передайте engine.sync_engine.
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["metrics_query_started"].pop()
+            acc = _sql_seconds.get()
+            if acc is not None:
+                acc[0] += time.perf_counter() - started
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(context):
+            if context.connection is not None:
+                started = context.connection.info.get("metrics_query_started")
+                if started:
+                    started.pop()
+
+    def record_enqueue(self, depth):
+        with self._lock:
+            self.enqueued += 1
+            self.queue_depth = depth
+
+    def record_dequeue(self, depth, waited):
+        with self._lock:
+            self.queue_depth = depth
+            self.wait.observe(waited)
+
+    def record_command(self, command_type, seconds, sql_seconds=0.0, failed=False, command=None):
+        with self._lock:
+            histogram = self.latency.get(command_type)
+            if histogram is None:
+                histogram = self.latency[command_type] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self.sql_seconds[command_type] = self.sql_seconds.get(command_type, 0.0) + sql_seconds
+            if failed:
+                self.errors[command_type] = self.errors.get(command_type, 0) + 1
+            if seconds >= self.slow_threshold:
+                self.slow_commands.append({
+                    "command_type": command_type,
+                    "seconds": seconds,
+                    "sql_seconds": sql_seconds,
+                    "failed": failed,
+                    "command": repr(command)[:200],
+                })
+        if seconds >= self.slow_threshold:
+            logger.warning("Slow command %s: %.3fs (SQL %.3fs)", command_type, seconds, sql_seconds)
+
+    def record_error(self, command_type):
+        with self._lock:
+            self.errors[command_type] = self.errors.get(command_type, 0) + 1
+
+    @contextmanager
+    def track(self, command_type, command=None):
+        """Замерить обработку команды: задержку, время SQL и ошибку"""
+        started = time.perf_counter()
+        failed = False
+        with measure_sql() as sql:
+            try:
+                yield
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self.record_command(
+                    command_type, time.perf_counter() - started, sql[0], failed, command
+                )
+
+    def record_batch(self, commands, results, seconds, sql_seconds=0.0):
+        """
+        Записать пачку команд, обработанную одним вызовом handle_batch.
+        Поштучного времени нет, поэтому время пачки и её SQL делятся между
+        командами поровну: каждый тип получает по наблюдению на свою команду
+        и долю времени по их числу. Ошибки считаются по CommandResult;
+        results=None — упала вся пачка.
+        """
+        if not commands:
+            return
+        share = seconds / len(commands)
+        sql_share = sql_seconds / len(commands)
+        counts = Counter(type(command).__name__ for command in commands)
+        if results is None:
+            failed = counts
+        else:
+            failed = Counter(
+                type(result.command).__name__
+                for result in results
+                if getattr(result, "error", None) is not None
+            )
+        slow = seconds >= self.slow_threshold
+        summary = ", ".join(f"{command_type}={count}" for command_type, count in counts.items())
+        with self._lock:
+            for command_type, count in counts.items():
+                histogram = self.latency.get(command_type)
+                if histogram is None:
+                    histogram = self.latency[command_type] = Histogram(self.buckets)
+                for _ in range(count):
+                    histogram.observe(share)
+                self.sql_seconds[command_type] = self.sql_seconds.get(command_type, 0.0) + sql_share * count
+            for command_type, count in failed.items():
+                self.errors[command_type] = self.errors.get(command_type, 0) + count
+            if slow:
+                self.slow_commands.append({
+                    "command_type": "batch",
+                    "seconds": seconds,
+                    "sql_seconds": sql_seconds,
+                    "failed": bool(failed),
+                    "command": summary[:200],
+                })
+        if slow:
+            logger.warning("Slow batch (%s): %.3fs (SQL %.3fs)", summary, seconds, sql_seconds)
+
+    @contextmanager
+    def track_batch(self, commands):
+        """
+        Замерить пачку команд; результаты handle_batch нужно положить
+        в выданный список, чтобы ошибки попали к своим типам.
+        """
+        started = time.perf_counter()
+        results = []
+        with measure_sql() as sql:
+            try:
+                yield results
+            except Exception:
+                results = None
+                raise
+            finally:
+                self.record_batch(commands, results, time.perf_counter() - started, sql[0])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "enqueued": self.enqueued,
+                "wait_seconds": self.wait.snapshot(),
+                "commands": {
+                    command_type: {
+                        **histogram.snapshot(),
+                        "sql_seconds": self.sql_seconds.get(command_type, 0.0),
+                        "errors": self.errors.get(command_type, 0),
+                    }
+                    for command_type, histogram in self.latency.items()
+                },
+                "errors": dict(self.errors),
+                "slow_commands": list(self.slow_commands),
+            }
+
+    def to_prometheus(self, prefix="schedule_queue"):
+        with self._lock:
+            lines = [
+                f"# TYPE {prefix}_depth gauge",
+                f"{prefix}_depth {self.queue_depth}",
+                f"# TYPE {prefix}_enqueued_total counter",
+                f"{prefix}_enqueued_total {self.enqueued}",
+                f"# TYPE {prefix}_wait_seconds histogram",
+                *_histogram_lines(f"{prefix}_wait_seconds", "", self.wait),
+                f"# TYPE {prefix}_command_seconds histogram",
+            ]
+            for command_type, histogram in sorted(self.latency.items()):
+                lines.extend(_histogram_lines(
+                    f"{prefix}_command_seconds", f'command="{command_type}"', histogram
+                ))
+            lines.append(f"# TYPE {prefix}_command_sql_seconds_total counter")
+            for command_type, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'{prefix}_command_sql_seconds_total{{command="{command_type}"}} {seconds}')
+            lines.append(f"# TYPE {prefix}_command_errors_total counter")
+            for command_type, count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_command_errors_total{{command="{command_type}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name, labels, histogram):
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
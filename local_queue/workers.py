@@ -0,0 +1,97 @@
+import itertools
+import threading
+from queue import Queue
+from typing import Any, Callable, Hashable
+
+_STOP = object()
+
+PARTITION_ATTRIBUTES = ("voyage_id", "schedule_id", "ticket_id", "location_id")
+
+
+def default_partition_key(message: Any) -> Hashable | None:
+    """
+    Ключ упорядочивания команды: первый заданный из voyage_id, schedule_id,
+    ticket_id, location_id. Команды без ключа упорядочивать не нужно.
+    """
+    for attribute in PARTITION_ATTRIBUTES:
+        value = getattr(message, attribute, None)
+        if value is not None:
+            return attribute, value
+    return None
+
+
+class PartitionedWorkerPool:
+    """
+    Пул потоков, в котором сообщения с одинаковым ключом всегда попадают
+    в одну и ту же очередь-партицию и обрабатываются по порядку, а сообщения
+    с разными ключами обрабатываются параллельно.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[Any], Any],
+        workers: int = 4,
+        partition_key: Callable[[Any], Hashable | None] = default_partition_key,
+    ):
+        self._handle = handle
+        self._partition_key = partition_key
+        self._partitions = [Queue() for _ in range(workers)]
+        self._round_robin = itertools.cycle(range(workers))
+        self._threads = [
+            threading.Thread(target=self._work, args=(partition,), daemon=True, name=f"mq-worker-{n}")
+            for n, partition in enumerate(self._partitions)
+        ]
+        self._errors_lock = threading.Lock()
+        self._stopping = False
+        self.errors: list[tuple[Any, Exception]] = []
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def submit(self, message: Any):
+        if self._stopping:
+            raise RuntimeError("Worker pool is shutting down.")
+        key = self._partition_key(message)
+        if key is None:
+            index = next(self._round_robin)
+        else:
+            index = hash(key) % len(self._partitions)
+        self._partitions[index].put(message)
+
+    def _work(self, partition: Queue):
+        while True:
+            message = partition.get()
+            try:
+                if message is _STOP:
+                    return
+                self._handle(message)
+            except Exception as error:
+                with self._errors_lock:
+                    self.errors.append((message, error))
+            finally:
+                partition.task_done()
+
+    def join(self):
+        """Дождаться обработки всех принятых сообщений"""
+        for partition in self._partitions:
+            partition.join()
+
+    def shutdown(self, wait: bool = True, timeout: float | None = None):
+        """
+        Остановить пул: новые сообщения не принимаются, уже принятые
+        дообрабатываются, после чего потоки завершаются.
+        """
+        self._stopping = True
+        for partition in self._partitions:
+            partition.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,428 @@
+"""
+Асинхронные версии сервисов поверх AsyncSession и репозиториев из
+adapters/async_repos.py. Ленивая загрузка связей в asyncio недоступна,
+поэтому чтение графа объектов идёт через профили загрузки (по умолчанию
+"summary").
+"""
+import inspect
+import time
+from datetime import date
+from itertools import islice
+
+from schedule import domain
+from schedule.domain import events
+from schedule.domain.spatial import GeoGrid
+from schedule.service.services import _by_voyage, summarize_voyage_rows
+
+
+async def _achunked(iterable, size):
+    if hasattr(iterable, "__aiter__"):
+        chunk = []
+        async for item in iterable:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class AsyncBaseService:
+    def __init__(self, session, events=None):
+        """
+        :param events: необязательный callable, принимающий доменные события
+            после коммита; может быть корутинной функцией
+        """
+        self.session = session
+        self._publish = events
+
+    async def _emit(self, *emitted):
+        if self._publish is not None:
+            for event in emitted:
+                result = self._publish(event)
+                if inspect.isawaitable(result):
+                    await result
+
+
+class AsyncLocationService(AsyncBaseService):
+    def __init__(self, session, location_repo, spatial_index=None):
+        """
+        :param spatial_index: необязательный GeoGrid из domain/spatial.py;
+            сервис обновляет его после каждого коммита
+        """
+        super().__init__(session)
+        self.location_repo = location_repo
+        self.spatial_index = spatial_index
+
+    async def create_location(self, title, latitude, longitude):
+        location = domain.Location(
+            title=title,
+            coordinates=(latitude, longitude)
+        )
+        self.location_repo.add(location)
+        await self.session.flush()
+        location_id = location.id
+        await self.session.commit()
+        if self.spatial_index is not None:
+            self.spatial_index.insert(location_id, latitude, longitude)
+        return location
+
+    async def get_location(self, location_id):
+        location = await self.location_repo.get(location_id)
+        if not location:
+            raise ValueError(f"Location with ID {location_id} not found")
+        return location
+
+    async def list_locations(self):
+        return await self.location_repo.list()
+
+    async def update_location(self, location_id, title=None, latitude=None, longitude=None):
+        location = await self.get_location(location_id)
+
+        if title:
+            location.title = title
+        moved = latitude is not None or longitude is not None
+        if moved:
+            # Недостающая координата берётся из текущего положения пункта
+            location.coordinates = (
+                latitude if latitude is not None else location.latitude,
+                longitude if longitude is not None else location.longitude,
+            )
+        coordinates = location.coordinates
+
+        await self.session.commit()
+        self.location_repo.invalidate(location_id)
+        if self.spatial_index is not None and moved:
+            self.spatial_index.insert(location_id, *coordinates)
+        return location
+
+    async def delete_location(self, location_id):
+        location = await self.get_location(location_id)
+        await self.session.delete(location)
+        await self.session.commit()
+        self.location_repo.invalidate(location_id)
+        if self.spatial_index is not None:
+            self.spatial_index.remove(location_id)
+        return location
+
+    async def load_spatial_index(self, cell_degrees=0.5):
+        """Построить индекс по всем пунктам из базы и начать его вести"""
+        self.spatial_index = GeoGrid.from_points(await self.location_repo.list_points(), cell_degrees)
+        return self.spatial_index
+
+    def _require_index(self):
+        if self.spatial_index is None:
+            raise ValueError("Spatial index is not loaded; call load_spatial_index first")
+        return self.spatial_index
+
+    def find_nearest(self, latitude, longitude, k=1, max_km=None):
+        """k ближайших пунктов: [(location_id, расстояние в км), ...]"""
+        return self._require_index().nearest(latitude, longitude, k, max_km)
+
+    def find_within(self, latitude, longitude, radius_km):
+        """Пункты в радиусе radius_km: [(location_id, расстояние в км), ...]"""
+        return self._require_index().within(latitude, longitude, radius_km)
+
+
+class AsyncVoyageService(AsyncBaseService):
+    def __init__(self, session, voyage_repo, location_repo):
+        super().__init__(session)
+        self.voyage_repo = voyage_repo
+        self.location_repo = location_repo
+
+    async def create_voyage(
+            self,
+            dep_datetime_utc,
+            arr_datetime_utc,
+            origin_id,
+            destination_id,
+            marketing_number,
+            vehicle_number
+    ):
+        origin = await self.location_repo.get(origin_id)
+        destination = await self.location_repo.get(destination_id)
+
+        if not origin or not destination:
+            raise ValueError("Invalid origin or destination ID")
+
+        voyage = domain.Voyage(
+            voyage_id=None,
+            dep_datetime_utc=dep_datetime_utc,
+            arr_datetime_utc=arr_datetime_utc,
+            origin=origin,
+            destination=destination,
+            marketing_number=marketing_number,
+            vehicle_number=vehicle_number,
+        )
+        self.voyage_repo.add(voyage)
+        await self.session.commit()
+        return voyage
+
+    async def get_voyages_by_origin(self, origin_id, profile="summary"):
+        return await self.voyage_repo.get_by_origin(origin_id, profile=profile)
+
+
+class AsyncTicketService(AsyncBaseService):
+    def __init__(self, session, ticket_repo, voyage_repo, events=None):
+        super().__init__(session, events)
+        self.ticket_repo = ticket_repo
+        self.voyage_repo = voyage_repo
+
+    async def create_ticket(self, voyage_id, price, is_active=True):
+        if not await self.voyage_repo.exists(voyage_id):
+            raise ValueError("Invalid voyage ID")
+
+        ticket = domain.Ticket(
+            ticket_id=None,
+            price=price,
+            voyage_id=voyage_id,
+            is_active=is_active,
+        )
+        self.ticket_repo.add(ticket)
+        await self.session.flush()
+        ticket_id = ticket.ticket_id
+        await self.session.commit()
+        await self._emit(events.TicketCreated(ticket_id, voyage_id, is_active))
+        return ticket
+
+    async def update_ticket_status(self, ticket_id, is_active):
+        ticket = await self.ticket_repo.get(ticket_id)
+        if not ticket:
+            raise ValueError(f"Ticket with ID {ticket_id} not found")
+
+        changed = ticket.is_active != is_active
+        voyage_id = ticket.voyage_id
+        ticket.is_active = is_active
+        await self.session.commit()
+        if changed:
+            await self._emit(events.TicketStatusChanged(ticket_id, voyage_id, is_active))
+        return ticket
+
+    async def get_active_tickets(self, voyage_id):
+        return await self.ticket_repo.get_active_tickets(voyage_id)
+
+
+class AsyncAvailabilityService(AsyncBaseService):
+    def __init__(self, session, availability_repo, voyage_repo, events=None):
+        super().__init__(session, events)
+        self.availability_repo = availability_repo
+        self.voyage_repo = voyage_repo
+
+    async def set_availability(self, voyage_id, remaining_seats, bookings, is_active=True):
+        if not await self.voyage_repo.exists(voyage_id):
+            raise ValueError("Invalid voyage ID")
+
+        availability = domain.Availability(
+            voyage_id=voyage_id,
+            remaining_seats=remaining_seats,
+            bookings=bookings,
+            is_active=is_active,
+        )
+        self.availability_repo.add(availability)
+        await self.session.commit()
+        await self._emit(events.AvailabilitySet(voyage_id, remaining_seats, bookings))
+        return availability
+
+    async def get_availability(self, voyage_id):
+        return await self.availability_repo.get_by_voyage(voyage_id)
+
+    async def book_seats(self, voyage_id, seats=1):
+        """Забронировать места одним условным UPDATE; возвращает остаток мест"""
+        if seats <= 0:
+            raise ValueError("Seats must be positive")
+        remaining = await self.availability_repo.reserve(voyage_id, seats)
+        if remaining is None:
+            await self.session.rollback()
+            raise ValueError(f"Not enough seats on voyage {voyage_id}")
+        await self.session.commit()
+        await self._emit(events.SeatsBooked(voyage_id, seats, remaining))
+        return remaining
+
+    async def book_seats_batch(self, items):
+        """
+        Пачка заявок одним коммитом; None в результате — заявка отклонена.
+        Списание идёт по возрастанию voyage_id, как в AvailabilityService.
+        """
+        result = [None] * len(items)
+        for position in _by_voyage(items):
+            item = items[position]
+            if item["seats"] > 0:
+                result[position] = await self.availability_repo.reserve(item["voyage_id"], item["seats"])
+        await self.session.commit()
+        await self._emit(*(
+            events.SeatsBooked(item["voyage_id"], item["seats"], remaining)
+            for item, remaining in zip(items, result)
+            if remaining is not None
+        ))
+        return result
+
+    async def release_seats(self, voyage_id, seats=1):
+        """Вернуть ранее забронированные места; возвращает остаток мест"""
+        if seats <= 0:
+            raise ValueError("Seats must be positive")
+        remaining = await self.availability_repo.release(voyage_id, seats)
+        if remaining is None:
+            await self.session.rollback()
+            raise ValueError(f"Cannot release {seats} seats on voyage {voyage_id}")
+        await self.session.commit()
+        await self._emit(events.SeatsReleased(voyage_id, seats, remaining))
+        return remaining
+
+
+class AsyncScheduleService(AsyncBaseService):
+    def __init__(self, session, schedule_repo, voyage_repo, location_repo, ticket_repo,
+                 availability_repo, summary_repo=None, events=None):
+        """
+        :param summary_repo: необязательный AsyncSummaryRepository; если задан,
+            сводки и загрузка рейсов читаются из модели чтения одной строкой
+        """
+        super().__init__(session, events)
+        self.schedule_repo = schedule_repo
+        self.voyage_repo = voyage_repo
+        self.location_repo = location_repo
+        self.ticket_repo = ticket_repo
+        self.availability_repo = availability_repo
+        self.summary_repo = summary_repo
+
+    async def create_schedule(self, schedule_date: date):
+        if await self.schedule_repo.get_by_date(schedule_date, profile="lazy"):
+            raise ValueError(f"Schedule for date {schedule_date} already exists.")
+
+        schedule = domain.Schedule(schedule_date=schedule_date)
+        self.schedule_repo.add(schedule)
+        await self.session.flush()
+        schedule_id = schedule.id
+        await self.session.commit()
+        await self._emit(events.ScheduleCreated(schedule_id, schedule_date))
+        return schedule
+
+    async def add_voyage_to_schedule(
+            self, schedule_id, dep_datetime_utc, arr_datetime_utc, origin_id,
+            destination_id, marketing_number, vehicle_number
+    ):
+        schedule = await self.schedule_repo.get(schedule_id)
+        if not schedule:
+            raise ValueError(f"Schedule with ID {schedule_id} not found.")
+
+        origin = await self.location_repo.get(origin_id)
+        destination = await self.location_repo.get(destination_id)
+
+        if not origin or not destination:
+            raise ValueError("Invalid origin or destination ID.")
+
+        voyage = domain.Voyage(
+            voyage_id=None,
+            dep_datetime_utc=dep_datetime_utc,
+            arr_datetime_utc=arr_datetime_utc,
+            origin=origin,
+            destination=destination,
+            marketing_number=marketing_number,
+            vehicle_number=vehicle_number,
+        )
+        voyage.schedule = schedule
+        self.voyage_repo.add(voyage)
+        await self.session.flush()
+        voyage_id = voyage.voyage_id
+        await self.session.commit()
+        await self._emit(events.VoyageAddedToSchedule(schedule_id, voyage_id))
+        return voyage
+
+    async def set_availability(self, voyage_id, remaining_seats, bookings, is_active=True):
+        if not await self.voyage_repo.exists(voyage_id):
+            raise ValueError(f"Voyage with ID {voyage_id} not found.")
+
+        availability = domain.Availability(
+            voyage_id=voyage_id,
+            remaining_seats=remaining_seats,
+            bookings=bookings,
+            is_active=is_active,
+        )
+        self.availability_repo.add(availability)
+        await self.session.commit()
+        await self._emit(events.AvailabilitySet(voyage_id, remaining_seats, bookings))
+        return availability
+
+    async def add_tickets(self, voyage_id, tickets, chunk_size=5000):
+        """
+        Потоково загрузить билеты рейса пачками по chunk_size строк.
+
+        :param tickets: итерируемый объект, генератор или асинхронный генератор
+            словарей с ключами price и is_active (необязательный)
+        :return: число строк, время загрузки и скорость в строках в секунду
+        """
+        if not await self.voyage_repo.exists(voyage_id):
+            raise ValueError(f"Voyage with ID {voyage_id} not found.")
+
+        started = time.perf_counter()
+        rows_count = 0
+        active_count = 0
+        async for chunk in _achunked(tickets, chunk_size):
+            rows = [
+                {
+                    "price": ticket_data["price"],
+                    "voyage_id": voyage_id,
+                    "is_active": ticket_data.get("is_active", True),
+                }
+                for ticket_data in chunk
+            ]
+            await self.ticket_repo.bulk_insert(rows)
+            rows_count += len(rows)
+            active_count += sum(1 for row in rows if row["is_active"])
+
+        await self.session.commit()
+        await self._emit(events.TicketsAdded(voyage_id, rows_count, active_count))
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": rows_count,
+            "seconds": elapsed,
+            "rows_per_second": rows_count / elapsed if elapsed else 0.0,
+        }
+
+    async def get_schedule_by_date(self, schedule_date: date, profile="summary"):
+        schedule = await self.schedule_repo.get_by_date(schedule_date, profile=profile)
+        if not schedule:
+            raise ValueError(f"No schedule found for date {schedule_date}.")
+        return schedule
+
+    async def get_schedule_summary(self, schedule_date: date):
+        repo = self.summary_repo or self.schedule_repo
+        summary = await repo.get_summary_by_date(schedule_date)
+        if not summary:
+            raise ValueError(f"No schedule found for date {schedule_date}.")
+        return summary
+
+    async def analyze_load(self, voyage_id):
+        repo = self.summary_repo or self.schedule_repo
+        load = await repo.get_voyage_load(voyage_id)
+        if not load or not load["has_availability"]:
+            raise ValueError(f"Availability for voyage ID {voyage_id} not found.")
+        return {
+            "total_seats": load["total_seats"],
+            "sold_seats": load["sold_seats"],
+            "remaining_seats": load["remaining_seats"],
+        }
+
+    async def get_schedule_summary_with_voyages(self, schedule_date: date):
+        rows = await self.schedule_repo.get_voyage_summaries_by_date(schedule_date)
+        if not rows:
+            raise ValueError(f"No schedule found for date {schedule_date}.")
+        return summarize_voyage_rows(rows)
+
+    async def delete_schedule(self, schedule_id):
+        if not await self.schedule_repo.delete_by_id(schedule_id):
+            raise ValueError(f"Schedule with ID {schedule_id} not found.")
+
+        await self.session.commit()
+        await self._emit(events.ScheduleDeleted(schedule_id))
+        return schedule_id
+
+    async def delete_schedules_by_date_range(self, start_date: date, end_date: date):
+        schedule_ids = await self.schedule_repo.delete_by_date_range(start_date, end_date)
+        await self.session.commit()
+        await self._emit(*(events.ScheduleDeleted(schedule_id) for schedule_id in schedule_ids))
+        return schedule_ids
@@ -1,17 +1,94 @@
-from datetime import date
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
 
 from schedule import domain
+from schedule.domain import events
+from schedule.domain.journeys import ConnectionIndex, JourneyPlanner
+from schedule.domain.spatial import GeoGrid
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _by_voyage(items):
+    """Позиции заявок по возрастанию voyage_id; сортировка устойчива"""
+    return sorted(range(len(items)), key=lambda position: items[position]["voyage_id"])
+
+
+def summarize_voyage_rows(rows):
+    """Сводка по расписанию с разбивкой по рейсам из строк get_voyage_summaries_by_date"""
+    voyages = [
+        {
+            "voyage_id": row.voyage_id,
+            "total_tickets": row.total_tickets,
+            "total_seats": (
+                row.remaining_seats + row.bookings if row.remaining_seats is not None else 0
+            ),
+            "remaining_seats": row.remaining_seats,
+        }
+        for row in rows
+        if row.voyage_id is not None
+    ]
+    return {
+        "schedule_date": rows[0].schedule_date,
+        "total_voyages": len(voyages),
+        "total_tickets": sum(voyage["total_tickets"] for voyage in voyages),
+        "total_seats": sum(voyage["total_seats"] for voyage in voyages),
+        "voyages": voyages,
+    }
+
+
+def publish_to(*subscribers):
+    """Значение параметра events, рассылающее каждое событие всем подписчикам по порядку"""
+    def publish(event):
+        for subscriber in subscribers:
+            subscriber(event)
+    return publish
 
 
 class BaseService:
-    def __init__(self, session):
+    def __init__(self, session, events=None):
+        """
+        :param events: необязательный callable, принимающий доменные события
+            после коммита (например, projection.handle или queue.add_message)
+        """
         self.session = session
+        self._publish = events
+
+    def _emit(self, *emitted):
+        if self._publish is not None:
+            self._after_commit(self._publish_all, emitted)
+
+    def _publish_all(self, emitted):
+        for event in emitted:
+            self._publish(event)
+
+    def _after_commit(self, callback, *args):
+        """
+        Побочный эффект коммита (события, сброс кэша, пространственный индекс).
+        Под BatchingUnitOfWork commit() сервиса ещё ничего не фиксирует,
+        поэтому эффект откладывается до реальной фиксации пачки.
+        """
+        defer = getattr(self.session, "defer_until_commit", None)
+        if defer is None:
+            callback(*args)
+        else:
+            defer(callback, *args)
 
 
 class LocationService(BaseService):
-    def __init__(self, session, location_repo):
+    def __init__(self, session, location_repo, spatial_index=None):
+        """
+        :param spatial_index: необязательный GeoGrid из domain/spatial.py;
+            сервис обновляет его после каждого коммита
+        """
         super().__init__(session)
         self.location_repo = location_repo
+        self.spatial_index = spatial_index
 
     def create_location(self, title, latitude, longitude):
         location = domain.Location(
@@ -20,6 +97,8 @@ class LocationService(BaseService):
         )
         self.location_repo.add(location)
         self.session.commit()
+        if self.spatial_index is not None:
+            self._after_commit(self.spatial_index.insert, location.id, latitude, longitude)
         return location
 
     def get_location(self, location_id):
@@ -36,18 +115,48 @@ class LocationService(BaseService):
 
         if title:
             location.title = title
-        if latitude is not None and longitude is not None:
-            location.coordinates = (latitude, longitude)
+        moved = latitude is not None or longitude is not None
+        if moved:
+            # Недостающая координата берётся из текущего положения пункта
+            location.coordinates = (
+                latitude if latitude is not None else location.latitude,
+                longitude if longitude is not None else location.longitude,
+            )
+        coordinates = location.coordinates
 
         self.session.commit()
+        self._after_commit(self.location_repo.invalidate, location_id)
+        if self.spatial_index is not None and moved:
+            self._after_commit(self.spatial_index.insert, location_id, *coordinates)
         return location
 
     def delete_location(self, location_id):
         location = self.get_location(location_id)
         self.session.delete(location)
         self.session.commit()
+        self._after_commit(self.location_repo.invalidate, location_id)
+        if self.spatial_index is not None:
+            self._after_commit(self.spatial_index.remove, location_id)
         return location
 
+    def load_spatial_index(self, cell_degrees=0.5):
+        """Построить индекс по всем пунктам из базы и начать его вести"""
+        self.spatial_index = GeoGrid.from_points(self.location_repo.list_points(), cell_degrees)
+        return self.spatial_index
+
+    def _require_index(self):
+        if self.spatial_index is None:
+            raise ValueError("Spatial index is not loaded; call load_spatial_index first")
+        return self.spatial_index
+
+    def find_nearest(self, latitude, longitude, k=1, max_km=None):
+        """k ближайших пунктов: [(location_id, расстояние в км), ...]"""
+        return self._require_index().nearest(latitude, longitude, k, max_km)
+
+    def find_within(self, latitude, longitude, radius_km):
+        """Пункты в радиусе radius_km: [(location_id, расстояние в км), ...]"""
+        return self._require_index().within(latitude, longitude, radius_km)
+
 
 class VoyageService(BaseService):
     def __init__(self, session, voyage_repo, location_repo):
@@ -83,12 +192,12 @@ class VoyageService(BaseService):
         self.session.commit()
         return voyage
 
-    def get_voyages_by_origin(self, origin_id):
-        return self.voyage_repo.get_by_origin(origin_id)
+    def get_voyages_by_origin(self, origin_id, profile="lazy"):
+        return self.voyage_repo.get_by_origin(origin_id, profile=profile)
 
 class TicketService(BaseService):
-    def __init__(self, session, ticket_repo, voyage_repo):
-        super().__init__(session)
+    def __init__(self, session, ticket_repo, voyage_repo, events=None):
+        super().__init__(session, events)
         self.ticket_repo = ticket_repo
         self.voyage_repo = voyage_repo
 
@@ -106,14 +215,59 @@ class TicketService(BaseService):
         )
         self.ticket_repo.add(ticket)
         self.session.commit()
+        self._emit(events.TicketCreated(ticket.ticket_id, voyage_id, is_active))
+        return ticket
+
+    def update_ticket_status(self, ticket_id, is_active):
+        ticket = self.ticket_repo.get(ticket_id)
+        if not ticket:
+            raise ValueError(f"Ticket with ID {ticket_id} not found")
+
+        changed = ticket.is_active != is_active
+        ticket.is_active = is_active
+        self.session.commit()
+        if changed:
+            self._emit(events.TicketStatusChanged(ticket_id, ticket.voyage_id, is_active))
         return ticket
 
     def get_active_tickets(self, voyage_id):
         return self.ticket_repo.get_active_tickets(voyage_id)
 
-class AvailabilityService(BaseService):
-    def __init__(self, session, availability_repo, voyage_repo):
+class JourneyService(BaseService):
+    def __init__(self, session, voyage_repo, min_transfer=timedelta(minutes=30)):
         super().__init__(session)
+        self.voyage_repo = voyage_repo
+        self.min_transfer = min_transfer
+        self.planner: JourneyPlanner | None = None
+        self._period: tuple[datetime, datetime] | None = None
+
+    def load_period(self, start_date: date, end_date: date):
+        """Построить индекс соединений по рейсам с отправлением с start_date по end_date включительно"""
+        start = datetime.combine(start_date, datetime.min.time())
+        end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        index = ConnectionIndex.from_rows(self.voyage_repo.list_connections(start, end))
+        self.planner = JourneyPlanner(index, min_transfer=self.min_transfer)
+        self._period = (start, end)
+        return self.planner
+
+    def plan_journeys(self, origin_id, destination_id, depart_after: datetime,
+                      arrive_before: datetime | None = None, max_transfers=5):
+        """
+        Маршруты с самым ранним прибытием и с наименьшим числом пересадок.
+
+        :return: словарь с ключами earliest_arrival и fewest_transfers;
+            значение None, если маршрута нет
+        """
+        if self.planner is None or not self._period[0] <= depart_after < self._period[1]:
+            raise ValueError(f"No connection index loaded for {depart_after}; call load_period first.")
+        return self.planner.plan(
+            origin_id, destination_id, depart_after, arrive_before, max_transfers
+        )
+
+
+class AvailabilityService(BaseService):
+    def __init__(self, session, availability_repo, voyage_repo, events=None):
+        super().__init__(session, events)
         self.availability_repo = availability_repo
         self.voyage_repo = voyage_repo
 
@@ -131,21 +285,112 @@ class AvailabilityService(BaseService):
         )
         self.availability_repo.add(availability)
         self.session.commit()
+        self._emit(events.AvailabilitySet(voyage_id, remaining_seats, bookings))
         return availability
 
+    def set_availabilities(self, items):
+        """
+        Задать доступность сразу для нескольких рейсов: одна проверка рейсов
+        и один коммит на всю пачку.
+
+        :param items: список словарей с ключами voyage_id, remaining_seats,
+            bookings и is_active (необязательный)
+        :return: список Availability в порядке items; None для несуществующих рейсов
+        """
+        existing = self.voyage_repo.existing_ids(item["voyage_id"] for item in items)
+        result = []
+        for item in items:
+            if item["voyage_id"] not in existing:
+                result.append(None)
+                continue
+            availability = domain.Availability(
+                voyage_id=item["voyage_id"],
+                remaining_seats=item["remaining_seats"],
+                bookings=item["bookings"],
+                is_active=item.get("is_active", True),
+            )
+            self.availability_repo.add(availability)
+            result.append(availability)
+
+        self.session.commit()
+        self._emit(*(
+            events.AvailabilitySet(item.voyage_id, item.remaining_seats, item.bookings)
+            for item in result
+            if item is not None
+        ))
+        return result
+
     def get_availability(self, voyage_id):
         return self.availability_repo.get_by_voyage(voyage_id)
 
+    def book_seats(self, voyage_id, seats=1):
+        """
+        Забронировать места одним условным UPDATE без блокировок в приложении.
+
+        :return: остаток мест после бронирования
+        """
+        if seats <= 0:
+            raise ValueError("Seats must be positive")
+        remaining = self.availability_repo.reserve(voyage_id, seats)
+        if remaining is None:
+            self.session.rollback()
+            raise ValueError(f"Not enough seats on voyage {voyage_id}")
+        self.session.commit()
+        self._emit(events.SeatsBooked(voyage_id, seats, remaining))
+        return remaining
+
+    def book_seats_batch(self, items):
+        """
+        Забронировать места по нескольким заявкам одним коммитом. Каждая заявка
+        списывается своим условным UPDATE; отказ по одной не отменяет остальные.
+
+        Заявки списываются по возрастанию voyage_id (заявки одного рейса — в
+        исходном порядке): строки блокируются в одном порядке, и встречные
+        пачки не ждут друг друга по кругу (deadlock в PostgreSQL).
+
+        :param items: список словарей с ключами voyage_id и seats
+        :return: остатки мест в порядке items; None для отклонённых заявок
+        """
+        result = [None] * len(items)
+        for position in _by_voyage(items):
+            item = items[position]
+            if item["seats"] > 0:
+                result[position] = self.availability_repo.reserve(item["voyage_id"], item["seats"])
+        self.session.commit()
+        self._emit(*(
+            events.SeatsBooked(item["voyage_id"], item["seats"], remaining)
+            for item, remaining in zip(items, result)
+            if remaining is not None
+        ))
+        return result
+
+    def release_seats(self, voyage_id, seats=1):
+        """Вернуть ранее забронированные места; возвращает остаток мест"""
+        if seats <= 0:
+            raise ValueError("Seats must be positive")
+        remaining = self.availability_repo.release(voyage_id, seats)
+        if remaining is None:
+            self.session.rollback()
+            raise ValueError(f"Cannot release {seats} seats on voyage {voyage_id}")
+        self.session.commit()
+        self._emit(events.SeatsReleased(voyage_id, seats, remaining))
+        return remaining
+
 
 class ScheduleService(BaseService):
     def __init__(self, session, schedule_repo, voyage_repo, location_repo, ticket_repo,
-                 availability_repo):
-        super().__init__(session)
+                 availability_repo, summary_repo=None, events=None):
+        """
+        :param summary_repo: необязательный SummaryRepository; если задан,
+            сводки и загрузка рейсов читаются из модели чтения одной строкой
+        """
+        super().__init__(session, events)
         self.schedule_repo = schedule_repo
         self.voyage_repo = voyage_repo
         self.location_repo = location_repo
         self.ticket_repo = ticket_repo
         self.availability_repo = availability_repo
+        self.summary_repo = summary_repo
 
     def create_schedule(self, schedule_date: date):
         if self.schedule_repo.get_by_date(schedule_date):
@@ -154,6 +399,7 @@ class ScheduleService(BaseService):
         schedule = domain.Schedule(schedule_date=schedule_date)
         self.schedule_repo.add(schedule)
         self.session.commit()
+        self._emit(events.ScheduleCreated(schedule.id, schedule_date))
         return schedule
 
     def add_voyage_to_schedule(
@@ -178,10 +424,11 @@ class ScheduleService(BaseService):
             destination=destination,
             marketing_number=marketing_number,
             vehicle_number=vehicle_number,
-            schedule=schedule,
         )
+        voyage.schedule = schedule
         self.voyage_repo.add(voyage)
         self.session.commit()
+        self._emit(events.VoyageAddedToSchedule(schedule_id, voyage.voyage_id))
         return voyage
 
     def set_availability(self, voyage_id, remaining_seats, bookings, is_active=True):
@@ -197,63 +444,85 @@ class ScheduleService(BaseService):
         )
         self.availability_repo.add(availability)
         self.session.commit()
+        self._emit(events.AvailabilitySet(voyage_id, remaining_seats, bookings))
         return availability
 
-    def add_tickets(self, voyage_id, tickets):
-        voyage = self.voyage_repo.get(voyage_id)
-        if not voyage:
+    def add_tickets(self, voyage_id, tickets, chunk_size=5000):
+        """
+        Потоково загрузить билеты рейса пачками по chunk_size строк.
+
+        :param tickets: любой итерируемый объект или генератор словарей
+            с ключами price и is_active (необязательный)
+        :return: число строк, время загрузки и скорость в строках в секунду
+        """
+        if not self.voyage_repo.exists(voyage_id):
             raise ValueError(f"Voyage with ID {voyage_id} not found.")
 
-        for ticket_data in tickets:
-            ticket = domain.Ticket(
-                ticket_id=None,
-                price=ticket_data["price"],
-                voyage_id=voyage_id,
-                is_active=ticket_data.get("is_active", True),
-            )
-            self.ticket_repo.add(ticket)
+        started = time.perf_counter()
+        rows_count = 0
+        active_count = 0
+        for chunk in _chunked(tickets, chunk_size):
+            rows = [
+                {
+                    "price": ticket_data["price"],
+                    "voyage_id": voyage_id,
+                    "is_active": ticket_data.get("is_active", True),
+                }
+                for ticket_data in chunk
+            ]
+            self.ticket_repo.bulk_insert(rows)
+            rows_count += len(rows)
+            active_count += sum(1 for row in rows if row["is_active"])
 
         self.session.commit()
+        self._emit(events.TicketsAdded(voyage_id, rows_count, active_count))
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": rows_count,
+            "seconds": elapsed,
+            "rows_per_second": rows_count / elapsed if elapsed else 0.0,
+        }
 
-    def get_schedule_by_date(self, schedule_date: date):
-        schedule = self.schedule_repo.get_by_date(schedule_date)
+    def get_schedule_by_date(self, schedule_date: date, profile="lazy"):
+        schedule = self.schedule_repo.get_by_date(schedule_date, profile=profile)
         if not schedule:
             raise ValueError(f"No schedule found for date {schedule_date}.")
         return schedule
 
     def get_schedule_summary(self, schedule_date: date):
-        schedule = self.get_schedule_by_date(schedule_date)
-        voyages = schedule.voyages
-        summary = {
-            "schedule_date": schedule.schedule_date,
-            "total_voyages": len(voyages),
-            "total_tickets": sum(
-                len(self.ticket_repo.get_active_tickets(voyage.voyage_id)) for voyage in
-                voyages),
-            "total_seats": sum(
-                voyage.availability.remaining_seats + voyage.availability.bookings
-                for voyage in voyages
-                if voyage.availability
-            ),
-        }
+        repo = self.summary_repo or self.schedule_repo
+        summary = repo.get_summary_by_date(schedule_date)
+        if not summary:
+            raise ValueError(f"No schedule found for date {schedule_date}.")
         return summary
 
-    def delete_schedule(self, schedule_id):
-        schedule = self.schedule_repo.get(schedule_id)
-        if not schedule:
-            raise ValueError(f"Schedule with ID {schedule_id} not found.")
-
-        for voyage in schedule.voyages:
-            availability = self.availability_repo.get_by_voyage(voyage.voyage_id)
-            if availability:
-                self.session.delete(availability)
+    def analyze_load(self, voyage_id):
+        repo = self.summary_repo or self.schedule_repo
+        load = repo.get_voyage_load(voyage_id)
+        if not load or not load["has_availability"]:
+            raise ValueError(f"Availability for voyage ID {voyage_id} not found.")
+        return {
+            "total_seats": load["total_seats"],
+            "sold_seats": load["sold_seats"],
+            "remaining_seats": load["remaining_seats"],
+        }
 
-            tickets = self.ticket_repo.get_active_tickets(voyage.voyage_id)
-            for ticket in tickets:
-                self.session.delete(ticket)
+    def get_schedule_summary_with_voyages(self, schedule_date: date):
+        rows = self.schedule_repo.get_voyage_summaries_by_date(schedule_date)
+        if not rows:
+            raise ValueError(f"No schedule found for date {schedule_date}.")
+        return summarize_voyage_rows(rows)
 
-            self.session.delete(voyage)
+    def delete_schedule(self, schedule_id):
+        if not self.schedule_repo.delete_by_id(schedule_id):
+            raise ValueError(f"Schedule with ID {schedule_id} not found.")
 
-        self.session.delete(schedule)
         self.session.commit()
+        self._emit(events.ScheduleDeleted(schedule_id))
         return schedule_id
+
+    def delete_schedules_by_date_range(self, start_date: date, end_date: date):
+        schedule_ids = self.schedule_repo.delete_by_date_range(start_date, end_date)
+        self.session.commit()
+        self._emit(*(events.ScheduleDeleted(schedule_id) for schedule_id in schedule_ids))
+        return schedule_ids
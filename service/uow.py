@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 
 from schedule.adapters import Repos
+from schedule.adapters.cache import location_cache
 
 
 class AbstractUnitOfWork(ABC):
@@ -22,11 +23,18 @@ class AbstractUnitOfWork(ABC):
 from sqlalchemy.orm import Session
 
 class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, read_only=False, schedule_cache=None):
         """
         :param session_factory: callable, создающий экземпляр SQLAlchemy Session
+        :param read_only: только чтение (например, с реплики): при выходе
+            транзакция откатывается, а не фиксируется
+        :param schedule_cache: необязательный ScheduleReadCache для uow.schedules,
+            например adapters.cache.schedule_cache; сбрасывается событиями
+            через ScheduleCacheInvalidator
         """
         self.session_factory = session_factory
+        self.read_only = read_only
+        self.schedule_cache = schedule_cache
         self.session: Session | None = None
 
     def __enter__(self):
@@ -34,7 +42,7 @@ class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
+        if exc_type or self.read_only:
             self.rollback()
         else:
             self.commit()
@@ -52,7 +60,7 @@ class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
 
     @property
     def locations(self):
-        return Repos.LocationRepository(self.session)
+        return Repos.LocationRepository(self.session, cache=location_cache)
 
     @property
     def tickets(self):
@@ -61,3 +69,256 @@ class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
     @property
     def availability(self):
         return Repos.AvailabilityRepository(self.session)
+
+    @property
+    def schedules(self):
+        return Repos.ScheduleRepository(self.session, read_cache=self.schedule_cache)
+
+    @property
+    def summaries(self):
+        return Repos.SummaryRepository(self.session)
+
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchingSession:
+    """
+    Обёртка над Session для BatchingUnitOfWork: commit(), вызываемый
+    сервисами, только сбрасывает изменения в базу и отмечает операцию,
+    а реальную фиксацию транзакции решает unit of work. rollback()
+    откатывает только текущую операцию, а не всю пачку.
+    """
+
+    def __init__(self, session, uow):
+        self._session = session
+        self._uow = uow
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __contains__(self, obj):
+        return obj in self._session
+
+    def commit(self):
+        self._session.flush()
+        if not self._uow.in_operation:
+            self._uow.operation_done()
+
+    def defer_until_commit(self, callback, *args):
+        """Отложить побочный эффект операции до фиксации пачки (BaseService._after_commit)"""
+        self._uow.deferred.append((callback, args))
+
+    def rollback(self):
+        """
+        Внутри run() откатывается savepoint операции. Вне run() savepoint'а
+        нет: живая транзакция остаётся, а несброшенные изменения (всё, что
+        сервис успел сделать после прошлого commit) отбрасываются. Если
+        транзакцию сломал сбой flush, спасти пачку нельзя — она откатывается
+        целиком, с предупреждением в логе.
+        """
+        if self._uow.in_operation:
+            self._uow.fail_operation()
+            return
+        transaction = self._session.get_transaction()
+        if transaction is not None and not transaction.is_active:
+            logger.warning(
+                "Batch of %d operations rolled back after a failed flush", self._uow.pending_operations
+            )
+            self._uow.rollback()
+            return
+        for obj in list(self._session.new) + list(self._session.deleted):
+            self._session.expunge(obj)
+        for obj in list(self._session.dirty):
+            self._session.expire(obj)
+
+
+class BatchingUnitOfWork(SQLAlchemyUnitOfWork):
+    def __init__(self, session_factory, batch_size=100, max_delay_ms=None):
+        """
+        Unit of work, фиксирующий транзакцию раз в batch_size операций
+        или раз в max_delay_ms миллисекунд.
+
+        Возраст пачки проверяется только на границах операций и в
+        flush_if_due(): фонового таймера нет, потому что Session не
+        потокобезопасна и фиксировать её из другого потока посреди операции
+        нельзя. Чтобы простаивающая пачка не висела незафиксированной,
+        вызывайте flush_if_due из цикла очереди, например
+        MessageQueue.process_messages(on_idle=uow.flush_if_due).
+
+        :param session_factory: callable, создающий экземпляр SQLAlchemy Session
+        :param batch_size: число операций в одной транзакции
+        :param max_delay_ms: максимальный возраст незафиксированной пачки
+        """
+        super().__init__(session_factory)
+        self.batch_size = batch_size
+        self.max_delay_ms = max_delay_ms
+        self.in_operation = False
+        self.pending_operations = 0
+        self.commits = 0
+        self._batch_started = None
+        self._savepoint = None
+        self._deferred_at = 0
+        # Побочные эффекты операций пачки: выполняются после её фиксации
+        self.deferred: list[tuple] = []
+
+    def __enter__(self):
+        super().__enter__()
+        self._raw_session = self.session
+        self.session = _BatchingSession(self._raw_session, self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            super().__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self.session = self._raw_session
+
+    def run(self, operation, *args, **kwargs):
+        """
+        Выполнить операцию сервиса в отдельном savepoint: при ошибке
+        откатывается только она, остальная пачка сохраняется.
+
+        Для SQLite через pysqlite savepoint'ы работают внутри пачки только
+        с рецептом из документации SQLAlchemy (isolation_level=None и явный
+        BEGIN), см. benchmarks/batched_commits.py.
+        """
+        savepoint = self._savepoint = self._raw_session.begin_nested()
+        self._deferred_at = len(self.deferred)
+        self.in_operation = True
+        try:
+            result = operation(*args, **kwargs)
+            if self._savepoint is not None:
+                self._raw_session.flush()
+        except Exception:
+            self.fail_operation()
+            raise
+        else:
+            # Сервис мог сам откатить операцию (session.rollback()) и не упасть
+            if self._savepoint is not None:
+                savepoint.commit()
+                self.operation_done()
+            return result
+        finally:
+            self.in_operation = False
+            self._savepoint = None
+
+    def fail_operation(self):
+        """Откатить savepoint текущей операции run(); пачка не затрагивается"""
+        if self._savepoint is not None:
+            savepoint, self._savepoint = self._savepoint, None
+            savepoint.rollback()
+            del self.deferred[self._deferred_at:]
+
+    def operation_done(self):
+        if self._batch_started is None:
+            self._batch_started = time.perf_counter()
+        self.pending_operations += 1
+        if self._batch_is_due():
+            self.commit()
+
+    def _batch_is_due(self):
+        if self.pending_operations >= self.batch_size:
+            return True
+        if self.max_delay_ms is None:
+            return False
+        return (time.perf_counter() - self._batch_started) * 1000 >= self.max_delay_ms
+
+    def flush_if_due(self):
+        """Зафиксировать пачку, если она набрана или старше max_delay_ms; вызывать из потока unit of work"""
+        if self.pending_operations and self._batch_is_due():
+            self.commit()
+
+    def commit(self):
+        self._raw_session.commit()
+        self.commits += 1
+        self.pending_operations = 0
+        self._batch_started = None
+        deferred, self.deferred = self.deferred, []
+        for callback, args in deferred:
+            callback(*args)
+
+    def rollback(self):
+        self._raw_session.rollback()
+        self.pending_operations = 0
+        self._batch_started = None
+        self.deferred = []
+
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from schedule.adapters import async_repos
+
+
+class AbstractAsyncUnitOfWork(ABC):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.rollback()
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
+
+
+class AsyncSQLAlchemyUnitOfWork(AbstractAsyncUnitOfWork):
+    def __init__(self, session_factory, schedule_cache=None):
+        """
+        :param session_factory: callable, создающий экземпляр SQLAlchemy AsyncSession,
+            например async_sessionmaker. expire_on_commit сессии выключается:
+            после коммита атрибуты нельзя догрузить неявно (MissingGreenlet)
+        :param schedule_cache: необязательный ScheduleReadCache для сводок uow.schedules
+        """
+        self.session_factory = session_factory
+        self.schedule_cache = schedule_cache
+        self.session: AsyncSession | None = None
+
+    async def __aenter__(self):
+        self.session = self.session_factory()
+        self.session.sync_session.expire_on_commit = False
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            await self.rollback()
+        else:
+            await self.commit()
+        await self.session.close()
+
+    async def commit(self):
+        await self.session.commit()
+
+    async def rollback(self):
+        await self.session.rollback()
+
+    @property
+    def voyages(self):
+        return async_repos.AsyncVoyageRepository(self.session)
+
+    @property
+    def locations(self):
+        return async_repos.AsyncLocationRepository(self.session, cache=location_cache)
+
+    @property
+    def tickets(self):
+        return async_repos.AsyncTicketRepository(self.session)
+
+    @property
+    def availability(self):
+        return async_repos.AsyncAvailabilityRepository(self.session)
+
+    @property
+    def schedules(self):
+        return async_repos.AsyncScheduleRepository(self.session, read_cache=self.schedule_cache)
+
+    @property
+    def summaries(self):
+        return async_repos.AsyncSummaryRepository(self.session)
@@ -0,0 +1,82 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session, clear_mappers
+
+from schedule.adapters import orm
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    orm.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def mappers():
+    orm.start_mappers()
+    yield
+    clear_mappers()
+
+
+@pytest.fixture
+def statements(engine):
+    """Список SQL-запросов, выполненных через движок во время теста"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def seed(engine):
+    """
+    Наполняет базу расписаниями через Core: по три рейса на каждую дату,
+    у каждого рейса есть доступность и билеты (каждый второй неактивен).
+    """
+
+    def seed(*schedule_dates: date, voyages_per_schedule=3, tickets_per_voyage=4):
+        with engine.begin() as conn:
+            if not conn.execute(orm.locations.select()).first():
+                conn.execute(insert(orm.locations), [
+                    {"id": 1, "title": "City A", "latitude": 40.7128, "longitude": -74.0060},
+                    {"id": 2, "title": "City B", "latitude": 34.0522, "longitude": -118.2437},
+                ])
+            for schedule_date in schedule_dates:
+                schedule_id = conn.execute(
+                    insert(orm.schedules).values(schedule_date=schedule_date)
+                ).inserted_primary_key[0]
+                for n in range(voyages_per_schedule):
+                    departure = datetime.combine(schedule_date, datetime.min.time()) + timedelta(hours=8 + n)
+                    voyage_id = conn.execute(insert(orm.voyages).values(
+                        dep_datetime_utc=departure,
+                        arr_datetime_utc=departure + timedelta(hours=2),
+                        origin_id=1,
+                        destination_id=2,
+                        marketing_number=100 + n,
+                        vehicle_number=f"VH{n}",
+                        schedule_id=schedule_id,
+                    )).inserted_primary_key[0]
+                    conn.execute(insert(orm.availability).values(
+                        voyage_id=voyage_id, remaining_seats=40, bookings=10, is_active=True,
+                    ))
+                    if tickets_per_voyage:
+                        conn.execute(insert(orm.tickets), [
+                            {"price": 100.0 + t, "voyage_id": voyage_id, "is_active": t % 2 == 0}
+                            for t in range(tickets_per_voyage)
+                        ])
+
+    return seed
@@ -0,0 +1,180 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from schedule.adapters import async_repos, orm
+from schedule.domain.spatial import GeoGrid
+from schedule.service.async_services import AsyncLocationService, AsyncScheduleService, AsyncTicketService
+from schedule.service.uow import AsyncSQLAlchemyUnitOfWork
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Файловая база, чтобы синхронный и асинхронный движки видели одни данные
+    engine = create_engine(f"sqlite:///{tmp_path / 'schedule.db'}")
+    orm.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}")
+    yield async_sessionmaker(async_engine, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+
+
+def schedule_service(uow):
+    return AsyncScheduleService(
+        uow.session, uow.schedules, uow.voyages, uow.locations, uow.tickets, uow.availability
+    )
+
+
+# Тест: несколько чтений сводок выполняются конкурентно
+def test_concurrent_schedule_summaries(mappers, seed, session_factory):
+    dates = [date(2024, 12, day) for day in range(1, 11)]
+    seed(*dates)
+
+    async def read_summary(schedule_date):
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            return await schedule_service(uow).get_schedule_summary(schedule_date)
+
+    async def main():
+        return await asyncio.gather(*(read_summary(schedule_date) for schedule_date in dates))
+
+    summaries = asyncio.run(main())
+    assert [summary["schedule_date"] for summary in summaries] == dates
+    assert all(summary["total_voyages"] == 3 for summary in summaries)
+    assert all(summary["total_tickets"] == 6 for summary in summaries)
+
+
+# Тест: расписание читается с профилем загрузки без ленивых запросов
+def test_get_schedule_by_date_with_profile(mappers, seed, session_factory):
+    seed(date(2024, 12, 31))
+
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            schedule = await schedule_service(uow).get_schedule_by_date(date(2024, 12, 31))
+            return sum(voyage.availability.remaining_seats for voyage in schedule.voyages)
+
+    assert asyncio.run(main()) == 120
+
+
+# Тест: асинхронная загрузка билетов из асинхронного генератора и удаление расписания
+def test_add_tickets_and_delete_schedule(mappers, seed, session_factory, session):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    voyage_id = session.scalar(select(orm.voyages.c.voyage_id))
+    schedule_id = session.scalar(select(orm.schedules.c.id))
+
+    async def rows():
+        for n in range(250):
+            yield {"price": 100.0 + n}
+
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            stats = await schedule_service(uow).add_tickets(voyage_id, rows(), chunk_size=100)
+            tickets = await AsyncTicketService(uow.session, uow.tickets, uow.voyages).get_active_tickets(
+                voyage_id
+            )
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            await schedule_service(uow).delete_schedule(schedule_id)
+        return stats, tickets
+
+    stats, tickets = asyncio.run(main())
+    assert stats["rows"] == 250
+    assert len(tickets) == 250
+    assert session.scalar(select(func.count()).select_from(orm.tickets)) == 0
+    assert session.scalar(select(func.count()).select_from(orm.voyages)) == 0
+
+
+# Тест: исключение внутри unit of work откатывает изменения
+def test_unit_of_work_rolls_back_on_error(mappers, seed, session_factory, session):
+    seed(date(2024, 12, 31))
+
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            await uow.schedules.delete_by_date_range(date(2024, 12, 1), date(2024, 12, 31))
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+    assert session.scalar(select(func.count()).select_from(orm.schedules)) == 1
+
+
+# Тест: асинхронное потоковое чтение и страницы по отправлению
+def test_stream_and_page(mappers, seed, session_factory):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            ticket_ids = [ticket.ticket_id async for ticket in uow.tickets.stream(chunk_size=5)]
+            schedules = [
+                schedule.schedule_date
+                async for schedule in uow.schedules.stream_by_date_range(
+                    date(2024, 12, 1), date(2024, 12, 31), chunk_size=1
+                )
+            ]
+            first = await uow.voyages.page_by_departure(limit=4)
+            second = await uow.voyages.page_by_departure(after=first.next_after, limit=4)
+            return ticket_ids, schedules, first, second
+
+    ticket_ids, schedules, first, second = asyncio.run(main())
+    assert ticket_ids == list(range(1, 25))
+    assert schedules == [date(2024, 12, 30), date(2024, 12, 31)]
+    assert [voyage.voyage_id for voyage in first.items] == [1, 2, 3, 4]
+    assert [voyage.voyage_id for voyage in second.items] == [5, 6]
+    assert second.next_after is None
+
+
+# Тест: асинхронный LocationService ведёт пространственный индекс
+def test_location_service_spatial_index(mappers, session_factory):
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(session_factory) as uow:
+            service = AsyncLocationService(uow.session, uow.locations)
+            await service.load_spatial_index()
+            moscow = await service.create_location("Москва", 55.7558, 37.6173)
+            spb = await service.create_location("Санкт-Петербург", 59.9343, 30.3351)
+            await service.update_location(moscow.id, longitude=40.0)
+            nearest = service.find_nearest(55.7558, 40.0)[0][0]
+            await service.delete_location(spb.id)
+            return moscow.id, nearest, len(service.spatial_index)
+
+    moscow_id, nearest, size = asyncio.run(main())
+    assert nearest == moscow_id
+    assert size == 1
+
+
+# Тест: сервисы и unit of work работают с фабрикой по умолчанию (expire_on_commit=True)
+def test_default_session_factory(mappers, seed, engine):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}")
+    factory = async_sessionmaker(async_engine)
+    published = []
+
+    async def publish(event):
+        published.append(type(event).__name__)
+
+    async def main():
+        async with factory() as session:
+            tickets = AsyncTicketService(
+                session, async_repos.AsyncTicketRepository(session), async_repos.AsyncVoyageRepository(session),
+                events=publish,
+            )
+            ticket = await tickets.create_ticket(1, 100.0)
+            await tickets.update_ticket_status(1, False)
+            grid = GeoGrid()
+            locations = AsyncLocationService(session, async_repos.AsyncLocationRepository(session), grid)
+            await locations.create_location("City C", 1.0, 2.0)
+            assert 3 in grid
+        async with AsyncSQLAlchemyUnitOfWork(factory) as uow:
+            ticket = await AsyncTicketService(uow.session, uow.tickets, uow.voyages).create_ticket(2, 200.0)
+            return ticket.ticket_id, ticket.voyage_id
+
+    try:
+        assert asyncio.run(main()) == (2, 2)
+    finally:
+        asyncio.run(async_engine.dispose())
+    assert published == ["TicketCreated", "TicketStatusChanged"]
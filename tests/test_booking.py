@@ -0,0 +1,158 @@
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from schedule.adapters import Repos, orm
+from schedule.adapters.projections import ScheduleSummaryProjection
+from schedule.domain import events
+from schedule.service.services import AvailabilityService
+
+
+def make_service(session, publish=None):
+    return AvailabilityService(
+        session, Repos.AvailabilityRepository(session), Repos.VoyageRepository(session), events=publish,
+    )
+
+
+def seats_of(session, voyage_id):
+    availability = orm.availability.c
+    return session.execute(
+        select(availability.remaining_seats, availability.bookings)
+        .where(availability.voyage_id == voyage_id)
+    ).one()
+
+
+# Тест: бронирование списывает места одним условным UPDATE
+def test_book_seats(session, seed, statements):
+    seed(date(2024, 12, 31))
+    published = []
+    service = make_service(session, published.append)
+    statements.clear()
+    assert service.book_seats(1, 3) == 37
+    assert len(statements) == 1
+    assert statements[0].lstrip().startswith("UPDATE availability")
+    assert tuple(seats_of(session, 1)) == (37, 13)
+    assert published == [events.SeatsBooked(1, 3, 37)]
+
+
+# Тест: нехватка мест, неактивная доступность и неверное число мест
+def test_book_seats_rejected(session, seed):
+    seed(date(2024, 12, 31))
+    service = make_service(session)
+    with pytest.raises(ValueError):
+        service.book_seats(1, 41)
+    with pytest.raises(ValueError):
+        service.book_seats(99)
+    with pytest.raises(ValueError):
+        service.book_seats(1, 0)
+    session.execute(orm.availability.update().values(is_active=False).where(orm.availability.c.voyage_id == 2))
+    session.commit()
+    with pytest.raises(ValueError):
+        service.book_seats(2)
+    assert tuple(seats_of(session, 1)) == (40, 10)
+    assert service.book_seats(1, 40) == 0
+
+
+# Тест: пачка заявок одним коммитом, отказы не мешают остальным
+def test_book_seats_batch(session, seed):
+    seed(date(2024, 12, 31))
+    service = make_service(session)
+    result = service.book_seats_batch([
+        {"voyage_id": 1, "seats": 30},
+        {"voyage_id": 1, "seats": 20},
+        {"voyage_id": 2, "seats": 5},
+        {"voyage_id": 99, "seats": 1},
+        {"voyage_id": 1, "seats": 10},
+    ])
+    assert result == [10, None, 35, None, 0]
+    assert tuple(seats_of(session, 1)) == (0, 50)
+
+
+# Тест: пачка списывает места по возрастанию voyage_id, ответы — в исходном порядке
+def test_book_seats_batch_locks_in_voyage_order(session, seed, monkeypatch):
+    seed(date(2024, 12, 31))
+    service = make_service(session)
+    reserve = service.availability_repo.reserve
+    order = []
+
+    def spy(voyage_id, seats):
+        order.append((voyage_id, seats))
+        return reserve(voyage_id, seats)
+
+    monkeypatch.setattr(service.availability_repo, "reserve", spy)
+    result = service.book_seats_batch([
+        {"voyage_id": 3, "seats": 1},
+        {"voyage_id": 1, "seats": 2},
+        {"voyage_id": 2, "seats": 3},
+        {"voyage_id": 1, "seats": 4},
+    ])
+    assert order == [(1, 2), (1, 4), (2, 3), (3, 1)]
+    assert result == [39, 38, 37, 34]
+
+
+# Тест: возврат мест не превышает проданных
+def test_release_seats(session, seed):
+    seed(date(2024, 12, 31))
+    service = make_service(session)
+    assert service.release_seats(1, 10) == 50
+    with pytest.raises(ValueError):
+        service.release_seats(1, 1)
+    assert tuple(seats_of(session, 1)) == (50, 0)
+
+
+# Тест: проекция ведёт остаток мест по событиям бронирования
+def test_projection_follows_bookings(session, engine, seed):
+    seed(date(2024, 12, 31))
+    projection = ScheduleSummaryProjection(engine)
+    projection.rebuild()
+    service = make_service(session, projection.handle)
+    service.book_seats(1, 5)
+    service.book_seats_batch([{"voyage_id": 1, "seats": 2}, {"voyage_id": 2, "seats": 1}])
+    service.release_seats(1, 1)
+    summary_repo = Repos.SummaryRepository(session)
+    schedule_repo = Repos.ScheduleRepository(session)
+    for voyage_id in (1, 2, 3):
+        assert summary_repo.get_voyage_load(voyage_id) == schedule_repo.get_voyage_load(voyage_id)
+    assert summary_repo.get_voyage_load(1)["remaining_seats"] == 34
+
+
+# Тест: параллельные продажи не продают больше, чем есть мест
+def test_concurrent_booking_never_oversells(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'booking.db'}", connect_args={"timeout": 30})
+    orm.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(orm.locations.insert().values(id=1, title="A", latitude=0, longitude=0))
+        conn.execute(orm.schedules.insert().values(id=1, schedule_date=date(2024, 12, 31)))
+        conn.execute(orm.voyages.insert().values(
+            voyage_id=1, dep_datetime_utc=date(2024, 12, 31), arr_datetime_utc=date(2024, 12, 31),
+            origin_id=1, destination_id=1, marketing_number=1, vehicle_number="VH", schedule_id=1,
+        ))
+        conn.execute(orm.availability.insert().values(
+            voyage_id=1, remaining_seats=50, bookings=0, is_active=True,
+        ))
+
+    sold = []
+
+    def buy():
+        with Session(engine) as session:
+            service = make_service(session)
+            for _ in range(20):
+                try:
+                    service.book_seats(1)
+                    sold.append(1)
+                except ValueError:
+                    pass
+
+    threads = [threading.Thread(target=buy) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        assert tuple(seats_of(session, 1)) == (0, 50)
+    assert len(sold) == 50
+    engine.dispose()
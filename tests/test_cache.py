@@ -0,0 +1,322 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from schedule import domain
+from schedule.adapters import Repos
+from schedule.adapters import cache as cache_module
+from schedule.adapters.cache import LRUCache, ScheduleCacheInvalidator, ScheduleReadCache
+from schedule.domain import events
+from schedule.service.services import LocationService, ScheduleService
+
+
+# Тест: вытеснение давно не использованных записей и счётчики
+def test_lru_cache_eviction_and_counters():
+    cache = LRUCache(max_size=2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"
+    cache.put(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(3) == "c"
+    cache.invalidate(3)
+    assert cache.get(3) is None
+    assert cache.stats() == {"hits": 2, "misses": 2, "evictions": 1, "size": 1, "max_size": 2}
+
+
+# Тест: попадание в кэш пунктов не обращается к базе, инвалидация сбрасывает запись
+def test_cached_location_repository_get(mappers, engine, seed, statements):
+    seed(date(2024, 12, 31))
+    cache = LRUCache(max_size=10)
+
+    with Session(engine) as session:
+        repo = Repos.LocationRepository(session, cache=cache)
+        assert repo.get(1).coordinates == (40.7128, -74.0060)
+        assert repo.get(99) is None
+        session.commit()
+
+    statements.clear()
+    with Session(engine) as session:
+        repo = Repos.LocationRepository(session, cache=cache)
+        location = repo.get(1)
+        assert location.title == "City A"
+        assert location in session
+        assert statements == []
+        repo.invalidate(1)
+
+    with Session(engine) as session:
+        repo = Repos.LocationRepository(session, cache=cache)
+        assert repo.get(2).title == "City B"
+        assert repo.get(1).title == "City A"
+        assert len(statements) == 2
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["size"] == 2
+
+
+# Тест: изменения пункта через сервис не оставляют в кэше устаревшую копию
+def test_location_cache_follows_updates(mappers, engine, seed):
+    seed(date(2024, 12, 31))
+    cache = LRUCache(max_size=10)
+
+    with Session(engine) as session:
+        service = LocationService(session, Repos.LocationRepository(session, cache=cache))
+        service.update_location(1, title="Renamed", latitude=1.0, longitude=2.0)
+
+    with Session(engine) as session:
+        location = Repos.LocationRepository(session, cache=cache).get(1)
+        assert (location.title, location.coordinates) == ("Renamed", (1.0, 2.0))
+
+    with Session(engine) as session:
+        repo = Repos.LocationRepository(session, cache=cache)
+        # Пока в сессии есть несброшенное изменение, кэш не читается и не заполняется
+        repo.get(1).title = "Uncommitted"
+        assert repo.get(1).title == "Uncommitted"
+        session.rollback()
+
+    with Session(engine) as session:
+        assert Repos.LocationRepository(session, cache=cache).get(1).title == "Renamed"
+
+
+# Тест: копия, загруженная до инвалидации, не возвращается в кэш
+def test_cached_get_drops_load_invalidated_midway(mappers, engine, seed):
+    seed(date(2024, 12, 31))
+    cache = LRUCache(max_size=10)
+
+    with Session(engine) as session:
+        repo = Repos.LocationRepository(session, cache=cache)
+        load_copy = repo._load_copy
+
+        def load_then_race(obj_id):
+            copy = load_copy(obj_id)
+            cache.invalidate(obj_id)  # параллельный update_location закоммитил изменения
+            return copy
+
+        repo._load_copy = load_then_race
+        assert repo.get(1).title == "City A"
+    assert cache.get(1) is None
+
+
+# Тест: записи с истёкшим TTL считаются промахом
+def test_lru_cache_ttl():
+    cache = LRUCache(max_size=10, ttl=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2, ttl=10)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+# Тест: одновременные промахи по одному ключу загружают значение один раз
+def test_get_or_load_single_flight():
+    cache = LRUCache(max_size=10)
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    def read():
+        barrier.wait()
+        return cache.get_or_load("key", loader)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: read(), range(8)))
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert cache.get("key") == "value"
+
+
+# Тест: ошибка загрузки не кэшируется, инвалидация во время загрузки не даёт сохранить устаревшее
+def test_get_or_load_errors_and_invalidation():
+    cache = LRUCache(max_size=10)
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_load("key", failing)
+    assert cache.get_or_load("key", lambda: 1) == 1
+
+    def invalidated_while_loading():
+        cache.invalidate("other")
+        return "stale"
+
+    assert cache.get_or_load("other", invalidated_while_loading) == "stale"
+    assert cache.get("other") is None
+
+
+# Тест: асинхронный single-flight
+def test_aget_or_load_single_flight():
+    cache = LRUCache(max_size=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("key", loader) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["value"] * 10
+    assert len(calls) == 1
+
+
+# Тест: синхронный читатель и читатели в разных циклах событий ждут одну загрузку
+def test_single_flight_across_threads_and_loops():
+    cache = LRUCache(max_size=10)
+    calls = []
+    started = threading.Event()
+
+    async def slow_loader():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.1)
+        return "value"
+
+    async def read_async():
+        return await cache.aget_or_load("key", slow_loader)
+
+    def read_sync():
+        started.wait()
+        return cache.get_or_load("key", lambda: calls.append(1) or "other")
+
+    def read_other_loop():
+        started.wait()
+        return asyncio.run(read_async())
+
+    with ThreadPoolExecutor(3) as pool:
+        leader = pool.submit(asyncio.run, read_async())
+        sync_reader = pool.submit(read_sync)
+        other_loop = pool.submit(read_other_loop)
+        results = [leader.result(), sync_reader.result(), other_loop.result()]
+    assert results == ["value"] * 3
+    assert len(calls) == 1
+
+
+# Тест: отменённая загрузка не кэшируется, ожидающие загружают сами
+def test_cancelled_leader_hands_over():
+    cache = LRUCache(max_size=10)
+
+    async def main():
+        async def hanging():
+            await asyncio.sleep(10)
+
+        async def quick():
+            return "value"
+
+        leader = asyncio.create_task(cache.aget_or_load("key", hanging))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.aget_or_load("key", quick))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+    assert cache.get("key") == "value"
+
+
+def cached_schedule_service(session, read_cache, publish):
+    return ScheduleService(
+        session,
+        Repos.ScheduleRepository(session, read_cache=read_cache),
+        Repos.VoyageRepository(session),
+        Repos.LocationRepository(session),
+        Repos.TicketRepository(session),
+        Repos.AvailabilityRepository(session),
+        events=publish,
+    )
+
+
+# Тест: чтения по дате кэшируются и точно сбрасываются событиями своей даты
+def test_schedule_read_cache_invalidation(engine, session, seed, statements, mappers):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    read_cache = ScheduleReadCache(max_size=100)
+    invalidator = ScheduleCacheInvalidator(read_cache, engine)
+    service = cached_schedule_service(session, read_cache, invalidator.handle)
+
+    statements.clear()
+    for _ in range(3):
+        assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 6
+        assert service.get_schedule_summary(date(2024, 12, 30))["total_tickets"] == 6
+        assert service.get_schedule_summary_with_voyages(date(2024, 12, 31))["total_voyages"] == 3
+        assert service.get_schedule_summary_with_voyages(date(2024, 12, 30))["total_voyages"] == 3
+    assert len(statements) == 4
+
+    schedule = service.get_schedule_by_date(date(2024, 12, 31))
+    assert schedule in session
+    assert service.get_schedule_by_date(date(2024, 12, 31)) is schedule
+
+    # Рейсы 4-6 относятся к 31 декабря
+    service.add_tickets(4, [{"price": 1.0}])
+    statements.clear()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 7
+    assert service.get_schedule_summary(date(2024, 12, 30))["total_tickets"] == 6
+    assert len(statements) == 1
+
+    service.delete_schedule(1)
+    statements.clear()
+    with pytest.raises(ValueError):
+        service.get_schedule_summary(date(2024, 12, 30))
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 7
+    assert len(statements) == 1
+
+
+# Тест: удаление расписания с неизвестной датой сбрасывает весь кэш
+def test_schedule_read_cache_unknown_schedule(engine):
+    read_cache = ScheduleReadCache(max_size=10)
+    read_cache.get_or_load("summary", date(2024, 12, 31), lambda: {"total_voyages": 1})
+    ScheduleCacheInvalidator(read_cache, engine).handle(events.ScheduleDeleted(schedule_id=42))
+    assert read_cache.stats()["size"] == 0
+
+
+# Тест: чтение внутри незафиксированной записи не попадает в общий кэш
+def test_schedule_read_cache_skips_uncommitted_writes(session, seed, mappers):
+    seed(date(2024, 12, 31))
+    read_cache = ScheduleReadCache(max_size=100)
+    service = cached_schedule_service(session, read_cache, None)
+
+    session.add(domain.Ticket(ticket_id=None, price=1.0, voyage_id=1, is_active=True))
+    session.flush()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 7
+    assert service.get_schedule_summary_with_voyages(date(2024, 12, 31))["total_tickets"] == 7
+    assert read_cache.stats()["size"] == 0
+
+    session.rollback()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 6
+    assert read_cache.stats()["size"] == 1
+
+    # Core-запись без ORM-объектов тоже видна как незафиксированная
+    Repos.TicketRepository(session).bulk_insert([{"price": 1.0, "voyage_id": 1, "is_active": True}])
+    assert service.get_schedule_summary_with_voyages(date(2024, 12, 31))["total_tickets"] == 7
+    session.rollback()
+    assert service.get_schedule_summary_with_voyages(date(2024, 12, 31))["total_tickets"] == 6
+
+
+def test_write_tracking_only_for_cached_sessions(engine, session, seed, mappers):
+    seed(date(2024, 12, 31))
+    # Тест: без кэша слушатели записи не подключаются ни к сессии, ни к движку
+    Repos.ScheduleRepository(session)
+    assert not event.contains(engine, "before_cursor_execute", cache_module._mark_writes)
+
+    # Тест: запись, сделанная до появления репозитория с кэшем, всё равно учитывается
+    Repos.TicketRepository(session).bulk_insert([{"price": 1.0, "voyage_id": 1, "is_active": True}])
+    read_cache = ScheduleReadCache(max_size=100)
+    service = cached_schedule_service(session, read_cache, None)
+    assert event.contains(engine, "before_cursor_execute", cache_module._mark_writes)
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 7
+    assert read_cache.stats()["size"] == 0
+
+    session.rollback()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 6
+    assert read_cache.stats()["size"] == 1
@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from schedule.domain.columnar import ScheduleSnapshot
+from schedule.domain.model import (
+    Availability,
+    Location,
+    Schedule,
+    Ticket,
+    Voyage,
+)
+
+
+@pytest.fixture
+def locations():
+    return [
+        Location("City A", (40.7128, -74.0060)),
+        Location("City B", (34.0522, -118.2437)),
+        Location("City C", (41.8781, -87.6298)),
+    ]
+
+
+@pytest.fixture
+def schedules(locations):
+    result = []
+    ticket_id = 1
+    voyage_id = 1
+    for day in (1, 2):
+        schedule = Schedule(date(2024, 12, day))
+        for hour, (origin, destination) in zip((8, 12, 16), [(0, 1), (1, 2), (0, 1)]):
+            schedule.add_voyage(Voyage(
+                voyage_id=voyage_id,
+                dep_datetime_utc=datetime(2024, 12, day, hour, 0),
+                arr_datetime_utc=datetime(2024, 12, day, hour + voyage_id % 3 + 1, 30),
+                origin=locations[origin],
+                destination=locations[destination],
+                marketing_number=voyage_id,
+                vehicle_number=f"VH{voyage_id}",
+            ))
+            if voyage_id != 5:
+                schedule.add_availability(Availability(
+                    voyage_id=voyage_id,
+                    remaining_seats=40 - voyage_id,
+                    bookings=voyage_id,
+                    is_active=True,
+                ))
+            for n in range(voyage_id):
+                schedule.add_ticket(Ticket(
+                    ticket_id=ticket_id,
+                    price=100.0 + n,
+                    voyage_id=voyage_id,
+                    is_active=n % 2 == 0,
+                ))
+                ticket_id += 1
+            voyage_id += 1
+        result.append(schedule)
+    return result
+
+
+# Тест: векторный анализ загрузки совпадает с Schedule.analyze_load
+def test_analyze_load_matches_schedule(schedules):
+    snapshot = ScheduleSnapshot.from_schedules(schedules)
+    load = snapshot.analyze_load()
+    for schedule in schedules:
+        for voyage_id in schedule.voyages:
+            position = int(np.flatnonzero(load["voyage_id"] == voyage_id)[0])
+            if voyage_id not in schedule.availability:
+                assert not load["has_availability"][position]
+                continue
+            expected = schedule.analyze_load(voyage_id)
+            assert load["total_seats"][position] == expected["total_seats"]
+            assert load["sold_seats"][position] == expected["sold_seats"]
+            assert load["remaining_seats"][position] == expected["remaining_seats"]
+
+
+# Тест: сводка по одному расписанию совпадает с Schedule.get_schedule_summary
+def test_summary_matches_schedule(schedules):
+    for schedule in schedules:
+        snapshot = ScheduleSnapshot.from_schedule(schedule)
+        assert snapshot.get_schedule_summary() == schedule.get_schedule_summary()
+
+
+# Тест: длительность рейсов считается для всех рейсов сразу
+def test_voyage_length(schedules):
+    snapshot = ScheduleSnapshot.from_schedules(schedules)
+    expected = [
+        voyage.voyage_length()
+        for schedule in schedules
+        for voyage in schedule.voyages.values()
+    ]
+    assert snapshot.voyage_length().astype(timedelta).tolist() == expected
+
+
+# Тест: группировка по маршрутам и по дням
+def test_group_totals(schedules, locations):
+    snapshot = ScheduleSnapshot.from_schedules(schedules)
+
+    by_route = snapshot.totals_by_route()
+    routes = {
+        (snapshot.locations[o], snapshot.locations[d]): int(count)
+        for o, d, count in zip(
+            by_route["origin_idx"], by_route["destination_idx"], by_route["total_voyages"]
+        )
+    }
+    assert routes == {(locations[0], locations[1]): 4, (locations[1], locations[2]): 2}
+
+    by_day = snapshot.totals_by_day()
+    assert by_day["day"].tolist() == [date(2024, 12, 1), date(2024, 12, 2)]
+    assert by_day["total_voyages"].tolist() == [3, 3]
+    for position, schedule in enumerate(schedules):
+        summary = schedule.get_schedule_summary()
+        assert by_day["total_seats"][position] == summary["total_seats"]
+        assert by_day["sold_seats"][position] == summary["sold_seats"]
+
+
+# Тест: билеты неизвестных рейсов не приписываются соседним рейсам
+def test_tickets_of_unknown_voyages_are_dropped(schedules):
+    snapshot = ScheduleSnapshot.from_schedules(schedules)
+    sold_seats = snapshot.analyze_load()["sold_seats"].copy()
+    revenue = snapshot.totals_by_day()["revenue"].copy()
+
+    snapshot.ticket_price = np.append(snapshot.ticket_price, [500.0, 500.0])
+    snapshot.ticket_voyage_id = np.append(snapshot.ticket_voyage_id, [0, 99])
+    snapshot.ticket_is_active = np.append(snapshot.ticket_is_active, [True, True])
+
+    assert snapshot.analyze_load()["sold_seats"].tolist() == sold_seats.tolist()
+    assert snapshot.totals_by_day()["revenue"].tolist() == revenue.tolist()
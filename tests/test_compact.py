@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from schedule.domain.compact import (
+    CompactAvailability,
+    CompactLocation,
+    CompactTicket,
+    CompactVoyage,
+)
+from schedule.domain.model import (
+    Availability,
+    Location,
+    Schedule,
+    Ticket,
+    Voyage,
+)
+
+
+@pytest.fixture
+def test_voyage():
+    return Voyage(
+        voyage_id=1,
+        dep_datetime_utc=datetime(2024, 12, 31, 10, 0),
+        arr_datetime_utc=datetime(2024, 12, 31, 14, 0),
+        origin=Location("City A", (40.7128, -74.0060)),
+        destination=Location("City B", (34.0522, -118.2437)),
+        marketing_number=123,
+        vehicle_number="VH123",
+    )
+
+
+# Тест: у компактных объектов нет __dict__
+@pytest.mark.parametrize("obj", [
+    CompactLocation("City A", (40.7128, -74.0060)),
+    CompactTicket(ticket_id=1, price=150.0, voyage_id=1, is_active=True),
+    CompactAvailability(voyage_id=1, remaining_seats=50, bookings=10, is_active=True),
+])
+def test_compact_objects_have_no_dict(obj):
+    assert not hasattr(obj, "__dict__")
+
+
+# Тест: преобразование в доменные объекты и обратно сохраняет данные
+def test_round_trip(test_voyage):
+    compact = CompactVoyage.from_domain(test_voyage)
+    assert not hasattr(compact, "__dict__")
+    restored = compact.to_domain()
+    assert isinstance(restored, Voyage)
+    assert vars(restored) == vars(test_voyage)
+    assert compact.voyage_length() == test_voyage.voyage_length()
+
+    ticket = Ticket(ticket_id=1, price=150.0, voyage_id=1, is_active=True)
+    assert CompactTicket.from_domain(ticket).to_domain() == ticket
+
+    location = test_voyage.origin
+    assert CompactLocation.from_domain(location).to_domain() == location
+
+    availability = Availability(voyage_id=1, remaining_seats=50, bookings=10, is_active=True)
+    assert vars(CompactAvailability.from_domain(availability).to_domain()) == vars(availability)
+
+
+# Тест: Schedule работает с компактными объектами так же, как с доменными
+def test_schedule_accepts_compact_objects(test_voyage):
+    schedule = Schedule(check_aggregates=True)
+    schedule.add_voyage(CompactVoyage.from_domain(test_voyage))
+    schedule.add_availability(CompactAvailability(voyage_id=1, remaining_seats=50, bookings=10, is_active=True))
+    schedule.add_ticket(CompactTicket(ticket_id=1, price=150.0, voyage_id=1, is_active=True))
+    schedule.add_ticket(CompactTicket(ticket_id=2, price=200.0, voyage_id=1, is_active=False))
+    assert schedule.analyze_load(1) == {
+        "total_seats": 60,
+        "sold_seats": 1,
+        "remaining_seats": 50,
+    }
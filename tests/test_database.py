@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import exc, func, select, text
+
+from schedule.adapters import orm
+from schedule.adapters.database import Database
+from schedule.config import Config
+from schedule.service.uow import AsyncSQLAlchemyUnitOfWork, SQLAlchemyUnitOfWork
+
+
+@pytest.fixture
+def config(tmp_path):
+    class TestConfig(Config):
+        DATABASE_URL = f"sqlite:///{tmp_path / 'primary.db'}"
+        READ_REPLICA_URLS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+        DB_POOL_SIZE = 1
+        DB_MAX_OVERFLOW = 1
+        DB_POOL_TIMEOUT = 0.2
+
+    return TestConfig
+
+
+@pytest.fixture
+def database(config):
+    database = Database(config)
+    for engine in [database.engine, *database.replica_engines]:
+        orm.metadata.create_all(engine)
+    yield database
+    database.dispose()
+
+
+# Тест: параметры пула берутся из конфигурации
+def test_engine_uses_config(database):
+    assert database.engine.pool.size() == 1
+    assert database.engine.pool._max_overflow == 1
+    assert database.engine.pool._pre_ping
+    assert len(database.replica_engines) == 1
+
+
+# Тест: unit of work только для чтения идёт на реплику и не фиксирует изменения
+def test_read_only_unit_of_work_uses_replica(database):
+    with SQLAlchemyUnitOfWork(database.session_factory) as uow:
+        uow.session.execute(orm.schedules.insert().values(schedule_date=date(2024, 12, 31)))
+
+    with SQLAlchemyUnitOfWork(database.read_session_factory, read_only=True) as uow:
+        assert uow.session.get_bind() is database.replica_engines[0]
+        assert uow.session.scalar(select(func.count()).select_from(orm.schedules)) == 0
+        uow.session.execute(orm.schedules.insert().values(schedule_date=date(2024, 12, 31)))
+
+    with SQLAlchemyUnitOfWork(database.read_session_factory, read_only=True) as uow:
+        assert uow.session.scalar(select(func.count()).select_from(orm.schedules)) == 0
+
+
+# Тест: статистика пула — выданные соединения, переполнение, ожидание и таймауты
+def test_pool_stats(database):
+    engine = database.engine
+    checkouts = database.pool_stats()["primary"]["checkouts"]
+    first = engine.connect()
+    second = engine.connect()
+    stats = database.pool_stats()["primary"]
+    assert stats["checked_out"] == 2
+    assert stats["overflow_events"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert database.pool_stats()["primary"]["timeouts"] == 1
+
+    released = threading.Timer(0.05, second.close)
+    released.start()
+    with engine.connect() as third:
+        third.execute(text("SELECT 1"))
+    released.join()
+    first.close()
+
+    stats = database.pool_stats()["primary"]
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == checkouts + 3
+    assert stats["wait_seconds_max"] >= 0.2
+    assert "replica_0" in database.pool_stats()
+
+
+# Тест: асинхронные фабрики сессий — тот же пул из конфигурации, чтение на реплике
+def test_async_session_factories(database):
+    async def main():
+        async with AsyncSQLAlchemyUnitOfWork(database.async_session_factory) as uow:
+            await uow.session.execute(orm.schedules.insert().values(schedule_date=date(2024, 12, 31)))
+
+        async with AsyncSQLAlchemyUnitOfWork(database.async_session_factory) as uow:
+            primary = await uow.session.scalar(select(func.count()).select_from(orm.schedules))
+
+        async with AsyncSQLAlchemyUnitOfWork(database.async_read_session_factory) as uow:
+            assert uow.session.get_bind() is database.async_replica_engines[0].sync_engine
+            replica = await uow.session.scalar(select(func.count()).select_from(orm.schedules))
+
+        await database.adispose()
+        return primary, replica
+
+    assert asyncio.run(main()) == (1, 0)
+    pool = database.async_engine.sync_engine.pool
+    assert pool.size() == 1
+    assert pool._max_overflow == 1
+    assert database.pool_stats()["async_primary"]["checkouts"] == 2
+    assert "async_replica_0" in database.pool_stats()
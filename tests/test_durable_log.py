@@ -0,0 +1,82 @@
+import threading
+
+from schedule.domain.commands import CreateTicketCommand
+from schedule.local_queue.durable_log import CommandLog
+from schedule.local_queue.local_queue import MessageQueue
+
+
+# Тест: неподтверждённые команды возвращаются после перезапуска
+def test_replay_unacked(tmp_path):
+    with CommandLog(tmp_path, group_commit_ms=0) as log:
+        seqs = [log.append(CreateTicketCommand(voyage_id=1, price=float(n))) for n in range(3)]
+        log.ack(seqs[1])
+
+    with CommandLog(tmp_path, group_commit_ms=0) as log:
+        replayed = log.replay()
+        assert [seq for seq, _ in replayed] == [seqs[0], seqs[2]]
+        assert [command.price for _, command in replayed] == [0.0, 2.0]
+        assert log.append(CreateTicketCommand(voyage_id=1, price=3.0)) == seqs[2] + 1
+
+
+# Тест: оборванная при сбое запись в хвосте сегмента отбрасывается
+def test_torn_tail_ignored(tmp_path):
+    with CommandLog(tmp_path, group_commit_ms=0) as log:
+        log.append(CreateTicketCommand(voyage_id=1, price=1.0))
+    segment = sorted(tmp_path.glob("*.log"))[0]
+    with open(segment, "ab") as file:
+        file.write(b"M\x02\x00\x00")
+
+    with CommandLog(tmp_path, group_commit_ms=0) as log:
+        assert [command.price for _, command in log.replay()] == [1.0]
+
+
+# Тест: очередь переигрывает команды, которые не успела обработать
+def test_message_queue_recovers_after_crash(tmp_path):
+    log = CommandLog(tmp_path)
+    queue = MessageQueue(log=log)
+    for n in range(5):
+        queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+    log.close()
+
+    handled = []
+    with CommandLog(tmp_path) as log:
+        queue = MessageQueue(log=log)
+        queue.register_handler(CreateTicketCommand, lambda command: handled.append(command.price))
+        queue.process_messages()
+        assert log.pending() == 0
+    assert handled == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    with CommandLog(tmp_path) as log:
+        assert log.replay() == []
+
+
+# Тест: конкурентные производители делят fsync в окне группового коммита
+def test_group_commit(tmp_path):
+    with CommandLog(tmp_path, group_commit_ms=5) as log:
+        def produce():
+            for n in range(50):
+                log.append(CreateTicketCommand(voyage_id=1, price=float(n)))
+
+        threads = [threading.Thread(target=produce) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert log.pending() == 400
+        assert log.fsyncs < 200
+
+
+# Тест: сегменты с подтверждёнными командами удаляются
+def test_compaction(tmp_path):
+    with CommandLog(tmp_path, group_commit_ms=0, segment_bytes=512) as log:
+        seqs = [log.append(CreateTicketCommand(voyage_id=1, price=float(n))) for n in range(50)]
+        assert len(list(tmp_path.glob("*.log"))) > 5
+        for seq in seqs[:-1]:
+            log.ack(seq)
+        log.flush()
+        log.compact()
+        segments = list(tmp_path.glob("*.log"))
+        assert len(segments) <= 3
+
+    with CommandLog(tmp_path, group_commit_ms=0) as log:
+        assert [seq for seq, _ in log.replay()] == [seqs[-1]]
@@ -0,0 +1,131 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from schedule.adapters import Repos, orm
+from schedule.domain.commands import (
+    CreateScheduleCommand,
+    CreateTicketCommand,
+    DeleteScheduleCommand,
+    SetAvailabilityCommand,
+)
+from schedule.local_queue.handlers import CommandHandler
+from schedule.local_queue.local_queue import MessageQueue
+from schedule.service.services import AvailabilityService, ScheduleService
+
+
+@pytest.fixture
+def handler(session, mappers):
+    schedule_service = ScheduleService(
+        session,
+        Repos.ScheduleRepository(session),
+        Repos.VoyageRepository(session),
+        Repos.LocationRepository(session),
+        Repos.TicketRepository(session),
+        Repos.AvailabilityRepository(session),
+    )
+    availability_service = AvailabilityService(
+        session, Repos.AvailabilityRepository(session), Repos.VoyageRepository(session)
+    )
+    return CommandHandler(None, None, None, availability_service, schedule_service)
+
+
+def count_tickets(session, voyage_id):
+    return session.scalar(
+        select(func.count()).select_from(orm.tickets).where(orm.tickets.c.voyage_id == voyage_id)
+    )
+
+
+# Тест: билеты одного рейса вставляются одной массовой операцией с одним коммитом
+def test_create_tickets_coalesced(handler, session, seed, statements):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    commands = [CreateTicketCommand(voyage_id=n % 2 + 1, price=float(n)) for n in range(100)]
+    commands.append(CreateTicketCommand(voyage_id=999, price=1.0))
+    statements.clear()
+
+    results = handler.handle_batch(commands)
+
+    assert [result.command for result in results] == commands
+    assert all(result.ok for result in results[:100])
+    assert results[0].result == {"voyage_id": 1, "rows": 1, "batch": results[0].result["batch"]}
+    assert results[0].result["batch"]["rows"] == 50
+    assert results[0].result is not results[2].result
+    assert isinstance(results[100].error, ValueError)
+    assert count_tickets(session, 1) == 50
+    assert count_tickets(session, 2) == 50
+    inserts = [statement for statement in statements if statement.startswith("INSERT INTO tickets")]
+    assert len(inserts) == 2
+
+
+# Тест: доступность задаётся пачкой, ошибки — у своих команд
+def test_set_availability_coalesced(handler, session, engine, seed):
+    seed(date(2024, 12, 31))
+    with engine.begin() as conn:
+        conn.execute(delete(orm.availability))
+
+    commands = [
+        SetAvailabilityCommand(voyage_id=1, remaining_seats=10, bookings=0),
+        SetAvailabilityCommand(voyage_id=999, remaining_seats=10, bookings=0),
+        SetAvailabilityCommand(voyage_id=2, remaining_seats=20, bookings=5),
+    ]
+    results = handler.handle_batch(commands)
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[2].result.remaining_seats == 20
+    assert isinstance(results[1].error, ValueError)
+    assert session.scalar(select(func.count()).select_from(orm.availability)) == 2
+
+
+# Тест: разнородные команды выполняются по порядку, по одной
+def test_handle_batch_keeps_order_between_types(handler, session, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    commands = [
+        CreateTicketCommand(voyage_id=1, price=1.0),
+        DeleteScheduleCommand(schedule_id=1),
+        CreateTicketCommand(voyage_id=1, price=2.0),
+        DeleteScheduleCommand(schedule_id=1),
+    ]
+    results = handler.handle_batch(commands)
+    assert [result.ok for result in results] == [True, True, False, False]
+    assert count_tickets(session, 1) == 0
+
+
+# Тест: очередь отдаёт команды обработчику пачками
+def test_process_messages_batched(handler, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    queue = MessageQueue()
+    batches = []
+
+    def handle_batch(commands):
+        batches.append(len(commands))
+        return handler.handle_batch(commands)
+
+    for n in range(25):
+        queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+    queue.add_message(CreateScheduleCommand(schedule_date=date(2024, 12, 31)))
+    results = queue.process_messages_batched(handle_batch, max_batch=10)
+    assert batches == [10, 10, 6]
+    assert [result.ok for result in results] == [True] * 25 + [False]
+
+
+# Тест: упавшая команда в пачке откатывается, остальные выполняются
+def test_bad_command_between_good_ones(handler, session, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with engine.begin() as conn:
+        conn.execute(delete(orm.availability).where(orm.availability.c.voyage_id != 1))
+
+    commands = [
+        SetAvailabilityCommand(voyage_id=2, remaining_seats=10, bookings=0),
+        SetAvailabilityCommand(voyage_id=1, remaining_seats=10, bookings=0),
+        SetAvailabilityCommand(voyage_id=3, remaining_seats=30, bookings=0),
+        CreateTicketCommand(voyage_id=2, price=1.0),
+        CreateTicketCommand(voyage_id=2, price=None),
+        CreateTicketCommand(voyage_id=2, price=2.0),
+    ]
+    results = handler.handle_batch(commands)
+
+    assert [result.ok for result in results] == [True, False, True, True, False, True]
+    assert results[2].result.remaining_seats == 30
+    assert session.scalar(select(func.count()).select_from(orm.availability)) == 3
+    assert count_tickets(session, 2) == 2
@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from schedule.adapters import Repos, orm
+from schedule.domain.journeys import ConnectionIndex, JourneyPlanner
+from schedule.service.services import JourneyService
+
+DAY = datetime(2024, 12, 31)
+
+
+def at(hours, minutes=0):
+    return DAY + timedelta(hours=hours, minutes=minutes)
+
+
+CONNECTIONS = [
+    # voyage_id, origin, destination, departure, arrival
+    (1, 1, 2, at(8), at(9)),
+    (2, 2, 3, at(9, 10), at(10)),   # пересадка 10 минут — меньше минимальной
+    (3, 2, 3, at(9, 40), at(10, 30)),
+    (4, 3, 4, at(11), at(12)),
+    (5, 1, 4, at(9), at(13)),       # прямой, но позже
+    (6, 4, 1, at(12, 30), at(14)),
+]
+
+
+@pytest.fixture
+def planner():
+    return JourneyPlanner(ConnectionIndex(CONNECTIONS), min_transfer=timedelta(minutes=30))
+
+
+# Тест: самый ранний маршрут соблюдает минимальное время пересадки
+def test_earliest_arrival(planner):
+    itinerary = planner.earliest_arrival(1, 4, at(7))
+    assert [leg.voyage_id for leg in itinerary.legs] == [1, 3, 4]
+    assert itinerary.arr_datetime_utc == at(12)
+    assert itinerary.transfers == 2
+
+
+# Тест: маршрут с наименьшим числом пересадок
+def test_fewest_transfers(planner):
+    itinerary = planner.fewest_transfers(1, 4, at(7))
+    assert [leg.voyage_id for leg in itinerary.legs] == [5]
+    assert itinerary.transfers == 0
+    assert planner.fewest_transfers(1, 3, at(7)).transfers == 1
+
+
+# Тест: окно времени и недостижимые пункты
+def test_time_window_and_unreachable(planner):
+    assert planner.earliest_arrival(1, 4, at(8, 30)).legs[0].voyage_id == 5
+    assert planner.earliest_arrival(1, 4, at(7), arrive_before=at(11)) is None
+    assert planner.earliest_arrival(4, 2, at(7)) is None
+    assert planner.earliest_arrival(1, 99, at(7)) is None
+    assert planner.plan(1, 4, at(9, 30)) == {"earliest_arrival": None, "fewest_transfers": None}
+
+
+# Тест: результат совпадает с полным перебором на случайной сети
+def test_matches_brute_force():
+    import random
+
+    rng = random.Random(7)
+    connections = []
+    for voyage_id in range(300):
+        origin, destination = rng.sample(range(12), 2)
+        departure = at(0, rng.randrange(0, 20 * 60, 5))
+        connections.append((voyage_id, origin, destination, departure,
+                            departure + timedelta(minutes=rng.randrange(20, 180, 5))))
+    planner = JourneyPlanner(ConnectionIndex(connections), min_transfer=timedelta(minutes=15))
+
+    def brute_force(origin, destination, start):
+        best = {}
+        frontier = [((), origin, start)]
+        for legs_count in range(1, 4):
+            next_frontier = []
+            for legs, stop, ready in frontier:
+                for connection in connections:
+                    if connection[1] == stop and connection[3] >= ready:
+                        path = legs + (connection,)
+                        if connection[2] == destination:
+                            best.setdefault(legs_count, connection[4])
+                            best[legs_count] = min(best[legs_count], connection[4])
+                        next_frontier.append((path, connection[2], connection[4] + timedelta(minutes=15)))
+            frontier = next_frontier
+        return best
+
+    for origin, destination in [(0, 1), (2, 5), (3, 7), (8, 4)]:
+        expected = brute_force(origin, destination, at(0))
+        fewest = planner.fewest_transfers(origin, destination, at(0), max_transfers=2)
+        if not expected:
+            assert fewest is None
+            continue
+        legs_count = min(expected)
+        assert len(fewest.legs) == legs_count
+        assert fewest.arr_datetime_utc == expected[legs_count]
+        earliest = planner.earliest_arrival(origin, destination, at(0))
+        assert earliest.arr_datetime_utc <= min(expected.values())
+        for first, second in zip(earliest.legs, earliest.legs[1:]):
+            assert second.dep_datetime_utc - first.arr_datetime_utc >= timedelta(minutes=15)
+
+
+# Тест: сервис строит индекс по рейсам периода из базы
+def test_journey_service(session, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with engine.begin() as conn:
+        conn.execute(insert(orm.locations).values(id=3, title="City C", latitude=0.0, longitude=0.0))
+        conn.execute(insert(orm.voyages).values(
+            dep_datetime_utc=at(11), arr_datetime_utc=at(12), origin_id=2, destination_id=3,
+            marketing_number=1, vehicle_number="VH", schedule_id=1,
+        ))
+
+    service = JourneyService(session, Repos.VoyageRepository(session))
+    with pytest.raises(ValueError):
+        service.plan_journeys(1, 3, at(7))
+
+    service.load_period(date(2024, 12, 31), date(2024, 12, 31))
+    journeys = service.plan_journeys(1, 3, at(7))
+    assert [leg.voyage_id for leg in journeys["earliest_arrival"].legs] == [1, 4]
+    assert journeys["fewest_transfers"].transfers == 1
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+from schedule.domain.commands import CreateTicketCommand, DeleteScheduleCommand
+from schedule.local_queue.async_queue import AsyncMessageQueue
+from schedule.local_queue.local_queue import MessageQueue
+from schedule.local_queue.workers import PartitionedWorkerPool, default_partition_key
+
+
+# Тест: ключ партиции берётся из идентификаторов команды
+def test_default_partition_key():
+    assert default_partition_key(CreateTicketCommand(voyage_id=7, price=1.0)) == ("voyage_id", 7)
+    assert default_partition_key(DeleteScheduleCommand(schedule_id=3)) == ("schedule_id", 3)
+    assert default_partition_key(object()) is None
+
+
+# Тест: команды одного рейса обрабатываются по порядку, разных — параллельно
+def test_parallel_processing_keeps_per_key_order():
+    queue = MessageQueue()
+    processed = defaultdict(list)
+    threads = set()
+    lock = threading.Lock()
+
+    def handle(command):
+        time.sleep(0.001)
+        with lock:
+            processed[command.voyage_id].append(command.price)
+            threads.add(threading.current_thread().name)
+
+    queue.register_handler(CreateTicketCommand, handle)
+    for n in range(200):
+        queue.add_message(CreateTicketCommand(voyage_id=n % 10, price=float(n)))
+
+    assert queue.process_messages_parallel(workers=4) == []
+    assert sum(len(prices) for prices in processed.values()) == 200
+    for voyage_id, prices in processed.items():
+        assert prices == sorted(prices)
+    assert len(threads) > 1
+
+
+# Тест: ошибки обработчиков собираются, остальные сообщения обрабатываются
+def test_parallel_processing_collects_errors():
+    queue = MessageQueue()
+    handled = []
+
+    def handle(command):
+        if command.price < 0:
+            raise ValueError("negative price")
+        handled.append(command)
+
+    queue.register_handler(CreateTicketCommand, handle)
+    queue.add_message(CreateTicketCommand(voyage_id=1, price=-1.0))
+    queue.add_message(CreateTicketCommand(voyage_id=1, price=1.0))
+    errors = queue.process_messages_parallel(workers=2)
+    assert [type(error) for _, error in errors] == [ValueError]
+    assert len(handled) == 1
+
+
+# Тест: при остановке пул дообрабатывает принятые сообщения и больше не принимает новые
+def test_graceful_shutdown():
+    handled = []
+    pool = PartitionedWorkerPool(lambda message: (time.sleep(0.001), handled.append(message)), workers=2)
+    pool.start()
+    for n in range(50):
+        pool.submit(CreateTicketCommand(voyage_id=n, price=1.0))
+    pool.shutdown()
+    assert len(handled) == 50
+    with pytest.raises(RuntimeError):
+        pool.submit(CreateTicketCommand(voyage_id=1, price=1.0))
+
+
+# Тест: заполненная очередь заставляет производителя ждать
+def test_async_queue_backpressure():
+    async def main():
+        queue = AsyncMessageQueue(maxsize=2)
+        await queue.add_message(CreateTicketCommand(voyage_id=1, price=1.0))
+        await queue.add_message(CreateTicketCommand(voyage_id=1, price=2.0))
+        producer = asyncio.create_task(queue.add_message(CreateTicketCommand(voyage_id=1, price=3.0)))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+        assert len(await queue.get_batch(10)) == 2
+        await asyncio.wait_for(producer, 1)
+        assert queue.qsize() == 1
+
+    asyncio.run(main())
+
+
+# Тест: пачки, асинхронные обработчики и flush
+def test_async_queue_batches_and_flush():
+    async def main():
+        queue = AsyncMessageQueue(maxsize=10)
+        handled = []
+        batches = []
+
+        async def handle(command):
+            await asyncio.sleep(0)
+            if command.price < 0:
+                raise ValueError("negative price")
+            handled.append(command.price)
+
+        queue.register_handler(CreateTicketCommand, handle)
+        original_get_batch = queue.get_batch
+
+        async def get_batch(max_messages):
+            batch = await original_get_batch(max_messages)
+            batches.append(len(batch))
+            return batch
+
+        queue.get_batch = get_batch
+        queue.start(batch_size=4)
+
+        async def produce(start):
+            for n in range(start, start + 25):
+                await queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+
+        await asyncio.gather(produce(0), produce(100))
+        await queue.add_message(CreateTicketCommand(voyage_id=1, price=-1.0))
+        await queue.flush()
+        assert len(handled) == 50
+        assert [type(error) for _, error in queue.errors] == [ValueError]
+        assert max(batches) <= 4
+        assert len(batches) < 51
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+# Тест: drain обрабатывает накопленные сообщения без фоновой задачи
+def test_async_queue_drain():
+    async def main():
+        queue = AsyncMessageQueue()
+        handled = []
+        queue.register_handler(CreateTicketCommand, handled.append)
+        for n in range(5):
+            await queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+        await queue.drain(batch_size=2)
+        assert len(handled) == 5
+        assert queue.qsize() == 0
+
+    asyncio.run(main())
+
+
+# Тест: список ошибок ограничен, счётчик учитывает все
+def test_async_queue_errors_bounded():
+    async def main():
+        queue = AsyncMessageQueue(max_errors=3)
+
+        def fail(command):
+            raise ValueError(command.price)
+
+        queue.register_handler(CreateTicketCommand, fail)
+        for n in range(10):
+            await queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+        await queue.drain()
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.error_count == 10
+    assert [command.price for command, _ in queue.errors] == [7.0, 8.0, 9.0]
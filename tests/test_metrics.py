@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from schedule.domain.commands import CreateTicketCommand, DeleteScheduleCommand
+from schedule.local_queue.async_queue import AsyncMessageQueue
+from schedule.local_queue.handlers import CommandResult
+from schedule.local_queue.local_queue import MessageQueue
+from schedule.local_queue.metrics import Histogram, QueueMetrics
+
+
+# Тест: квантили оцениваются по корзинам гистограммы
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        histogram.observe(0.005)
+    for _ in range(10):
+        histogram.observe(0.5)
+    assert histogram.count == 100
+    assert 0 < histogram.quantile(0.5) <= 0.01
+    assert 0.1 < histogram.quantile(0.99) <= 1.0
+
+
+# Тест: задержка, время SQL, ошибки и медленные команды по типам команд
+def test_queue_metrics(engine):
+    metrics = QueueMetrics(slow_threshold=0.02)
+    metrics.instrument_engine(engine)
+    queue = MessageQueue(metrics=metrics)
+
+    def create_ticket(command):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        if command.price < 0:
+            raise ValueError("negative price")
+        if command.price > 100:
+            time.sleep(0.03)
+
+    queue.register_handler(CreateTicketCommand, create_ticket)
+    for price in (1.0, 2.0, 200.0, -1.0):
+        queue.add_message(CreateTicketCommand(voyage_id=1, price=price))
+    queue.add_message(DeleteScheduleCommand(schedule_id=1))
+    assert metrics.snapshot()["queue_depth"] == 5
+
+    errors = queue.process_messages_parallel(workers=2)
+    assert [type(error) for _, error in errors] == [ValueError]
+
+    snapshot = metrics.snapshot()
+    assert snapshot["queue_depth"] == 0
+    assert snapshot["enqueued"] == 5
+    assert snapshot["wait_seconds"]["count"] == 5
+    tickets = snapshot["commands"]["CreateTicketCommand"]
+    assert tickets["count"] == 4
+    assert tickets["errors"] == 1
+    assert tickets["sql_seconds"] > 0
+    assert snapshot["errors"] == {"CreateTicketCommand": 1, "DeleteScheduleCommand": 1}
+    assert [entry["command_type"] for entry in snapshot["slow_commands"]] == ["CreateTicketCommand"]
+
+    exported = metrics.to_prometheus()
+    assert 'schedule_queue_command_seconds_count{command="CreateTicketCommand"} 4' in exported
+    assert 'schedule_queue_command_errors_total{command="CreateTicketCommand"} 1' in exported
+    assert 'schedule_queue_wait_seconds_bucket{le="+Inf"} 5' in exported
+
+
+# Тест: пачка учитывается по типам своих команд, время делится между ними
+def test_batched_metrics_by_command_type():
+    metrics = QueueMetrics(slow_threshold=0.02)
+    queue = MessageQueue(metrics=metrics)
+
+    def handle_batch(commands):
+        time.sleep(0.03)
+        return [
+            CommandResult(command, error=ValueError("bad") if isinstance(command, DeleteScheduleCommand) else None)
+            for command in commands
+        ]
+
+    for n in range(3):
+        queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+    queue.add_message(DeleteScheduleCommand(schedule_id=1))
+    queue.process_messages_batched(handle_batch)
+
+    snapshot = metrics.snapshot()
+    tickets = snapshot["commands"]["CreateTicketCommand"]
+    schedules = snapshot["commands"]["DeleteScheduleCommand"]
+    assert "batch" not in snapshot["commands"]
+    assert (tickets["count"], tickets["errors"]) == (3, 0)
+    assert (schedules["count"], schedules["errors"]) == (1, 1)
+    assert tickets["sum"] == pytest.approx(3 * schedules["sum"])
+    assert tickets["sum"] + schedules["sum"] >= 0.03
+    assert snapshot["slow_commands"][0]["command"] == "CreateTicketCommand=3, DeleteScheduleCommand=1"
+
+
+# Тест: время SQL учитывается и для асинхронных обработчиков
+def test_async_queue_metrics(tmp_path):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+        metrics = QueueMetrics()
+        metrics.instrument_engine(engine.sync_engine)
+        queue = AsyncMessageQueue(metrics=metrics)
+
+        async def create_ticket(command):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        queue.register_handler(CreateTicketCommand, create_ticket)
+        for n in range(3):
+            await queue.add_message(CreateTicketCommand(voyage_id=1, price=float(n)))
+        await queue.drain()
+        await engine.dispose()
+        return metrics.snapshot()
+
+    snapshot = asyncio.run(main())
+    assert snapshot["commands"]["CreateTicketCommand"]["count"] == 3
+    assert snapshot["commands"]["CreateTicketCommand"]["sql_seconds"] > 0
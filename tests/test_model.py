@@ -122,3 +122,114 @@ def test_schedule_repr(test_schedule, test_voyage, test_availability, test_ticke
     assert "1 voyages" in repr_output
     assert "1 availabilities" in repr_output
     assert "2 tickets" in repr_output
+
+# Тест: выборка по диапазону дат возвращает рейсы в порядке отправления
+def test_get_schedule_by_date_range_sorted(test_schedule, test_origin, test_destination):
+    for voyage_id, hour in [(1, 15), (2, 9), (3, 12), (4, 20)]:
+        test_schedule.add_voyage(Voyage(
+            voyage_id=voyage_id,
+            dep_datetime_utc=datetime(2024, 12, 31, hour, 0),
+            arr_datetime_utc=datetime(2024, 12, 31, hour + 2, 0),
+            origin=test_origin,
+            destination=test_destination,
+            marketing_number=100 + voyage_id,
+            vehicle_number=f"VH{voyage_id}",
+        ))
+    result = test_schedule.get_schedule_by_date(
+        datetime(2024, 12, 31, 9, 0), datetime(2024, 12, 31, 15, 0)
+    )
+    assert [voyage.voyage_id for voyage in result] == [2, 3, 1]
+
+# Тест: замена рейса и билета обновляет индексы
+def test_indexes_follow_replacements(test_schedule, test_voyage, test_origin, test_destination):
+    test_schedule.add_voyage(test_voyage)
+    test_schedule.add_voyage(Voyage(
+        voyage_id=2,
+        dep_datetime_utc=datetime(2024, 12, 31, 18, 0),
+        arr_datetime_utc=datetime(2024, 12, 31, 20, 0),
+        origin=test_origin,
+        destination=test_destination,
+        marketing_number=456,
+        vehicle_number="VH456",
+    ))
+    test_schedule.add_ticket(Ticket(ticket_id=1, price=100.0, voyage_id=1, is_active=True))
+    test_schedule.add_ticket(Ticket(ticket_id=1, price=100.0, voyage_id=2, is_active=True))
+    assert test_schedule.get_tickets_by_voyage(1) == []
+    assert [ticket.ticket_id for ticket in test_schedule.get_tickets_by_voyage(2)] == [1]
+
+    moved = Voyage(
+        voyage_id=1,
+        dep_datetime_utc=datetime(2024, 12, 31, 22, 0),
+        arr_datetime_utc=datetime(2024, 12, 31, 23, 0),
+        origin=test_origin,
+        destination=test_destination,
+        marketing_number=123,
+        vehicle_number="VH123",
+    )
+    test_schedule.add_voyage(moved)
+    result = test_schedule.get_schedule_by_date(
+        datetime(2024, 12, 31, 0, 0), datetime(2024, 12, 31, 23, 59)
+    )
+    assert [voyage.voyage_id for voyage in result] == [2, 1]
+
+# Тест: рейс, чьё время изменили на месте, можно добавить повторно
+def test_readd_voyage_moved_in_place(test_schedule, test_voyage):
+    test_schedule.add_voyage(test_voyage)
+    test_voyage.dep_datetime_utc = datetime(2024, 12, 31, 20, 0)
+    test_schedule.add_voyage(test_voyage)
+    assert test_schedule.get_schedule_by_date(
+        datetime(2024, 12, 31, 9, 0), datetime(2024, 12, 31, 11, 0)
+    ) == []
+    assert test_schedule.get_schedule_by_date(
+        datetime(2024, 12, 31, 19, 0), datetime(2024, 12, 31, 21, 0)
+    ) == [test_voyage]
+
+# Тест: агрегаты загрузки следят за статусом билетов и заменой доступности
+def test_load_aggregates_follow_changes(test_voyage, test_availability, test_ticket1, test_ticket2):
+    schedule = Schedule(check_aggregates=True)
+    schedule.add_voyage(test_voyage)
+    schedule.add_availability(test_availability)
+    schedule.add_ticket(test_ticket1)
+    schedule.add_ticket(test_ticket2)
+    assert schedule.get_schedule_summary() == {
+        "total_voyages": 1,
+        "total_tickets": 2,
+        "total_seats": 60,
+        "sold_seats": 1,
+    }
+
+    schedule.set_ticket_status(2, True)
+    assert schedule.analyze_load(1)["sold_seats"] == 2
+
+    schedule.add_ticket(Ticket(ticket_id=1, price=150.0, voyage_id=1, is_active=False))
+    assert schedule.analyze_load(1)["sold_seats"] == 1
+
+    schedule.add_availability(Availability(voyage_id=1, remaining_seats=30, bookings=5, is_active=True))
+    assert schedule.get_schedule_summary()["total_seats"] == 35
+    assert schedule.analyze_load(1)["total_seats"] == 35
+
+# Тест: режим проверки обнаруживает изменения в обход агрегатов
+def test_check_aggregates_detects_drift(test_voyage, test_ticket1):
+    schedule = Schedule(check_aggregates=True)
+    schedule.add_voyage(test_voyage)
+    schedule.add_ticket(test_ticket1)
+    test_ticket1.is_active = False
+    with pytest.raises(RuntimeError):
+        schedule.get_schedule_summary()
+
+# Тест: set_ticket_status после прямого присваивания возвращает агрегаты в согласие
+def test_set_ticket_status_repairs_direct_assignment(test_voyage, test_ticket1, test_ticket2):
+    schedule = Schedule(check_aggregates=True)
+    schedule.add_voyage(test_voyage)
+    schedule.add_ticket(test_ticket1)
+    schedule.add_ticket(test_ticket2)
+    for ticket_id, is_active in ((2, True), (2, True), (1, False), (2, False), (1, True)):
+        schedule.set_ticket_status(ticket_id, is_active)
+        schedule.verify_aggregates()
+    assert schedule.get_schedule_summary()["sold_seats"] == 1
+
+    test_ticket1.is_active = False
+    with pytest.raises(RuntimeError):
+        schedule.verify_aggregates()
+    schedule.set_ticket_status(1, False)
+    assert schedule.get_schedule_summary()["sold_seats"] == 0
@@ -0,0 +1,118 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from schedule.adapters import Repos, orm
+
+
+# Тест: профиль "summary" загружает рейсы и доступность фиксированным числом запросов
+def test_schedule_summary_profile(mappers, session, seed, statements):
+    seed(date(2024, 12, 31), voyages_per_schedule=20)
+    statements.clear()
+    schedule = Repos.ScheduleRepository(session).get_by_date(date(2024, 12, 31), profile="summary")
+    total_seats = sum(
+        voyage.availability.remaining_seats + voyage.availability.bookings
+        for voyage in schedule.voyages
+    )
+    assert total_seats == 20 * 50
+    assert len(statements) == 3
+
+
+# Тест: без профиля обход графа даёт N+1 запросов
+def test_schedule_lazy_profile(mappers, session, seed, statements):
+    seed(date(2024, 12, 31), voyages_per_schedule=20)
+    statements.clear()
+    schedule = Repos.ScheduleRepository(session).get_by_date(date(2024, 12, 31))
+    for voyage in schedule.voyages:
+        voyage.availability
+    assert len(statements) == 2 + 20
+
+
+# Тест: профиль для списка рейсов по пункту отправления
+def test_voyages_by_origin_summary_profile(mappers, session, seed, statements):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    statements.clear()
+    voyages = Repos.VoyageRepository(session).get_by_origin(1, profile="summary")
+    assert len(voyages) == 6
+    assert all(voyage.availability.remaining_seats == 40 for voyage in voyages)
+    assert len(statements) == 2
+
+
+# Тест: профиль "full" загружает пункты, билеты и доступность без ленивых запросов
+def test_voyages_by_origin_full_profile(mappers, session, seed, statements):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    statements.clear()
+    voyages = Repos.VoyageRepository(session).get_by_origin(1, profile="full")
+    assert len(voyages) == 6
+    assert {voyage.origin.title for voyage in voyages} == {"City A"}
+    assert voyages[0].destination.coordinates == (34.0522, -118.2437)
+    assert all(len(voyage.tickets) == 4 for voyage in voyages)
+    assert all(voyage.availability.remaining_seats == 40 for voyage in voyages)
+    assert len(statements) == 3
+
+
+# Тест: неизвестный профиль
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        orm.voyage_loader_options("everything")
+
+
+class FakeCopy:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.cursor.rows.append(row)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statement = None
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, statement, buffer):
+        self.statement = statement
+        self.rows = [tuple(line.split(",")) for line in buffer.read().splitlines()]
+
+    def copy(self, statement):
+        self.statement = statement
+        return FakeCopy(self)
+
+
+class FakeConnection:
+    def __init__(self, driver):
+        self.cursor = FakeCursor()
+        self.dialect = SimpleNamespace(driver=driver)
+        self.connection = SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=lambda: self.cursor))
+
+    def __call__(self):
+        return self
+
+
+@pytest.mark.parametrize("driver, expected_rows", [
+    ("psycopg2", [("10.5", "1", "True"), ("20.0", "2", "False")]),
+    ("psycopg", [(10.5, 1, True), (20.0, 2, False)]),
+])
+def test_ticket_bulk_insert_uses_copy(driver, expected_rows):
+    # Тест: на psycopg2 и psycopg 3 билеты вставляются через COPY
+    connection = FakeConnection(driver)
+    repo = Repos.TicketRepository(SimpleNamespace(connection=connection))
+    repo.bulk_insert([
+        {"price": 10.5, "voyage_id": 1, "is_active": True},
+        {"price": 20.0, "voyage_id": 2, "is_active": False},
+    ])
+    assert connection.cursor.statement.startswith("COPY tickets (price, voyage_id, is_active) FROM STDIN")
+    assert connection.cursor.rows == expected_rows
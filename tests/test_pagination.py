@@ -0,0 +1,80 @@
+import gc
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from schedule.adapters import Repos, orm
+
+
+def collect_pages(fetch, **kwargs):
+    pages, after = [], None
+    while True:
+        page = fetch(after=after, **kwargs)
+        pages.append(page.items)
+        if page.next_after is None:
+            return pages
+        after = page.next_after
+
+
+# Тест: страницы по первичному ключу покрывают все строки без повторов
+def test_page_by_primary_key(session, seed, mappers, statements):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    repo = Repos.TicketRepository(session)
+    statements.clear()
+    pages = collect_pages(repo.page, limit=5)
+    assert [len(items) for items in pages] == [5, 5, 5, 5, 4]
+    assert [ticket.ticket_id for items in pages for ticket in items] == list(range(1, 25))
+    assert len(statements) == 5
+
+    pages = collect_pages(repo.page, limit=2, voyage_id=3)
+    assert [[ticket.ticket_id for ticket in items] for items in pages] == [[9, 10], [11, 12]]
+    assert repo.page(after=24).items == []
+
+
+# Тест: страницы рейсов по отправлению с одинаковым временем отправления
+def test_page_by_departure(session, seed, mappers, engine):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    with engine.begin() as conn:
+        conn.execute(insert(orm.voyages).values(
+            voyage_id=7, dep_datetime_utc=datetime(2024, 12, 30, 9),
+            arr_datetime_utc=datetime(2024, 12, 30, 11), origin_id=1, destination_id=2,
+            marketing_number=1, vehicle_number="VH", schedule_id=1,
+        ))
+    repo = Repos.VoyageRepository(session)
+    pages = collect_pages(repo.page_by_departure, limit=2)
+    assert [[voyage.voyage_id for voyage in items] for items in pages] == [[1, 2], [7, 3], [4, 5], [6]]
+
+    page = repo.page_by_departure(limit=2, start=datetime(2024, 12, 30, 9), end=datetime(2024, 12, 31))
+    assert [voyage.voyage_id for voyage in page.items] == [2, 7]
+    assert page.next_after == (datetime(2024, 12, 30, 9), 7)
+    assert [voyage.voyage_id for voyage in repo.page_by_departure(after=page.next_after).items] == [3, 4, 5, 6]
+
+
+# Тест: потоковое чтение держит в сессии не больше порции объектов
+def test_stream_keeps_memory_flat(session, seed, mappers):
+    seed(date(2024, 12, 31), voyages_per_schedule=5, tickets_per_voyage=200)
+    repo = Repos.TicketRepository(session)
+    peak = 0
+    ticket_ids = []
+    for ticket in repo.stream(chunk_size=50):
+        ticket_ids.append(ticket.ticket_id)
+        if len(ticket_ids) % 25 == 0:
+            gc.collect()
+            peak = max(peak, len(session.identity_map))
+    assert ticket_ids == list(range(1, 1001))
+    assert peak <= 100
+    assert len(list(repo.stream(chunk_size=7, voyage_id=2, is_active=True))) == 100
+
+
+# Тест: расписания и рейсы периода читаются потоком в порядке дат
+def test_stream_by_date_range(session, seed, mappers):
+    seed(date(2024, 12, 29), date(2024, 12, 31), date(2024, 12, 30))
+    schedules = Repos.ScheduleRepository(session).stream_by_date_range(
+        date(2024, 12, 30), date(2024, 12, 31), chunk_size=1
+    )
+    assert [schedule.schedule_date for schedule in schedules] == [date(2024, 12, 30), date(2024, 12, 31)]
+
+    voyages = Repos.VoyageRepository(session).stream_by_departure(
+        start=datetime(2024, 12, 30), end=datetime(2024, 12, 31), chunk_size=2
+    )
+    assert [voyage.voyage_id for voyage in voyages] == [7, 8, 9]
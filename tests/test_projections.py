@@ -0,0 +1,138 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, insert
+
+from schedule.adapters import Repos, orm
+from schedule.adapters.projections import ScheduleSummaryProjection
+from schedule.domain import events
+from schedule.local_queue.durable_log import CommandLog
+from schedule.local_queue.local_queue import MessageQueue
+from schedule.service.services import ScheduleService, TicketService
+
+
+@pytest.fixture
+def projection(engine):
+    return ScheduleSummaryProjection(engine)
+
+
+def make_schedule_service(session, publish=None):
+    return ScheduleService(
+        session,
+        Repos.ScheduleRepository(session),
+        Repos.VoyageRepository(session),
+        Repos.LocationRepository(session),
+        Repos.TicketRepository(session),
+        Repos.AvailabilityRepository(session),
+        summary_repo=Repos.SummaryRepository(session),
+        events=publish,
+    )
+
+
+def assert_read_model_in_sync(session, schedule_date, voyage_ids):
+    schedule_repo = Repos.ScheduleRepository(session)
+    summary_repo = Repos.SummaryRepository(session)
+    assert summary_repo.get_summary_by_date(schedule_date) == schedule_repo.get_summary_by_date(schedule_date)
+    for voyage_id in voyage_ids:
+        assert summary_repo.get_voyage_load(voyage_id) == schedule_repo.get_voyage_load(voyage_id)
+
+
+# Тест: rebuild пересчитывает модель чтения по нормализованным таблицам
+def test_rebuild(projection, session, seed):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    projection.rebuild()
+    assert_read_model_in_sync(session, date(2024, 12, 31), range(1, 7))
+    assert make_schedule_service(session).analyze_load(4) == {
+        "total_seats": 50, "sold_seats": 2, "remaining_seats": 40,
+    }
+
+
+# Тест: сводка и загрузка рейса читаются одной строкой модели чтения
+def test_summary_single_row_read(projection, session, seed, statements):
+    seed(date(2024, 12, 31))
+    projection.rebuild()
+    service = make_schedule_service(session)
+    statements.clear()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 6
+    assert len(statements) == 1
+    assert "schedule_summaries" in statements[0]
+    with pytest.raises(ValueError):
+        service.get_schedule_summary(date(2025, 1, 1))
+
+
+# Тест: события сервисов инкрементально обновляют модель чтения
+def test_projection_follows_service_events(projection, session, engine, seed, mappers):
+    seed(date(2024, 12, 31))
+    with engine.begin() as conn:
+        conn.execute(delete(orm.availability).where(orm.availability.c.voyage_id == 1))
+    projection.rebuild()
+
+    schedule_service = make_schedule_service(session, projection.handle)
+    ticket_service = TicketService(
+        session, Repos.TicketRepository(session), Repos.VoyageRepository(session), events=projection.handle
+    )
+    with pytest.raises(ValueError):
+        schedule_service.analyze_load(1)
+
+    schedule_service.set_availability(1, remaining_seats=30, bookings=5)
+    schedule_service.add_tickets(1, [{"price": 10.0}, {"price": 10.0, "is_active": False}])
+    ticket = ticket_service.create_ticket(2, price=5.0)
+    ticket_service.update_ticket_status(ticket.ticket_id, False)
+    ticket_service.update_ticket_status(1, True)
+    ticket_service.update_ticket_status(1, True)
+    assert_read_model_in_sync(session, date(2024, 12, 31), [1, 2, 3])
+    assert schedule_service.analyze_load(1) == {"total_seats": 35, "sold_seats": 3, "remaining_seats": 30}
+
+    with engine.begin() as conn:
+        conn.execute(insert(orm.voyages).values(
+            voyage_id=10, dep_datetime_utc=datetime(2024, 12, 31, 20),
+            arr_datetime_utc=datetime(2024, 12, 31, 22), origin_id=1, destination_id=2,
+            marketing_number=1, vehicle_number="VH", schedule_id=1,
+        ))
+    projection.handle(events.VoyageAddedToSchedule(schedule_id=1, voyage_id=10))
+    assert_read_model_in_sync(session, date(2024, 12, 31), [10])
+
+    schedule_service.delete_schedule(1)
+    assert Repos.SummaryRepository(session).get_summary_by_date(date(2024, 12, 31)) is None
+    assert Repos.SummaryRepository(session).get_voyage_load(1) is None
+
+
+# Тест: события можно доставлять в проекцию через MessageQueue
+def test_projection_through_queue(projection, session, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    projection.rebuild()
+    queue = MessageQueue()
+    projection.register(queue)
+
+    service = make_schedule_service(session, queue.add_message)
+    service.add_tickets(2, [{"price": 1.0}] * 3)
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 0
+
+    queue.process_messages()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 3
+    assert_read_model_in_sync(session, date(2024, 12, 31), [1, 2, 3])
+
+
+# Тест: повторная доставка из журнала очереди не учитывается дважды
+def test_projection_ignores_replayed_events(projection, session, seed, tmp_path, monkeypatch):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    projection.rebuild()
+    log = CommandLog(tmp_path / "log", group_commit_ms=0)
+    queue = MessageQueue(log=log)
+    projection.register(queue)
+    service = make_schedule_service(session, queue.add_message)
+    service.add_tickets(2, [{"price": 1.0}] * 3)
+    queue.add_message(events.ScheduleCreated(99, date(2025, 1, 1)))
+    monkeypatch.setattr(log, "ack", lambda seq: None)  # «падение» до записи ACK
+    queue.process_messages()
+    monkeypatch.undo()
+    log.close()
+
+    with CommandLog(tmp_path / "log", group_commit_ms=0) as log:
+        queue = MessageQueue(log=log)
+        projection.register(queue)
+        queue.process_messages()
+    assert service.get_schedule_summary(date(2024, 12, 31))["total_tickets"] == 3
+    assert_read_model_in_sync(session, date(2024, 12, 31), [1, 2, 3])
+
+    assert projection.prune_applied(datetime.utcnow() + timedelta(seconds=1)) == 2
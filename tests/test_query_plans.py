@@ -0,0 +1,81 @@
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from schedule.adapters import Repos, orm
+
+# Полный просмотр таблицы: "SCAN tickets" / "SCAN TABLE tickets" без индекса
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?(?P<table>\w+)(?! USING)( |$)")
+
+
+@pytest.fixture
+def explain(engine, session, seed):
+    """Выполняет вызов репозитория и возвращает планы всех его запросов"""
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+
+    def explain(call):
+        executed = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            executed.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            call(session)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert executed
+        with engine.connect() as conn:
+            return [
+                (statement, [
+                    row.detail
+                    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                ])
+                for statement, parameters in executed
+            ]
+
+    return explain
+
+
+REPOSITORY_QUERIES = {
+    "VoyageRepository.get": lambda s: Repos.VoyageRepository(s).get(1),
+    "VoyageRepository.get_by_origin": lambda s: Repos.VoyageRepository(s).get_by_origin(1),
+    "VoyageRepository.get_by_origin[summary]": lambda s: Repos.VoyageRepository(s).get_by_origin(
+        1, profile="summary"
+    ),
+    "VoyageRepository.exists": lambda s: Repos.VoyageRepository(s).exists(1),
+    "TicketRepository.get": lambda s: Repos.TicketRepository(s).get(1),
+    "TicketRepository.get_active_tickets": lambda s: Repos.TicketRepository(s).get_active_tickets(1),
+    "AvailabilityRepository.get_by_voyage": lambda s: Repos.AvailabilityRepository(s).get_by_voyage(1),
+    "ScheduleRepository.get": lambda s: Repos.ScheduleRepository(s).get(1),
+    "ScheduleRepository.get_by_date": lambda s: Repos.ScheduleRepository(s).get_by_date(
+        date(2024, 12, 31)
+    ),
+    "ScheduleRepository.get_by_date[summary]": lambda s: Repos.ScheduleRepository(s).get_by_date(
+        date(2024, 12, 31), profile="summary"
+    ),
+    "ScheduleRepository.list_by_date_range": lambda s: Repos.ScheduleRepository(s).list_by_date_range(
+        date(2024, 12, 30), date(2024, 12, 31)
+    ),
+    "ScheduleRepository.get_summary_by_date": lambda s: Repos.ScheduleRepository(s).get_summary_by_date(
+        date(2024, 12, 31)
+    ),
+    "ScheduleRepository.get_voyage_summaries_by_date": (
+        lambda s: Repos.ScheduleRepository(s).get_voyage_summaries_by_date(date(2024, 12, 31))
+    ),
+    "ScheduleRepository.delete_by_id": lambda s: Repos.ScheduleRepository(s).delete_by_id(1),
+    "ScheduleRepository.delete_by_date_range": lambda s: Repos.ScheduleRepository(s).delete_by_date_range(
+        date(2024, 12, 30), date(2024, 12, 31)
+    ),
+}
+
+
+# Тест: ни один запрос репозиториев не просматривает таблицу целиком
+@pytest.mark.parametrize("call", REPOSITORY_QUERIES.values(), ids=REPOSITORY_QUERIES.keys())
+def test_repository_queries_use_indexes(mappers, explain, call):
+    for statement, plan in explain(call):
+        full_scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+        assert not full_scans, f"{statement}\n{plan}"
@@ -0,0 +1,240 @@
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from schedule.adapters import Repos, orm
+from schedule.adapters.seat_counters import SeatCounters
+from schedule.local_queue.durable_log import CommandLog
+from schedule.service.services import AvailabilityService
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Файл, а не память: счётчики и сессии работают через разные соединения
+    engine = create_engine(f"sqlite:///{tmp_path / 'seats.db'}", connect_args={"timeout": 30})
+    orm.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def seats_in_db(engine, voyage_id):
+    availability = orm.availability.c
+    with engine.connect() as conn:
+        return tuple(conn.execute(
+            select(availability.remaining_seats, availability.bookings)
+            .where(availability.voyage_id == voyage_id)
+        ).one())
+
+
+# Тест: продажи меняют счётчик, а база обновляется пачкой при flush
+def test_write_behind(engine, seed, statements):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine, shards=4)
+    assert counters.reserve(1, 5) == 35
+    assert counters.reserve(1, 5) == 30
+    assert counters.release(1, 2) == 32
+    assert counters.reserve(2, 1) == 39
+    assert seats_in_db(engine, 1) == (40, 10)
+
+    statements.clear()
+    assert counters.flush() == 4
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+    assert seats_in_db(engine, 1) == (32, 18)
+    assert seats_in_db(engine, 2) == (39, 11)
+    assert counters.flush() == 0
+
+
+# Тест: счётчик не продаёт больше мест и не возвращает больше проданных
+def test_guards(engine, seed):
+    seed(date(2024, 12, 31))
+    with engine.begin() as conn:
+        conn.execute(orm.availability.update().where(orm.availability.c.voyage_id == 2).values(is_active=False))
+    counters = SeatCounters(engine)
+    assert counters.reserve(1, 41) is None
+    assert counters.reserve(1, 40) == 0
+    assert counters.reserve(1, 1) is None
+    assert counters.reserve(2, 1) is None
+    assert counters.reserve(99, 1) is None
+    assert counters.release(3, 11) is None
+    assert counters.remaining(99) is None
+
+
+# Тест: AvailabilityService бронирует через счётчики без изменений в сервисе
+def test_service_with_buffered_repository(engine, seed, session):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine)
+    service = AvailabilityService(
+        session, Repos.BufferedAvailabilityRepository(session, counters), Repos.VoyageRepository(session)
+    )
+    assert service.book_seats(1, 39) == 1
+    with pytest.raises(ValueError):
+        service.book_seats(1, 2)
+    counters.stop()
+    assert seats_in_db(engine, 1) == (1, 49)
+
+
+# Тест: параллельные продажи с фоновой записью не продают лишнего
+def test_concurrent_reserve_with_background_flush(engine, seed):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine, shards=2)
+    counters.start(interval=0.001)
+    sold = []
+
+    def buy():
+        for n in range(100):
+            if counters.reserve(1 + n % 3, 1) is not None:
+                sold.append(1)
+
+    threads = [threading.Thread(target=buy) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters.stop()
+
+    assert len(sold) == 120
+    for voyage_id in (1, 2, 3):
+        assert seats_in_db(engine, voyage_id) == (0, 50)
+
+
+# Тест: после сбоя дельты из журнала применяются при старте ровно один раз
+def test_reconcile_after_crash(engine, seed, tmp_path):
+    seed(date(2024, 12, 31))
+    log = CommandLog(tmp_path / "log", group_commit_ms=0)
+    counters = SeatCounters(engine, log=log)
+    counters.reserve(1, 3)
+    counters.flush()
+    counters.reserve(1, 4)
+    counters.release(1, 1)
+    log.close()  # «падение» до записи последних дельт в базу
+    assert seats_in_db(engine, 1) == (37, 13)
+
+    with CommandLog(tmp_path / "log", group_commit_ms=0) as log:
+        counters = SeatCounters(engine, log=log)
+        assert counters.reconcile() == 2
+        assert seats_in_db(engine, 1) == (34, 16)
+        assert counters.remaining(1) == 34
+    with CommandLog(tmp_path / "log", group_commit_ms=0) as log:
+        assert SeatCounters(engine, log=log).reconcile() == 0
+    assert seats_in_db(engine, 1) == (34, 16)
+
+
+# Тест: пачка попала в базу, но ACK не дошли до журнала — повтора нет
+def test_reconcile_skips_applied_batch(engine, seed, tmp_path, monkeypatch):
+    seed(date(2024, 12, 31))
+    log = CommandLog(tmp_path / "log", group_commit_ms=0)
+    counters = SeatCounters(engine, log=log)
+    counters.reserve(2, 5)
+    counters.reserve(3, 1)
+    monkeypatch.setattr(log, "ack", lambda seq: None)
+    counters.flush()
+    monkeypatch.undo()
+    log.close()
+    assert seats_in_db(engine, 2) == (35, 15)
+
+    with CommandLog(tmp_path / "log", group_commit_ms=0) as log:
+        counters = SeatCounters(engine, log=log)
+        assert counters.reconcile() == 0
+        assert log.pending() == 0
+        counters.reserve(2, 1)
+        counters.flush()
+    assert seats_in_db(engine, 2) == (34, 16)
+    assert seats_in_db(engine, 3) == (39, 11)
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(orm.seat_counter_flushes)) == 1
+
+
+# Тест: при ошибке записи дельты остаются и уходят следующей попыткой
+def test_failed_flush_keeps_deltas(engine, seed, monkeypatch):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine)
+    counters.reserve(1, 2)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(counters.engine, "begin", fail)
+    with pytest.raises(RuntimeError):
+        counters.flush()
+    monkeypatch.undo()
+    assert counters.flush() == 1
+    assert seats_in_db(engine, 1) == (38, 12)
+
+
+# Тест: запись доступности через репозиторий сбрасывает счётчик после коммита
+def test_set_availability_resets_counter(engine, seed, session, mappers):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine)
+    service = AvailabilityService(
+        session, Repos.BufferedAvailabilityRepository(session, counters), Repos.VoyageRepository(session)
+    )
+    assert counters.reserve(1, 5) == 35
+    with engine.begin() as conn:
+        conn.execute(orm.availability.delete().where(orm.availability.c.voyage_id == 1))
+
+    service.set_availability(1, remaining_seats=7, bookings=0)
+    assert counters.remaining(1) == 7
+    assert seats_in_db(engine, 1) == (7, 0)
+
+
+# Тест: дельта, уводящая остаток ниже нуля, отклоняется и остаётся в журнале неподтверждённой
+def test_flush_rejects_negative_remaining(engine, seed, caplog, tmp_path):
+    seed(date(2024, 12, 31))
+    log = CommandLog(tmp_path / "log", group_commit_ms=0)
+    counters = SeatCounters(engine, log=log)
+    assert counters.reserve(1, 5) == 35
+    assert counters.reserve(2, 1) == 39
+    with engine.begin() as conn:
+        conn.execute(orm.availability.update().where(orm.availability.c.voyage_id == 1).values(remaining_seats=2))
+
+    with caplog.at_level("ERROR", logger="schedule.adapters.seat_counters"):
+        assert counters.flush() == 2
+    assert "rejected {1: 5}" in caplog.text
+    assert [(voyage_id, seats) for _, voyage_id, seats in counters.rejected] == [(1, 5)]
+    assert log.pending() == 1
+    assert seats_in_db(engine, 1) == (2, 10)
+    assert seats_in_db(engine, 2) == (39, 11)
+    assert counters.remaining(1) == 2
+    log.close()
+
+    # Сверка при старте пробует отклонённую дельту снова
+    with CommandLog(tmp_path / "log", group_commit_ms=0) as log:
+        with engine.begin() as conn:
+            conn.execute(orm.availability.update().where(orm.availability.c.voyage_id == 1).values(remaining_seats=20))
+        assert SeatCounters(engine, log=log).reconcile() == 1
+        assert log.pending() == 0
+    assert seats_in_db(engine, 1) == (15, 15)
+
+
+# Тест: перечитанный счётчик учитывает дельты, ещё не записанные в базу
+def test_reloaded_counter_includes_pending_deltas(engine, seed):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine)
+    assert counters.reserve(1, 5) == 35
+    shard = counters._shard(1)
+    with shard.lock:
+        shard.counters.pop(1)
+    assert counters.remaining(1) == 35
+    assert counters.reserve(1, 35) == 0
+    assert counters.reserve(1, 1) is None
+    counters.flush()
+    assert seats_in_db(engine, 1) == (0, 50)
+
+
+# Тест: счётчик читается из базы без блокировки шарда
+def test_counter_loads_outside_shard_lock(engine, seed, monkeypatch):
+    seed(date(2024, 12, 31))
+    counters = SeatCounters(engine, shards=1)
+    connect = engine.connect
+    held = []
+
+    def checked_connect():
+        held.append(counters._shard(1).lock.locked())
+        return connect()
+
+    monkeypatch.setattr(engine, "connect", checked_connect)
+    assert counters.reserve(1, 1) == 39
+    assert counters.remaining(2) == 40
+    assert held == [False, False]
@@ -0,0 +1,132 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from schedule.adapters import Repos, orm
+from schedule.service.services import ScheduleService
+
+
+@pytest.fixture
+def schedule_service(session):
+    return ScheduleService(
+        session,
+        Repos.ScheduleRepository(session),
+        Repos.VoyageRepository(session),
+        Repos.LocationRepository(session),
+        Repos.TicketRepository(session),
+        Repos.AvailabilityRepository(session),
+    )
+
+
+# Тест: сводка по расписанию считается одним запросом
+def test_get_schedule_summary_single_query(schedule_service, seed, statements):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    statements.clear()
+    summary = schedule_service.get_schedule_summary(date(2024, 12, 31))
+    assert summary == {
+        "schedule_date": date(2024, 12, 31),
+        "total_voyages": 3,
+        "total_tickets": 6,
+        "total_seats": 150,
+    }
+    assert len(statements) == 1
+
+
+# Тест: сводка по пустому расписанию
+def test_get_schedule_summary_empty_schedule(schedule_service, seed):
+    seed(date(2024, 12, 31), voyages_per_schedule=0)
+    assert schedule_service.get_schedule_summary(date(2024, 12, 31)) == {
+        "schedule_date": date(2024, 12, 31),
+        "total_voyages": 0,
+        "total_tickets": 0,
+        "total_seats": 0,
+    }
+
+
+# Тест: отсутствующее расписание
+def test_get_schedule_summary_not_found(schedule_service):
+    with pytest.raises(ValueError):
+        schedule_service.get_schedule_summary(date(2024, 12, 31))
+    with pytest.raises(ValueError):
+        schedule_service.get_schedule_summary_with_voyages(date(2024, 12, 31))
+
+
+# Тест: разбивка по рейсам за тот же единственный запрос
+def test_get_schedule_summary_with_voyages(schedule_service, seed, statements):
+    seed(date(2024, 12, 31))
+    statements.clear()
+    summary = schedule_service.get_schedule_summary_with_voyages(date(2024, 12, 31))
+    assert len(statements) == 1
+    assert summary["total_voyages"] == 3
+    assert summary["total_tickets"] == 6
+    assert summary["total_seats"] == 150
+    assert [voyage["total_tickets"] for voyage in summary["voyages"]] == [2, 2, 2]
+    assert [voyage["remaining_seats"] for voyage in summary["voyages"]] == [40, 40, 40]
+
+
+def count_rows(session, table):
+    return session.scalar(select(func.count()).select_from(table))
+
+
+# Тест: удаление расписания убирает рейсы, доступность и все билеты
+def test_delete_schedule_bulk(schedule_service, session, seed):
+    seed(date(2024, 12, 30), date(2024, 12, 31))
+    schedule_id = session.scalar(
+        select(orm.schedules.c.id).where(orm.schedules.c.schedule_date == date(2024, 12, 31))
+    )
+    assert schedule_service.delete_schedule(schedule_id) == schedule_id
+    assert count_rows(session, orm.schedules) == 1
+    assert count_rows(session, orm.voyages) == 3
+    assert count_rows(session, orm.availability) == 3
+    # Неактивные билеты тоже удаляются
+    assert count_rows(session, orm.tickets) == 12
+
+
+# Тест: удаление несуществующего расписания
+def test_delete_schedule_not_found(schedule_service):
+    with pytest.raises(ValueError):
+        schedule_service.delete_schedule(42)
+
+
+# Тест: удаление расписаний за период
+def test_delete_schedules_by_date_range(schedule_service, session, seed):
+    seed(date(2024, 12, 29), date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 1))
+    deleted = schedule_service.delete_schedules_by_date_range(date(2024, 12, 30), date(2024, 12, 31))
+    assert len(deleted) == 2
+    assert sorted(session.scalars(select(orm.schedules.c.schedule_date)).all()) == [
+        date(2024, 12, 29), date(2025, 1, 1),
+    ]
+    assert count_rows(session, orm.voyages) == 6
+    assert count_rows(session, orm.availability) == 6
+    assert count_rows(session, orm.tickets) == 24
+    assert schedule_service.delete_schedules_by_date_range(date(2024, 12, 30), date(2024, 12, 31)) == []
+
+
+# Тест: потоковая загрузка билетов пачками из генератора
+def test_add_tickets_streams_in_chunks(schedule_service, session, seed, statements):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    voyage_id = session.scalar(select(orm.voyages.c.voyage_id))
+    consumed = []
+
+    def rows():
+        for n in range(2_500):
+            consumed.append(n)
+            yield {"price": 100.0 + n % 7, "is_active": n % 10 != 0}
+
+    statements.clear()
+    stats = schedule_service.add_tickets(voyage_id, rows(), chunk_size=1_000)
+    assert stats["rows"] == 2_500
+    assert stats["rows_per_second"] > 0
+    assert len(consumed) == 2_500
+    assert len([statement for statement in statements if statement.startswith("INSERT")]) == 3
+    assert count_rows(session, orm.tickets) == 2_500
+    assert session.scalar(
+        select(func.count()).where(orm.tickets.c.voyage_id == voyage_id, orm.tickets.c.is_active.is_(True))
+    ) == 2_250
+
+
+# Тест: загрузка билетов для несуществующего рейса
+def test_add_tickets_unknown_voyage(schedule_service):
+    with pytest.raises(ValueError):
+        schedule_service.add_tickets(42, [{"price": 100.0}])
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+from sqlalchemy import insert
+
+from schedule.adapters import Repos, orm
+from schedule.domain.spatial import GeoGrid, haversine_km
+from schedule.service.services import LocationService
+
+CITIES = [
+    # location_id, latitude, longitude
+    (1, 55.7558, 37.6173),    # Москва
+    (2, 59.9343, 30.3351),    # Санкт-Петербург
+    (3, 56.3269, 44.0059),    # Нижний Новгород
+    (4, 64.7314, 177.5015),   # Анадырь
+    (5, 65.0000, -168.0000),  # Аляска, за 180-м меридианом
+]
+
+
+@pytest.fixture
+def grid():
+    return GeoGrid.from_points(CITIES)
+
+
+# Тест: формула гаверсинуса даёт известное расстояние
+def test_haversine():
+    assert haversine_km(55.7558, 37.6173, 59.9343, 30.3351) == pytest.approx(634, abs=2)
+    assert haversine_km(10, 20, 10, 20) == 0
+
+
+# Тест: поиск в радиусе и ближайших, включая переход через 180-й меридиан
+def test_within_and_nearest(grid):
+    assert [location_id for location_id, _ in grid.within(55.7558, 37.6173, 700)] == [1, 3, 2]
+    assert [location_id for location_id, _ in grid.nearest(56, 40, k=2)] == [1, 3]
+    assert grid.nearest(65, 179.9, k=2)[1][0] == 5
+    assert grid.nearest(0, 0, k=1, max_km=100) == []
+    assert len(grid.nearest(0, 0, k=10)) == 5
+
+
+# Тест: инкрементальные вставка, перемещение и удаление
+def test_incremental_updates(grid):
+    grid.insert(6, 55.75, 37.62)
+    assert grid.nearest(55.75, 37.62)[0][0] == 6
+    grid.insert(6, -33.86, 151.21)
+    assert grid.nearest(55.75, 37.62)[0][0] == 1
+    assert grid.nearest(-33.86, 151.21)[0][0] == 6
+    grid.remove(6)
+    grid.remove(6)
+    assert 6 not in grid
+    assert len(grid) == 5
+
+
+# Тест: результат совпадает с полным перебором на случайных точках
+def test_matches_brute_force():
+    rng = random.Random(7)
+    points = [(i, rng.uniform(-89, 89), rng.uniform(-180, 180)) for i in range(2000)]
+    grid = GeoGrid.from_points(points, cell_degrees=2.0)
+    for _ in range(50):
+        latitude, longitude = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        radius = rng.uniform(10, 3000)
+        expected = sorted(
+            (haversine_km(latitude, longitude, lat, lon), location_id)
+            for location_id, lat, lon in points
+        )
+        within = {location_id for distance, location_id in expected if distance <= radius}
+        assert {location_id for location_id, _ in grid.within(latitude, longitude, radius)} == within
+        nearest = grid.nearest(latitude, longitude, k=5)
+        assert [distance for _, distance in nearest] == pytest.approx([d for d, _ in expected[:5]])
+
+
+# Тест: сервис строит индекс по таблице пунктов
+def test_service_loads_index(session):
+    session.execute(insert(orm.locations), [
+        {"id": location_id, "title": f"L{location_id}", "latitude": lat, "longitude": lon}
+        for location_id, lat, lon in CITIES
+    ])
+    service = LocationService(session, Repos.LocationRepository(session))
+    with pytest.raises(ValueError):
+        service.find_nearest(55, 37)
+
+    service.load_spatial_index()
+    assert service.find_nearest(59.9, 30.3)[0][0] == 2
+    assert [location_id for location_id, _ in service.find_within(55.7558, 37.6173, 10)] == [1]
+
+
+# Тест: создание, перемещение и удаление пункта через сервис обновляют индекс
+def test_service_updates_index_incrementally(session, mappers):
+    service = LocationService(session, Repos.LocationRepository(session))
+    service.load_spatial_index()
+    moscow = service.create_location("Москва", 55.7558, 37.6173)
+    spb = service.create_location("Санкт-Петербург", 59.9343, 30.3351)
+    assert service.find_nearest(55.7, 37.6)[0][0] == moscow.id
+    assert len(service.spatial_index) == 2
+
+    service.update_location(moscow.id, latitude=-33.86, longitude=151.21)
+    assert service.find_nearest(55.7, 37.6)[0][0] == spb.id
+    assert service.find_nearest(-33.8, 151.2)[0][0] == moscow.id
+
+    # Одна координата: вторая остаётся прежней, строка и индекс согласованы
+    service.update_location(spb.id, latitude=60.5)
+    assert service.get_location(spb.id).coordinates == (60.5, 30.3351)
+    assert service.find_within(60.5, 30.3351, 1)[0][0] == spb.id
+    assert GeoGrid.from_points(Repos.LocationRepository(session).list_points()).within(60.5, 30.3351, 1)[0][0] == spb.id
+
+    service.delete_location(moscow.id)
+    assert moscow.id not in service.spatial_index
+    assert service.find_nearest(-33.8, 151.2)[0][0] == spb.id
+    assert [location.title for location in service.list_locations()] == ["Санкт-Петербург"]
@@ -0,0 +1,166 @@
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from schedule import domain
+from schedule.adapters import Repos, orm
+from schedule.adapters.cache import LRUCache
+from schedule.domain.commands import CreateTicketCommand
+from schedule.local_queue.local_queue import MessageQueue
+from schedule.local_queue.handlers import CommandHandler
+from schedule.service.services import AvailabilityService, LocationService, TicketService
+from schedule.service.uow import BatchingUnitOfWork
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Файловая база: зафиксированные данные видны из других соединений
+    engine = create_engine(f"sqlite:///{tmp_path / 'schedule.db'}")
+    orm.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def savepoint_engine(engine):
+    # Рецепт SQLAlchemy для pysqlite: без него SAVEPOINT внутри пачки не работает
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    engine.dispose()
+    return engine
+
+
+def committed_tickets(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(orm.tickets))
+
+
+# Тест: транзакция фиксируется раз в batch_size операций и при выходе
+def test_commits_every_batch_size_operations(mappers, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(engine), batch_size=3) as uow:
+        service = TicketService(uow.session, uow.tickets, uow.voyages)
+        for n in range(7):
+            service.create_ticket(voyage_id=1, price=100.0 + n)
+            assert committed_tickets(engine) == (n + 1) // 3 * 3
+        assert uow.commits == 2
+    assert committed_tickets(engine) == 7
+
+
+# Тест: пачка фиксируется по времени
+def test_commits_after_max_delay(mappers, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(engine), batch_size=1000, max_delay_ms=0) as uow:
+        service = TicketService(uow.session, uow.tickets, uow.voyages)
+        service.create_ticket(voyage_id=1, price=100.0)
+        assert committed_tickets(engine) == 1
+
+
+# Тест: простаивающая пачка фиксируется из цикла очереди через flush_if_due
+def test_idle_batch_flushed_from_queue_loop(mappers, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(engine), batch_size=1000, max_delay_ms=20) as uow:
+        service = TicketService(uow.session, uow.tickets, uow.voyages)
+        queue = MessageQueue()
+        queue.register_handler(
+            CreateTicketCommand, lambda command: service.create_ticket(command.voyage_id, command.price)
+        )
+        queue.add_message(CreateTicketCommand(voyage_id=1, price=100.0))
+        queue.process_messages(on_idle=uow.flush_if_due)
+        assert committed_tickets(engine) == 0
+
+        time.sleep(0.03)
+        queue.process_messages(on_idle=uow.flush_if_due)
+        assert committed_tickets(engine) == 1
+        assert uow.commits == 1
+
+
+# Тест: ошибка одной операции откатывает только её savepoint
+def test_run_isolates_failing_operation(mappers, engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(engine), batch_size=100) as uow:
+        tickets = TicketService(uow.session, uow.tickets, uow.voyages)
+        availability = AvailabilityService(uow.session, uow.availability, uow.voyages)
+        uow.run(tickets.create_ticket, voyage_id=1, price=100.0)
+        with pytest.raises(ValueError):
+            uow.run(tickets.create_ticket, voyage_id=42, price=100.0)
+        # Повторная доступность для рейса нарушает первичный ключ
+        with pytest.raises(Exception):
+            uow.run(availability.set_availability, voyage_id=1, remaining_seats=1, bookings=1)
+        uow.run(tickets.create_ticket, voyage_id=2, price=200.0)
+        assert uow.pending_operations == 2
+    assert committed_tickets(engine) == 2
+
+
+# Тест: откат в сервисе внутри run() снимает только savepoint операции
+def test_service_rollback_keeps_batch(mappers, savepoint_engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(savepoint_engine), batch_size=100) as uow:
+        tickets = TicketService(uow.session, uow.tickets, uow.voyages)
+        availability = AvailabilityService(uow.session, uow.availability, uow.voyages)
+        uow.run(tickets.create_ticket, voyage_id=1, price=100.0)
+        uow.run(tickets.create_ticket, voyage_id=1, price=200.0)
+        with pytest.raises(ValueError):
+            uow.run(availability.book_seats, voyage_id=1, seats=1000)
+        assert uow.pending_operations == 2
+        uow.run(tickets.create_ticket, voyage_id=2, price=300.0)
+        assert committed_tickets(savepoint_engine) == 0
+    assert committed_tickets(savepoint_engine) == 3
+
+
+# Тест: откат вне run() не выбрасывает пачку, а только несброшенные изменения
+def test_rollback_outside_run_keeps_batch(mappers, savepoint_engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    with BatchingUnitOfWork(sessionmaker(savepoint_engine), batch_size=100) as uow:
+        tickets = TicketService(uow.session, uow.tickets, uow.voyages)
+        availability = AvailabilityService(uow.session, uow.availability, uow.voyages)
+        tickets.create_ticket(voyage_id=1, price=100.0)
+        with pytest.raises(ValueError):
+            availability.release_seats(voyage_id=1, seats=1000)
+        handler = CommandHandler(None, None, tickets, availability, None)
+        # Несброшенный билет упавшей команды в пачку не попадает
+        uow.session.add(domain.Ticket(ticket_id=None, price=1.0, voyage_id=1, is_active=True))
+        handler._rollback()
+        assert uow.pending_operations == 1
+    assert committed_tickets(savepoint_engine) == 1
+
+
+# Тест: события и сброс кэша операций пачки выполняются после её фиксации
+def test_side_effects_wait_for_batch_commit(mappers, savepoint_engine, seed):
+    seed(date(2024, 12, 31), tickets_per_voyage=0)
+    published = []
+    with BatchingUnitOfWork(sessionmaker(savepoint_engine), batch_size=3) as uow:
+        tickets = TicketService(uow.session, uow.tickets, uow.voyages, events=published.append)
+        uow.run(tickets.create_ticket, voyage_id=1, price=100.0)
+        with pytest.raises(ValueError):
+            uow.run(tickets.create_ticket, voyage_id=42, price=100.0)
+        uow.run(tickets.create_ticket, voyage_id=2, price=200.0)
+        assert published == []
+        uow.run(tickets.create_ticket, voyage_id=1, price=300.0)
+        assert [event.voyage_id for event in published] == [1, 2, 1]
+        assert committed_tickets(savepoint_engine) == 3
+
+
+
+# Тест: сброс кэша пункта ждёт фиксации пачки, иначе другой читатель вернёт в кэш старую строку
+def test_location_invalidation_waits_for_batch_commit(mappers, savepoint_engine, seed):
+    seed(date(2024, 12, 31))
+    cache = LRUCache(10)
+    factory = sessionmaker(savepoint_engine)
+    with BatchingUnitOfWork(factory, batch_size=100) as uow:
+        locations = LocationService(uow.session, Repos.LocationRepository(uow.session, cache=cache))
+        uow.run(locations.update_location, 1, title="Renamed")
+        with factory() as other:
+            assert Repos.LocationRepository(other, cache=cache).get(1).title == "City A"
+        uow.commit()
+    with factory() as other:
+        assert Repos.LocationRepository(other, cache=cache).get(1).title == "Renamed"